@@ -0,0 +1,36 @@
+"""order daily stats rollup
+
+Revision ID: 0003_order_daily_stats
+Revises: 0002_kyc_data
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_order_daily_stats'
+down_revision = '0002_kyc_data'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'order_daily_stats',
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('status', sa.String(30), primary_key=True),
+        sa.Column('to_currency', sa.Integer, sa.ForeignKey('currencies.id'), primary_key=True),
+        sa.Column('order_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('amount_to_sum', sa.Numeric(28,8), nullable=False, server_default='0'),
+        sa.Column('amount_from_sum', sa.Numeric(28,8), nullable=False, server_default='0'),
+    )
+    # backfill from existing orders
+    day = 'CAST(created_at AS DATE)' if op.get_bind().dialect.name == 'postgresql' else 'date(created_at)'
+    op.execute(
+        f"INSERT INTO order_daily_stats (day, status, to_currency, order_count, amount_to_sum, amount_from_sum) "
+        f"SELECT {day}, status, to_currency, COUNT(*), SUM(amount_to), SUM(amount_from) "
+        f"FROM orders GROUP BY {day}, status, to_currency"
+    )
+
+
+def downgrade():
+    op.drop_table('order_daily_stats')
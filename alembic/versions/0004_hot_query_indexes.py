@@ -0,0 +1,36 @@
+"""indexes for hot order/audit queries
+
+Revision ID: 0004_hot_query_indexes
+Revises: 0003_order_daily_stats
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_hot_query_indexes'
+down_revision = '0003_order_daily_stats'
+branch_labels = None
+depends_on = None
+
+ORDER_COMPLETE = sa.text("action = 'order.complete'")
+
+INDEXES = [
+    ('ix_orders_user_id_created_at', 'orders', ['user_id', 'created_at'], {}),
+    ('ix_orders_status_id', 'orders', ['status', 'id'], {}),
+    ('ix_orders_created_at', 'orders', ['created_at'], {}),
+    ('ix_transactions_order_id', 'transactions', ['order_id'], {}),
+    ('ix_audit_logs_order_complete', 'audit_logs', ['details'], {'postgresql_where': ORDER_COMPLETE, 'sqlite_where': ORDER_COMPLETE}),
+]
+
+def upgrade():
+    # CONCURRENTLY cannot run inside a transaction; build without locking writes on Postgres
+    with op.get_context().autocommit_block():
+        for name, table, columns, kw in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,35 @@
+"""order completion ledger
+
+Revision ID: 0005_order_completions
+Revises: 0004_hot_query_indexes
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_order_completions'
+down_revision = '0004_hot_query_indexes'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'order_completions',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('order_id', sa.Integer, sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('currency_id', sa.Integer, sa.ForeignKey('currencies.id'), nullable=False),
+        sa.Column('amount', sa.Numeric(18,8), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    # carry over completions recorded the old way (audit rows 'order_id=N')
+    op.execute(
+        "INSERT INTO order_completions (order_id, currency_id, amount, created_at) "
+        "SELECT o.id, o.to_currency, o.amount_to, MIN(a.created_at) "
+        "FROM orders o JOIN audit_logs a ON a.action = 'order.complete' AND a.details = 'order_id=' || o.id "
+        "GROUP BY o.id, o.to_currency, o.amount_to"
+    )
+
+
+def downgrade():
+    op.drop_table('order_completions')
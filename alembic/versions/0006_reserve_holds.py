@@ -0,0 +1,40 @@
+"""reserve holds and sharded reserve counters
+
+Revision ID: 0006_reserve_holds
+Revises: 0005_order_completions
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_reserve_holds'
+down_revision = '0005_order_completions'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    # shards are created lazily from currencies.reserve on first use
+    op.create_table(
+        'reserve_shards',
+        sa.Column('currency_id', sa.Integer, sa.ForeignKey('currencies.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('shard', sa.Integer, primary_key=True),
+        sa.Column('available', sa.Numeric(18,8), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'reserve_holds',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('order_id', sa.Integer, sa.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('currency_id', sa.Integer, sa.ForeignKey('currencies.id'), nullable=False),
+        sa.Column('amount', sa.Numeric(18,8), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='active'),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_reserve_holds_status_expires_at', 'reserve_holds', ['status', 'expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_reserve_holds_status_expires_at', table_name='reserve_holds')
+    op.drop_table('reserve_holds')
+    op.drop_table('reserve_shards')
@@ -0,0 +1,36 @@
+"""per-user daily volume counters
+
+Revision ID: 0007_user_daily_volumes
+Revises: 0006_reserve_holds
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_user_daily_volumes'
+down_revision = '0006_reserve_holds'
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        'user_daily_volumes',
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('volume', sa.Numeric(28,8), nullable=False, server_default='0'),
+    )
+    # only today's counters matter for limit checks
+    if op.get_bind().dialect.name == 'postgresql':
+        day, today = 'CAST(created_at AS DATE)', "CAST(timezone('UTC', now()) AS DATE)"
+    else:
+        day, today = 'date(created_at)', "date('now')"
+    op.execute(
+        f"INSERT INTO user_daily_volumes (user_id, day, volume) "
+        f"SELECT user_id, {day}, SUM(amount_to) FROM orders "
+        f"WHERE status <> 'canceled' AND {day} = {today} GROUP BY user_id, {day}"
+    )
+
+
+def downgrade():
+    op.drop_table('user_daily_volumes')
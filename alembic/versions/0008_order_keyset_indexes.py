@@ -0,0 +1,30 @@
+"""indexes for keyset pagination of order listings
+
+Revision ID: 0008_order_keyset_indexes
+Revises: 0007_user_daily_volumes
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+
+revision = '0008_order_keyset_indexes'
+down_revision = '0007_user_daily_volumes'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_orders_user_id_id', 'orders', ['user_id', 'id']),
+    ('ix_orders_from_currency_id', 'orders', ['from_currency', 'id']),
+    ('ix_orders_to_currency_id', 'orders', ['to_currency', 'id']),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
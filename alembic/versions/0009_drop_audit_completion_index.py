@@ -0,0 +1,30 @@
+"""drop the audit completion index once the ledger is backfilled
+
+Revision ID: 0009_drop_audit_completion_index
+Revises: 0008_order_keyset_indexes
+Create Date: 2026-10-18
+"""
+from __future__ import annotations
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_drop_audit_completion_index'
+down_revision = '0008_order_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+ORDER_COMPLETE = sa.text("action = 'order.complete'")
+
+# completions are looked up in order_completions since 0005; only that revision's
+# one-off backfill read audit_logs by action, and the index taxed every audit insert
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_audit_logs_order_complete', table_name='audit_logs', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_audit_logs_order_complete', 'audit_logs', ['details'], postgresql_concurrently=True, if_not_exists=True,
+            postgresql_where=ORDER_COMPLETE, sqlite_where=ORDER_COMPLETE,
+        )
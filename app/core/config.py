@@ -12,26 +12,90 @@ class Settings(BaseSettings):
     DEBUG: bool = True
     SECRET_KEY: str = "CHANGE_ME"  # replace in prod
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # bcrypt runs off the event loop in a bounded pool; excess work is shed with 503
+    PASSWORD_HASH_EXECUTOR: str = "thread"  # thread|process
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 32  # waiting hash jobs per worker process before shedding
+    # process-local cache of authenticated principals (token -> id/role/kyc_status)
+    PRINCIPAL_CACHE_TTL: int = 30  # seconds; also bounds staleness across workers
+    PRINCIPAL_CACHE_MAX: int = 10000
 
     POSTGRES_HOST: str = "db"
     POSTGRES_PORT: int = 5432
     POSTGRES_DB: str = "crypto"
     POSTGRES_USER: str = "crypto"
     POSTGRES_PASSWORD: str = "crypto"
+    DATABASE_REPLICA_URL: str | None = None  # async URL of a read replica for read-only endpoints
+    # connection pool per engine and worker (ignored for SQLite)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 5.0  # seconds to wait for a pooled connection
+    DB_POOL_RECYCLE: int = 1800  # seconds; reconnect before server/proxy idle timeouts
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection; 0 behind pgbouncer
 
     REDIS_URL: str = "redis://redis:6379/0"
+    # one app-lifetime connection pool per worker
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 2.0  # seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    REDIS_CONNECT_TIMEOUT: float = 1.0
 
     BINANCE_PUBLIC_URL: AnyUrl | None = "https://api.binance.com"  # base public REST endpoint
-    RATE_CACHE_TTL: int = 30  # seconds for Redis rate cache
+    RATE_CACHE_TTL: int = 30  # seconds a cached rate counts as fresh
+    RATE_STALE_TTL: int = 300  # seconds a stale rate may still be served while it refreshes
+    RATE_REFRESH_ENABLED: bool = True  # background task keeping active pairs warm
+    RATE_REFRESH_INTERVAL: float = 10.0
+    # /public/rates/stream (SSE) fed by Redis pub/sub
+    RATE_STREAM_ENABLED: bool = True
+    RATE_STREAM_MAX_CLIENTS: int = 5000  # per worker
+    RATE_STREAM_HEARTBEAT: float = 15.0  # seconds between keep-alive comments
+    RATE_STREAM_RETRY_MS: int = 3000  # EventSource reconnect delay hint
+    RATE_LOCK_TTL_MS: int = 3000  # cross-worker refresh lock (SET NX PX) per symbol
+    RATE_LOCK_POLL_INTERVAL: float = 0.05  # seconds between cache checks while another worker refreshes
+    # shared keep-alive HTTP client for the rate provider
+    HTTP_TIMEOUT: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 30.0
+    HTTP2_ENABLED: bool = True  # used only when the h2 package is installed
+    # audit log: "async" queues rows for a batched background writer, "sync" writes them in the request's transaction
+    AUDIT_MODE: str = "async"  # async|sync
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL: float = 0.5  # seconds
+    AUDIT_QUEUE_MAX: int = 10000  # when full, rows fall back to the request's transaction
+    EXPORT_CHUNK_ROWS: int = 1000  # rows fetched and serialized per chunk by /orders/export
+    FAST_JSON: bool = False  # order/transaction lists: bare-column selects rendered by precompiled TypeAdapters
     # KYC related limits (very simplified, per order and per day total amount_from across all currencies)
     UNVERIFIED_ORDER_MAX: float = 100.0
     UNVERIFIED_DAILY_VOLUME_MAX: float = 500.0
     ALLOWED_RATE_QUOTES: list[str] = ["USDT"]  # quotes we construct default pairs with
+    CATALOG_MAX_AGE: float = 60.0  # seconds a worker's currency catalog may go without reloading
+    # browser/proxy caching of public reads (ETag revalidation is always on)
+    HTTP_CACHE_CURRENCIES_MAX_AGE: int = 10
+    HTTP_CACHE_PAIRS_MAX_AGE: int = 30
+    HTTP_CACHE_RATES_MAX_AGE: int = 2
+    HTTP_CACHE_BODIES: int = 256  # rendered response bodies kept per worker, keyed by ETag
+    # reserve holds: liquidity is split across shard rows so concurrent orders rarely share a row lock
+    RESERVE_SHARDS: int = 8
+    RESERVE_HOLD_TTL: int = 1800  # seconds an unpaid order keeps its hold before it is canceled
+    RESERVE_SWEEP_ENABLED: bool = True
+    RESERVE_SWEEP_INTERVAL: float = 60.0
 
     CORS_ORIGINS: List[str] = []
     RATE_LIMIT_ENABLED: bool = False
-    RATE_LIMIT_PER_MINUTE: int = 120
+    RATE_LIMIT_BACKEND: str = "redis"  # redis (shared by all workers)|memory (per process, dev only)
+    RATE_LIMIT_PER_MINUTE: int = 120  # per client for paths outside RATE_LIMIT_GROUPS
+    RATE_LIMIT_GROUPS: dict[str, int] = {"/auth": 20, "/orders": 60}  # path prefix -> requests per minute
+    RATE_LIMIT_MEMORY_KEYS: int = 100000  # LRU bound of the memory backend
     METRICS_ENABLED: bool = True
+    # each worker pushes its metrics to Redis so any worker's /metrics covers all of them
+    METRICS_AGGREGATE: bool = True
+    METRICS_PUSH_INTERVAL: float = 5.0  # seconds; snapshots older than 3 intervals are dropped
+    SERVER_TIMING_ENABLED: bool = True  # Server-Timing header with per-request DB/Redis/upstream time
+    SLOW_QUERY_LOG_SIZE: int = 50  # slowest statements kept per worker for /admin/slow-queries
+    SLOW_QUERY_MIN_MS: float = 5.0
+    SQL_ECHO: bool = False  # log every statement (synchronously; development only)
 
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
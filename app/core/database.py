@@ -1,13 +1,41 @@
-"""Async SQLAlchemy engine and session management for PostgreSQL."""
+"""Async SQLAlchemy engines (primary and optional read replica) and session management for PostgreSQL."""
 from __future__ import annotations
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy import text
+from sqlalchemy.dialects import postgresql, sqlite
 from .config import settings
+from .metrics import instrument_engine
+import asyncio
+import contextlib
 
-engine = create_async_engine(settings.database_url, echo=settings.DEBUG, future=True)
+
+
+def make_engine(url: str) -> AsyncEngine:
+    """Async engine with the DB_POOL_* settings (SQLite keeps SQLAlchemy's own pool choice)."""
+    kwargs = {}
+    if not url.startswith("sqlite"):
+        kwargs = dict(
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+    if url.startswith("postgresql+asyncpg"):
+        size = settings.DB_STATEMENT_CACHE_SIZE
+        kwargs["connect_args"] = {"prepared_statement_cache_size": size, "statement_cache_size": size}
+    new_engine = create_async_engine(url, echo=settings.SQL_ECHO, future=True, **kwargs)
+    instrument_engine(new_engine.sync_engine)
+    return new_engine
+
+
+engine = make_engine(settings.database_url)
+# read-only traffic goes to the replica when one is configured, else to the primary
+read_engine = make_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else engine
 
 SessionLocal = sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+ReadSessionLocal = sessionmaker(bind=read_engine, expire_on_commit=False, class_=AsyncSession)
 
 
 class Base(DeclarativeBase):
@@ -19,6 +47,37 @@ async def get_session() -> AsyncSession:
         yield session
 
 
+async def get_read_session() -> AsyncSession:
+    """Session for read-only endpoints (replica if configured).
+
+    Replicas lag the primary slightly; anything that must see the caller's own
+    just-committed write, or that writes, uses ``get_session``.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
+
+
+_sqlite_writer = asyncio.Lock()
+
+
+def write_lock(session: AsyncSession):
+    """Async context to wrap a multi-statement write transaction in.
+
+    SQLite admits one writer per file and makes the others poll with growing
+    sleeps, which at a few concurrent requests turns into second-long tails;
+    queueing them in-process hands the lock over as soon as it is free.
+    Other databases lock rows, so this is a no-op there.
+    """
+    if session.get_bind().dialect.name == "sqlite":
+        return _sqlite_writer
+    return contextlib.nullcontext()
+
+
+def dialect_insert(session: AsyncSession):
+    """``insert`` construct of the session's dialect, for ON CONFLICT upserts (Postgres/SQLite)."""
+    return postgresql.insert if session.get_bind().dialect.name == "postgresql" else sqlite.insert
+
+
 async def healthcheck_db() -> bool:
     """Simple health check executing SELECT 1."""
     async with engine.begin() as conn:
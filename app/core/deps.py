@@ -1,6 +1,6 @@
-"""Common dependency utilities: current user, role checks, Redis client, rate cache.
+"""Common dependency utilities: current user/principal, role checks, shared Redis/HTTP clients.
 
-Includes helper to fetch and cache ticker prices from Binance public API.
+Rate fetching and caching lives in ``services.rates``.
 """
 from __future__ import annotations
 from fastapi import Depends, HTTPException, status
@@ -9,74 +9,138 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from .database import get_session
 from ..models import User
-from .security import decode_token
+from ..models.loading import USER_WITH_KYC
+from .security import decode_token, TokenData
+from .principals import Principal, principal_cache, remember
 from .config import settings
+from . import metrics, timing
 import httpx
-import json
-import re
+import importlib.util
 import redis.asyncio as redis
+import time
 
 security_scheme = HTTPBearer()
 
-async def get_redis() -> redis.Redis:
-    return redis.from_url(settings.REDIS_URL, decode_responses=True)
+_redis_pool: redis.ConnectionPool | None = None
+_http_client: httpx.AsyncClient | None = None
 
-async def get_rate(pair: str, r: redis.Redis = Depends(get_redis)) -> float:
-    """Get rate with validation & resilient fallback.
 
-    Flow:
-      1. Validate symbol (A-Z only) and allowed quote.
-      2. Try short-term cache rate:<pair>.
-      3. On miss: call Binance, update current and last_good.<pair>.
-      4. If Binance fails: fallback to last_good:<pair> else 502.
-    """
-    symbol = pair.upper()
-    if not re.fullmatch(r"[A-Z0-9]{5,15}", symbol):
-        raise HTTPException(status_code=400, detail="Bad symbol")
-    if not any(symbol.endswith(q) for q in settings.ALLOWED_RATE_QUOTES):
-        raise HTTPException(status_code=400, detail="Quote not allowed")
-    cur_key = f"rate:{symbol}"
-    cached = await r.get(cur_key)
-    if cached:
+class TimedRedis(redis.Redis):
+    """Redis client that records each command's round trip in ``redis_command_duration_seconds``."""
+
+    async def execute_command(self, *args, **options):
+        started = time.perf_counter()
         try:
-            return float(json.loads(cached)["price"])
-        except Exception:
-            pass
-    base_url = settings.BINANCE_PUBLIC_URL
-    url = f"{base_url}/api/v3/ticker/price?symbol={symbol}"
-    try:
-        async with httpx.AsyncClient(timeout=5) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
-            price = float(data.get("price"))
-            payload = json.dumps({"price": price})
-            await r.set(cur_key, payload, ex=settings.RATE_CACHE_TTL)
-            await r.set(f"last_good:{symbol}", payload)
-            return price
-    except Exception:
-        fallback = await r.get(f"last_good:{symbol}")
-        if fallback:
-            try:
-                return float(json.loads(fallback)["price"])
-            except Exception:
-                pass
-        raise HTTPException(status_code=502, detail="Rate provider error (no fallback)")
+            return await super().execute_command(*args, **options)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.REDIS_LATENCY.observe((str(args[0]).upper(),), elapsed)
+            timing.add("redis", elapsed)
 
-async def current_user(creds: HTTPAuthorizationCredentials = Depends(security_scheme), db: AsyncSession = Depends(get_session)) -> User:
-    token_data = decode_token(creds.credentials)
+
+def redis_client() -> redis.Redis:
+    """Redis client bound to the process-wide connection pool (created on first use)."""
+    global _redis_pool
+    if _redis_pool is None:
+        _redis_pool = redis.BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            timeout=settings.REDIS_POOL_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+        )
+    return TimedRedis(connection_pool=_redis_pool)
+
+
+def http_client() -> httpx.AsyncClient:
+    """Keep-alive HTTP client for upstream providers (HTTP/2 when h2 is installed)."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            timeout=settings.HTTP_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=settings.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+            ),
+            http2=settings.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None,
+            event_hooks=metrics.HTTPX_EVENT_HOOKS,
+        )
+    return _http_client
+
+
+async def init_resources() -> None:
+    redis_client()
+    http_client()
+
+
+async def close_resources() -> None:
+    global _redis_pool, _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+    if _redis_pool is not None:
+        await _redis_pool.disconnect()
+        _redis_pool = None
+
+
+async def get_redis() -> redis.Redis:
+    return redis_client()
+
+def _decode(token: str) -> TokenData:
+    token_data = decode_token(token)
     if not token_data:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    res = await db.execute(select(User).where(User.id == int(token_data.sub)))
+    return token_data
+
+
+async def _load_user(token: str, db: AsyncSession, *options) -> User:
+    cached = principal_cache.get(token)
+    token_data = None if cached else _decode(token)
+    user_id = cached.id if cached else int(token_data.sub)
+    res = await db.execute(select(User).where(User.id == user_id).options(*options))
     user = res.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    if token_data:
+        remember(token, token_data, Principal(user.id, user.role, user.kyc_status))
     return user
 
 
+async def current_user(creds: HTTPAuthorizationCredentials = Depends(security_scheme), db: AsyncSession = Depends(get_session)) -> User:
+    """Authenticated user row only (relationships are not loaded)."""
+    return await _load_user(creds.credentials, db)
+
+
+async def current_user_with_kyc(creds: HTTPAuthorizationCredentials = Depends(security_scheme), db: AsyncSession = Depends(get_session)) -> User:
+    """Authenticated user with KYC data, for endpoints that serialize UserRead.kyc."""
+    return await _load_user(creds.credentials, db, *USER_WITH_KYC)
+
+
+async def current_principal(creds: HTTPAuthorizationCredentials = Depends(security_scheme), db: AsyncSession = Depends(get_session)) -> Principal:
+    """Authenticated identity (id/role/kyc_status) from the principal cache.
+
+    A cache hit costs neither a JWT decode nor a query; a miss reads three
+    columns of the user row instead of hydrating the ORM object.
+    """
+    token = creds.credentials
+    principal = principal_cache.get(token)
+    if principal:
+        return principal
+    token_data = _decode(token)
+    res = await db.execute(select(User.id, User.role, User.kyc_status).where(User.id == int(token_data.sub)))
+    row = res.first()
+    if not row:
+        raise HTTPException(status_code=401, detail="User not found")
+    principal = Principal(*row)
+    remember(token, token_data, principal)
+    return principal
+
+
 def require_roles(*roles: str):
-    async def checker(user: User = Depends(current_user)) -> User:
-        if user.role not in roles:
+    async def checker(principal: Principal = Depends(current_principal)) -> Principal:
+        if principal.role not in roles:
             raise HTTPException(status_code=403, detail="Insufficient role")
-        return user
+        return principal
     return checker
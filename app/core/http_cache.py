@@ -0,0 +1,48 @@
+"""Conditional GET for public read endpoints.
+
+Endpoints derive an ETag from the version of the data behind them (catalog
+fingerprint, current prices) before building anything. A matching
+``If-None-Match`` gets an empty 304; otherwise the JSON body is rendered once
+per ETag and reused from a small cache, so repeated polls skip both the
+query and serialization. ``Cache-Control`` comes from the caller's policy.
+"""
+from __future__ import annotations
+from hashlib import sha1
+from typing import Any, Callable
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from .cache import TTLCache
+from .config import settings
+from .responses import dumps
+
+_bodies = TTLCache(maxsize=settings.HTTP_CACHE_BODIES, ttl=300)
+
+
+def make_etag(*parts: Any) -> str:
+    return '"' + sha1(repr(parts).encode()).hexdigest()[:20] + '"'
+
+
+def matches(request: Request, etag: str) -> bool:
+    """Weak comparison (RFC 9110), since gzip in nginx turns our ETags into W/"..."."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def cached_json(request: Request, etag: str, cache_control: str, render: Callable[[], Any]) -> Response:
+    """304 if the client has ``etag``, else the JSON of ``render()`` (rendered once per ETag)."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    body = _bodies.get(etag)
+    if body is None:
+        body = dumps(jsonable_encoder(render()))
+        _bodies.set(etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def public(max_age: int) -> str:
+    return f"public, max-age={max_age}"
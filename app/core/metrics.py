@@ -0,0 +1,286 @@
+"""Request, database, Redis and upstream metrics in Prometheus text format.
+
+Metrics are kept per worker process in a small registry (counters, gauges
+and cumulative-bucket histograms keyed by label values). With
+``METRICS_AGGREGATE`` every worker pushes its snapshot to the Redis hash
+``metrics:snapshots`` each ``METRICS_PUSH_INTERVAL`` seconds, and ``/metrics``
+on any worker sums the snapshots that are still fresh, so one scrape covers
+the whole deployment. Counters of a worker that exits drop out of the sum
+after ``3 * METRICS_PUSH_INTERVAL``; Prometheus treats that as a counter reset.
+
+Component ``stats()`` dicts (principal cache, rate stream, audit writer, ...)
+are exported as gauges with a ``worker`` label rather than summed.
+"""
+from __future__ import annotations
+from typing import Callable
+import asyncio
+import json
+import logging
+import math
+import os
+import socket
+import time
+from .config import settings
+from . import timing
+
+logger = logging.getLogger("crypto.metrics")
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SNAPSHOT_KEY = "metrics:snapshots"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Family:
+    """One metric name; ``series`` maps label values to a number (histograms: bucket counts + [sum, count])."""
+
+    def __init__(self, kind: str, name: str, help: str, labels: tuple[str, ...], buckets: tuple[float, ...] = ()):
+        self.kind = kind
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series: dict[tuple[str, ...], float | list[float]] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self.series[labels] = self.series.get(labels, 0.0) + amount
+
+    def dec(self, labels: tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self.inc(labels, -amount)
+
+    def set(self, labels: tuple[str, ...], value: float) -> None:
+        self.series[labels] = value
+
+    def observe(self, labels: tuple[str, ...], value: float) -> None:
+        state = self.series.get(labels)
+        if state is None:
+            state = self.series[labels] = [0.0] * (len(self.buckets) + 2)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+class Registry:
+    def __init__(self):
+        self.families: dict[str, Family] = {}
+        self.collectors: dict[str, Callable[[], dict]] = {}
+
+    def _add(self, family: Family) -> Family:
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Family:
+        return self._add(Family("counter", name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: tuple[str, ...] = ()) -> Family:
+        return self._add(Family("gauge", name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS) -> Family:
+        return self._add(Family("histogram", name, help, labels, buckets))
+
+    def collector(self, component: str, stats: Callable[[], dict]) -> None:
+        """Export a component's ``stats()`` numbers as ``crypto_<component>_<key>`` gauges."""
+        self.collectors[component] = stats
+
+    def snapshot(self) -> dict:
+        """JSON-serializable state of this worker (what gets pushed to Redis)."""
+        families = {
+            name: {json.dumps(labels): value for labels, value in family.series.items()}
+            for name, family in self.families.items()
+        }
+        components = {}
+        for component, stats in self.collectors.items():
+            try:
+                components[component] = {
+                    k: v for k, v in stats().items() if isinstance(v, (int, float)) and not isinstance(v, bool)
+                }
+            except Exception:
+                logger.warning("Metrics collector %s failed", component, exc_info=True)
+        return {"families": families, "components": components}
+
+
+def merge(snapshots: dict[str, dict]) -> dict:
+    """Sum worker snapshots (``{worker: snapshot}``); component stats stay per worker."""
+    families: dict[str, dict[str, float | list[float]]] = {}
+    components: dict[str, dict[str, dict]] = {}
+    for worker, snap in snapshots.items():
+        for name, series in snap["families"].items():
+            merged = families.setdefault(name, {})
+            for key, value in series.items():
+                if key not in merged:
+                    merged[key] = list(value) if isinstance(value, list) else value
+                elif isinstance(value, list):
+                    merged[key] = [a + b for a, b in zip(merged[key], value)]
+                else:
+                    merged[key] += value
+        for component, stats in snap["components"].items():
+            components.setdefault(component, {})[worker] = stats
+    return {"families": families, "components": components}
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != math.inf else "+Inf"
+
+
+def exposition(registry: Registry, merged: dict) -> str:
+    """Prometheus text format (version 0.0.4) of a merged snapshot."""
+    lines: list[str] = []
+    for name, family in registry.families.items():
+        lines.append(f"# HELP {name} {family.help}")
+        lines.append(f"# TYPE {name} {family.kind}")
+        for key, value in sorted(merged["families"].get(name, {}).items()):
+            labels = json.loads(key)
+            if family.kind != "histogram":
+                lines.append(f"{name}{_labels(family.labels, labels)} {_number(value)}")
+                continue
+            for bound, count in [*zip(family.buckets, value), ("+Inf", value[-1])]:
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(family.labels, labels, le)} {_number(count)}")
+            lines.append(f"{name}_sum{_labels(family.labels, labels)} {_number(value[-2])}")
+            lines.append(f"{name}_count{_labels(family.labels, labels)} {_number(value[-1])}")
+    for component, workers in sorted(merged["components"].items()):
+        for stat in sorted({k for stats in workers.values() for k in stats}):
+            metric = f"crypto_{component}_{stat}"
+            lines.append(f"# TYPE {metric} gauge")
+            for worker, stats in sorted(workers.items()):
+                if stat in stats:
+                    lines.append(f"{metric}{_labels(('worker',), (worker,))} {_number(stats[stat])}")
+    return "\n".join(lines) + "\n"
+
+
+def quantile(buckets: tuple[float, ...], state: list[float], q: float) -> float | None:
+    """Estimate a quantile from cumulative bucket counts (linear within a bucket, like histogram_quantile)."""
+    total = state[-1]
+    if not total:
+        return None
+    rank = q * total
+    lower, below = 0.0, 0.0
+    for bound, count in zip(buckets, state):
+        if count >= rank:
+            return lower + (bound - lower) * ((rank - below) / (count - below) if count > below else 1.0)
+        lower, below = bound, count
+    return buckets[-1]  # in the +Inf bucket: the largest finite bound is all we know
+
+
+def route_summary(merged: dict) -> dict:
+    """Per ``"METHOD /route/template"``: request count, status counts and p50/p95/p99 latency in ms."""
+    routes: dict[str, dict] = {}
+    for key, count in merged["families"].get("http_requests_total", {}).items():
+        method, route, status = json.loads(key)
+        entry = routes.setdefault(f"{method} {route}", {"count": 0, "status": {}})
+        entry["count"] += int(count)
+        entry["status"][status] = entry["status"].get(status, 0) + int(count)
+    for key, state in merged["families"].get("http_request_duration_seconds", {}).items():
+        method, route = json.loads(key)
+        entry = routes.setdefault(f"{method} {route}", {"count": 0, "status": {}})
+        for q in (0.5, 0.95, 0.99):
+            value = quantile(LATENCY_BUCKETS, state, q)
+            entry[f"p{round(q * 100)}_ms"] = round(value * 1000, 2) if value is not None else None
+    return routes
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_LATENCY = registry.histogram("http_request_duration_seconds", "Time until the response headers are sent.", ("method", "route"))
+HTTP_INFLIGHT = registry.gauge("http_requests_in_flight", "Requests currently being handled.")
+DB_LATENCY = registry.histogram("db_query_duration_seconds", "SQL statement execution time.", ("statement",))
+REDIS_LATENCY = registry.histogram("redis_command_duration_seconds", "Redis command round trip (pipelines excluded).", ("command",))
+UPSTREAM_LATENCY = registry.histogram("upstream_request_duration_seconds", "Outbound HTTP requests to rate providers.", ("host", "status"))
+REQUEST_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements issued per request.", ("method", "route"),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+SQL_VERBS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "EXPLAIN"}
+
+
+def statement_kind(statement: str) -> str:
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return verb if verb in SQL_VERBS else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """Time every statement executed on ``engine`` (async engines: pass ``engine.sync_engine``).
+
+    Also counts it towards the current request and offers it to the slow-query log.
+    """
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            DB_LATENCY.observe((statement_kind(statement),), elapsed)
+            timing.record_query(statement, parameters, executemany, elapsed)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+
+async def _upstream_request(request) -> None:
+    request.extensions["metrics_started"] = time.perf_counter()
+
+
+async def _upstream_response(response) -> None:
+    started = response.request.extensions.get("metrics_started")
+    if started is not None:
+        elapsed = time.perf_counter() - started
+        UPSTREAM_LATENCY.observe((response.request.url.host, str(response.status_code)), elapsed)
+        timing.add("upstream", elapsed)
+
+
+HTTPX_EVENT_HOOKS = {"request": [_upstream_request], "response": [_upstream_response]}
+
+
+async def push_snapshot(redis, reg: Registry = registry, worker: str = WORKER_ID) -> None:
+    await redis.hset(SNAPSHOT_KEY, worker, json.dumps({"ts": time.time(), "data": reg.snapshot()}))
+
+
+async def collect(redis, reg: Registry = registry, worker: str = WORKER_ID) -> dict:
+    """This worker's live snapshot merged with the fresh ones other workers pushed."""
+    snapshots = {worker: reg.snapshot()}
+    if redis is not None:
+        stale_after = time.time() - 3 * settings.METRICS_PUSH_INTERVAL
+        stale = []
+        for other, raw in (await redis.hgetall(SNAPSHOT_KEY)).items():
+            entry = json.loads(raw)
+            if entry["ts"] < stale_after:
+                stale.append(other)
+            elif other != worker:
+                snapshots[other] = entry["data"]
+        if stale:
+            await redis.hdel(SNAPSHOT_KEY, *stale)
+    return merge(snapshots)
+
+
+async def push_loop() -> None:
+    """Background task started at app startup; publishes this worker's snapshot."""
+    from .deps import redis_client
+    while True:
+        try:
+            await push_snapshot(redis_client())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.debug("Metrics snapshot push failed", exc_info=True)
+        await asyncio.sleep(settings.METRICS_PUSH_INTERVAL)
+
+
+async def remove_snapshot(redis, worker: str = WORKER_ID) -> None:
+    await redis.hdel(SNAPSHOT_KEY, worker)
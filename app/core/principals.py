@@ -0,0 +1,77 @@
+"""Authenticated principal cache.
+
+Maps a bearer token to the small identity record role checks need (id, role,
+kyc_status), so repeat requests with the same token skip both JWT decoding and
+the user lookup. Role and KYC state are taken from the user row the first time
+a token is seen (token claims go stale after /auth/promote), and entries are
+dropped when those fields change: ``user_changed`` drops them in this worker
+and publishes the user id on ``principals:invalidate``, and every worker's
+``listen_loop`` drops them too. A worker that loses its subscription clears its
+whole cache on resubscribing, so a missed message costs one lookup per token
+rather than up to ``PRINCIPAL_CACHE_TTL`` of stale roles.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+import asyncio
+import logging
+import time
+from .cache import TTLCache
+from .config import settings
+from .security import TokenData
+
+logger = logging.getLogger("crypto.principals")
+
+CHANNEL = "principals:invalidate"
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    id: int
+    role: str
+    kyc_status: str
+
+
+principal_cache = TTLCache(maxsize=settings.PRINCIPAL_CACHE_MAX, ttl=settings.PRINCIPAL_CACHE_TTL)
+
+
+def remember(token: str, token_data: TokenData, principal: Principal) -> None:
+    """Cache principal for this token, never beyond the token's own expiry."""
+    ttl = settings.PRINCIPAL_CACHE_TTL
+    if token_data.exp is not None:
+        ttl = min(ttl, token_data.exp - time.time())
+    principal_cache.set(token, principal, ttl)
+
+
+def invalidate_user(user_id: int) -> int:
+    """Forget every cached token of a user (after role/KYC changes)."""
+    return principal_cache.discard_where(lambda p: p.id == user_id)
+
+
+async def user_changed(user_id: int) -> None:
+    """Drop a user's cached principals in every worker; call after the role/KYC change is committed."""
+    invalidate_user(user_id)
+    try:
+        from .deps import redis_client
+        await redis_client().publish(CHANNEL, str(user_id))
+    except Exception as exc:
+        logger.warning("Principal invalidation not published (%s); other workers keep it up to PRINCIPAL_CACHE_TTL", exc)
+
+
+async def listen_loop() -> None:
+    """Background task: apply invalidations published by any worker."""
+    from .deps import redis_client
+    while True:
+        pubsub = redis_client().pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            principal_cache.clear()  # invalidations published while we were not subscribed
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    invalidate_user(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Principal invalidation listener lost Redis; retrying", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,168 @@
+"""Request rate limiting (GCRA).
+
+Each client key stores a single "theoretical arrival time": a request is
+admitted if it does not push that time more than one period past now, so a
+check is O(1) and the state is one number per key. ``RATE_LIMIT_BACKEND=redis``
+keeps it in Redis and updates it atomically in a Lua script (using Redis'
+clock), so the limit holds across all workers and hosts; ``memory`` keeps it in
+a bounded per-process LRU and is meant for development only.
+
+Clients are keyed by the bearer token's subject when the token is valid and by
+IP otherwise; limits are per route group (``RATE_LIMIT_GROUPS``).
+"""
+from __future__ import annotations
+from collections import OrderedDict
+from dataclasses import dataclass
+import logging
+import math
+import time
+from .config import settings
+from .principals import principal_cache
+from .security import decode_token
+
+logger = logging.getLogger("crypto.ratelimit")
+
+
+@dataclass(frozen=True, slots=True)
+class Decision:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: float  # seconds until the bucket is full again
+    retry_after: float  # seconds until the next request would be admitted (0 if allowed)
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class MemoryLimiter:
+    """Process-local GCRA over an LRU of at most ``maxsize`` keys."""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self._tat: OrderedDict[str, float] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, period: float) -> Decision:
+        now = time.monotonic()
+        interval = period / limit
+        tat = max(self._tat.get(key, now), now)
+        new_tat = tat + interval
+        allow_at = new_tat - period
+        if allow_at > now:
+            return Decision(False, limit, 0, tat - now, allow_at - now)
+        self._tat[key] = new_tat
+        self._tat.move_to_end(key)
+        while len(self._tat) > self.maxsize:
+            self._tat.popitem(last=False)  # a dropped key only loses its debt
+        return Decision(True, limit, int((now - allow_at) / interval), new_tat - now, 0.0)
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+
+# KEYS[1] = bucket; ARGV = limit, period in ms. Returns {allowed, remaining, reset_ms, retry_ms}.
+GCRA_LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local interval = period / limit
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - period
+if allow_at > now then
+  return {0, 0, math.ceil(tat - now), math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+return {1, math.floor((now - allow_at) / interval), math.ceil(new_tat - now), 0}
+"""
+
+
+class RedisLimiter:
+    """Shared GCRA in Redis; falls back to a local limiter while Redis is unreachable."""
+
+    def __init__(self, redis_factory, prefix: str = "rl:"):
+        self.redis_factory = redis_factory
+        self.prefix = prefix
+        self.fallback = MemoryLimiter()
+        self.errors = 0
+        self.down = False
+        self._sha: str | None = None
+
+    async def _eval(self, redis, key: str, limit: int, period_ms: int):
+        if self._sha is None:
+            self._sha = await redis.script_load(GCRA_LUA)
+        try:
+            return await redis.evalsha(self._sha, 1, key, limit, period_ms)
+        except Exception as exc:
+            if "NOSCRIPT" not in str(exc):
+                raise
+            self._sha = await redis.script_load(GCRA_LUA)  # Redis restarted or flushed its scripts
+            return await redis.evalsha(self._sha, 1, key, limit, period_ms)
+
+    async def hit(self, key: str, limit: int, period: float) -> Decision:
+        try:
+            allowed, remaining, reset_ms, retry_ms = await self._eval(
+                self.redis_factory(), self.prefix + key, limit, int(period * 1000)
+            )
+        except Exception:
+            self.errors += 1
+            if not self.down:
+                self.down = True
+                logger.warning("Rate limiter Redis call failed; limiting per process", exc_info=True)
+            return await self.fallback.hit(key, limit, period)
+        if self.down:
+            self.down = False
+            logger.info("Rate limiter Redis reachable again")
+        return Decision(bool(allowed), limit, int(remaining), reset_ms / 1000, retry_ms / 1000)
+
+
+def route_group(path: str) -> tuple[str, int]:
+    """Longest matching ``RATE_LIMIT_GROUPS`` prefix and its per-minute limit."""
+    best = ""
+    for prefix in settings.RATE_LIMIT_GROUPS:
+        if path.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    if best:
+        return best, settings.RATE_LIMIT_GROUPS[best]
+    return "default", settings.RATE_LIMIT_PER_MINUTE
+
+
+def client_key(authorization: str | None, host: str | None) -> str:
+    """``user:<id>`` for a valid bearer token, else ``ip:<address>``."""
+    if authorization and authorization[:7].lower() == "bearer ":
+        token = authorization[7:].strip()
+        principal = principal_cache.peek(token)
+        if principal:
+            return f"user:{principal.id}"
+        data = decode_token(token)  # verified, so a forged sub cannot drain someone else's bucket
+        if data and data.sub:
+            return f"user:{data.sub}"
+    return f"ip:{host or 'unknown'}"
+
+
+_limiter: MemoryLimiter | RedisLimiter | None = None
+
+
+def limiter() -> MemoryLimiter | RedisLimiter:
+    global _limiter
+    if _limiter is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            from .deps import redis_client
+            _limiter = RedisLimiter(redis_client)
+        else:
+            _limiter = MemoryLimiter(settings.RATE_LIMIT_MEMORY_KEYS)
+    return _limiter
+
+
+async def check(path: str, authorization: str | None, host: str | None) -> Decision:
+    group, per_minute = route_group(path)
+    return await limiter().hit(f"{group}:{client_key(authorization, host)}", per_minute, 60.0)
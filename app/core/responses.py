@@ -0,0 +1,57 @@
+"""JSON rendering for list endpoints and schemaless payloads.
+
+With ``FAST_JSON`` the order and transaction list endpoints select bare
+columns instead of ORM objects and hand the rows to a ``TypeAdapter`` compiled
+once at import (``schemas.order.ORDER_LIST``/``TRANSACTION_LIST``), which
+validates and dumps the whole page to bytes in pydantic-core.
+
+``FastJSONResponse`` renders with orjson when it is installed (stdlib ``json``
+otherwise) and is the response class of endpoints without a ``response_model``.
+It is not the app-wide default: an explicit default class makes FastAPI skip
+its own pydantic ``dump_json`` path for every ``response_model`` route.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Mapping, Sequence
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+import json
+
+try:
+    import orjson
+except ImportError:  # optional; see requirements.txt
+    orjson = None
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Not serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact UTF-8 JSON, the same bytes ``JSONResponse`` would produce."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_list(adapter: TypeAdapter, rows: Sequence[Row], headers: Mapping[str, str] | None = None) -> Response:
+    """Render column rows through a precompiled list adapter.
+
+    Rows become plain dicts sharing one key tuple: validating dicts is about
+    twice as fast as reading the same values off ``Row`` by attribute.
+    """
+    keys = rows[0]._fields if rows else ()
+    body = adapter.dump_json(adapter.validate_python([dict(zip(keys, row)) for row in rows]))
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -1,14 +1,28 @@
-"""Security helpers: password hashing and JWT token creation/verification."""
+"""Security helpers: password hashing and JWT token creation/verification.
+
+bcrypt is deliberately slow (~100-300 ms per call), so request handlers use the
+``*_async`` variants, which run it in a bounded executor instead of blocking
+the event loop and refuse new work once the backlog is full.
+"""
 from __future__ import annotations
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from .config import settings
 from pydantic import BaseModel
+import asyncio
 
 ALGORITHM = "HS256"
 _pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+_hash_executor: Executor | None = None
+_hash_jobs = 0  # running + queued hash jobs in this process
+
+
+class HashingBusy(Exception):
+    """Raised when the password hashing backlog is full."""
+
 
 def hash_password(password: str) -> str:
     return _pwd.hash(password)
@@ -18,9 +32,44 @@ def verify_password(password: str, hashed: str) -> bool:
     return _pwd.verify(password, hashed)
 
 
+def _executor() -> Executor:
+    global _hash_executor
+    if _hash_executor is None:
+        pool = ProcessPoolExecutor if settings.PASSWORD_HASH_EXECUTOR == "process" else ThreadPoolExecutor
+        _hash_executor = pool(max_workers=settings.PASSWORD_HASH_WORKERS)
+    return _hash_executor
+
+
+async def _offload(fn, *args):
+    global _hash_jobs
+    if _hash_jobs >= settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE:
+        raise HashingBusy()
+    _hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor(), fn, *args)
+    finally:
+        _hash_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _offload(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _offload(verify_password, password, hashed)
+
+
+def shutdown_hashing() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+
 class TokenData(BaseModel):
     sub: str
     role: str
+    exp: int | None = None  # unix timestamp
 
 
 def create_access_token(sub: str, role: str, expires_minutes: int | None = None) -> str:
@@ -32,6 +81,6 @@ def create_access_token(sub: str, role: str, expires_minutes: int | None = None)
 def decode_token(token: str) -> TokenData | None:
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
-        return TokenData(sub=payload.get("sub"), role=payload.get("role"))
+        return TokenData(sub=payload.get("sub"), role=payload.get("role"), exp=payload.get("exp"))
     except JWTError:
         return None
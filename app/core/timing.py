@@ -0,0 +1,108 @@
+"""Per-request time accounting and the slow-query log.
+
+The metrics middleware opens a ``RequestTiming`` in a context variable; the
+SQL, Redis and upstream HTTP hooks in ``core.metrics``/``core.deps`` add to
+whichever request is current (background tasks have none and are skipped).
+The totals become the response's ``Server-Timing`` header and the
+queries-per-request histogram.
+
+``slow_queries`` keeps the ``SLOW_QUERY_LOG_SIZE`` slowest statements seen by
+this worker. Only parameter types are stored, never values.
+"""
+from __future__ import annotations
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+import heapq
+import itertools
+from .config import settings
+
+
+@dataclass(slots=True)
+class RequestTiming:
+    scope: dict = field(default_factory=dict)  # ASGI scope; routing adds the matched route to it
+    counts: dict[str, int] = field(default_factory=dict)
+    seconds: dict[str, float] = field(default_factory=dict)
+
+    @property
+    def route(self) -> str | None:
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.scope.get("path")
+
+    def add(self, kind: str, elapsed: float) -> None:
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        self.seconds[kind] = self.seconds.get(kind, 0.0) + elapsed
+
+    def server_timing(self, total: float | None = None) -> str:
+        """``Server-Timing`` value, e.g. ``db;dur=4.2;desc="3 queries", app;dur=9.8``."""
+        parts = [
+            f'{kind};dur={self.seconds[kind] * 1000:.1f};desc="{count} {"queries" if kind == "db" else "calls"}"'
+            for kind, count in self.counts.items()
+        ]
+        if total is not None:
+            parts.append(f"app;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+current: ContextVar[RequestTiming | None] = ContextVar("request_timing", default=None)
+
+
+def add(kind: str, elapsed: float) -> None:
+    timing = current.get()
+    if timing is not None:
+        timing.add(kind, elapsed)
+
+
+def _redact(parameters, executemany: bool) -> str:
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} rows of {_redact(parameters[0], False)}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(v).__name__ for v in parameters) + ")"
+    return type(parameters).__name__
+
+
+class SlowQueryLog:
+    """The ``size`` slowest statements at or above ``min_ms`` (min-heap, O(log size) per insert)."""
+
+    def __init__(self, size: int, min_ms: float = 0.0):
+        self.size = size
+        self.min_ms = min_ms
+        self._heap: list[tuple[float, int, dict]] = []
+        self._seq = itertools.count()
+
+    def offer(self, statement: str, parameters, executemany: bool, elapsed: float) -> None:
+        ms = elapsed * 1000
+        if ms < self.min_ms or self.size <= 0:
+            return
+        if len(self._heap) >= self.size and ms <= self._heap[0][0]:
+            return
+        timing = current.get()
+        entry = {
+            "duration_ms": round(ms, 2),
+            "statement": statement[:2000],
+            "parameters": _redact(parameters, executemany),
+            "route": timing.route if timing else None,
+            "request_query_no": timing.counts.get("db", 0) if timing else None,
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        item = (ms, next(self._seq), entry)
+        if len(self._heap) >= self.size:
+            heapq.heapreplace(self._heap, item)
+        else:
+            heapq.heappush(self._heap, item)
+
+    def entries(self) -> list[dict]:
+        return [entry for _, _, entry in sorted(self._heap, reverse=True)]
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+
+slow_queries = SlowQueryLog(settings.SLOW_QUERY_LOG_SIZE, settings.SLOW_QUERY_MIN_MS)
+
+
+def record_query(statement: str, parameters, executemany: bool, elapsed: float) -> None:
+    add("db", elapsed)
+    slow_queries.offer(statement, parameters, executemany, elapsed)
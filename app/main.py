@@ -2,19 +2,25 @@
 This is a simplified MVP version.
 """
 from __future__ import annotations
-from fastapi import FastAPI, Request, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, Request, Depends, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 from .core.config import settings
 from fastapi.middleware.cors import CORSMiddleware
 from .core.database import engine, Base, get_session
+from .core.principals import principal_cache, listen_loop as principals_listen_loop
+from .core import deps, metrics, ratelimit, timing
+from .core.deps import init_resources, close_resources, redis_client
+from .core.security import shutdown_hashing
 from .routers import auth, orders, rates, currencies
+from .services import rates as rates_service, rate_stream, reserves, audit
+from .services.catalog import catalog, listen_loop as catalog_listen_loop
 from sqlalchemy.ext.asyncio import AsyncSession
-import logging, time
-from collections import defaultdict, deque
-import json
+from sqlalchemy import text
+from starlette.routing import Match
+import asyncio, logging, time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("crypto")
@@ -27,6 +33,7 @@ if settings.CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
     )
 app.include_router(auth.router)
 app.include_router(orders.router)
@@ -39,15 +46,7 @@ static_dir = BASE_DIR / "static"
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=str(templates_dir))
 
-# --- Rate Limiter (simple in-memory, suitable only for single-process dev) ---
-_rate_buckets: dict[str, deque] = defaultdict(deque)
-_metrics = {
-    "requests_total": 0,
-    "requests_inflight": 0,
-    "requests_by_path": defaultdict(int),
-    "latency_ms_sum": 0.0,
-}
-
+# --- Rate limiting (core.ratelimit) ---
 @app.middleware("http")
 async def rate_limit(request: Request, call_next):
     if not settings.RATE_LIMIT_ENABLED:
@@ -55,27 +54,51 @@ async def rate_limit(request: Request, call_next):
     # Skip static & health
     if request.url.path.startswith("/static") or request.url.path == "/health":
         return await call_next(request)
-    ident = request.client.host  # could add token-based key
-    now = time.time()
-    window = 60
-    limit = settings.RATE_LIMIT_PER_MINUTE
-    dq = _rate_buckets[ident]
-    while dq and now - dq[0] > window:
-        dq.popleft()
-    if len(dq) >= limit:
-        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"})
-    dq.append(now)
-    start = time.time()
-    _metrics["requests_total"] += 1
-    _metrics["requests_inflight"] += 1
+    client = request.client.host if request.client else None
+    decision = await ratelimit.check(request.url.path, request.headers.get("authorization"), client)
+    if not decision.allowed:
+        return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=decision.headers())
+    response = await call_next(request)
+    response.headers.update(decision.headers())
+    return response
+
+
+def _route_template(scope) -> str:
+    """Matched route path (``/orders/{order_id}``), so label values stay bounded."""
+    route = scope.get("route")
+    if route is None:  # answered before routing (e.g. 429) or no route matched
+        route = next((r for r in app.router.routes if r.matches(scope)[0] != Match.NONE), None)
+    return getattr(route, "path", None) or "unmatched"
+
+
+# --- Request metrics (core.metrics) and Server-Timing (core.timing); added after rate_limit so it wraps it and counts 429s ---
+metrics.registry.collector("principal_cache", principal_cache.stats)
+metrics.registry.collector("rate_stream", rate_stream.hub.stats)
+metrics.registry.collector("audit", audit.writer.stats)
+metrics.registry.collector("catalog", catalog.stats)
+
+@app.middleware("http")
+async def track_requests(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    request_timing = timing.RequestTiming(request.scope)
+    token = timing.current.set(request_timing)
+    if settings.METRICS_ENABLED:
+        metrics.HTTP_INFLIGHT.inc()
     try:
         response = await call_next(request)
+        status = response.status_code
+        if settings.SERVER_TIMING_ENABLED:
+            response.headers["Server-Timing"] = request_timing.server_timing(time.perf_counter() - started)
         return response
     finally:
-        elapsed = (time.time() - start) * 1000
-        _metrics["latency_ms_sum"] += elapsed
-        _metrics["requests_by_path"][request.url.path] += 1
-        _metrics["requests_inflight"] -= 1
+        timing.current.reset(token)
+        if settings.METRICS_ENABLED:
+            metrics.HTTP_INFLIGHT.dec()
+            route = _route_template(request.scope)
+            metrics.HTTP_REQUESTS.inc((request.method, route, str(status)))
+            metrics.HTTP_LATENCY.observe((request.method, route), time.perf_counter() - started)
+            metrics.REQUEST_QUERIES.observe((request.method, route), request_timing.counts.get("db", 0))
 
 # --- Global error handler (hide internals) ---
 @app.exception_handler(Exception)
@@ -85,20 +108,52 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 
 @app.get("/metrics")
-async def metrics():
+async def metrics_endpoint(format: str = Query("prometheus", pattern="^(prometheus|json)$")):
+    """Prometheus exposition of all workers (see core.metrics); ``?format=json`` for a readable summary."""
     if not settings.METRICS_ENABLED:
         return JSONResponse(status_code=404, content={"detail": "disabled"})
+    merged = None
+    if settings.METRICS_AGGREGATE:
+        try:
+            merged = await metrics.collect(redis_client())
+        except Exception as exc:
+            logger.warning("Metrics aggregation via Redis failed (%s); reporting this worker only", exc)
+    if merged is None:
+        merged = await metrics.collect(None)
+    if format == "prometheus":
+        return PlainTextResponse(metrics.exposition(metrics.registry, merged), media_type="text/plain; version=0.0.4")
+    routes = metrics.route_summary(merged)
+    local = merged["components"]
     return {
-        "requests_total": _metrics["requests_total"],
-        "requests_inflight": _metrics["requests_inflight"],
-        "latency_ms_avg": (_metrics["latency_ms_sum"] / _metrics["requests_total"]) if _metrics["requests_total"] else 0,
-        "requests_by_path": dict(_metrics["requests_by_path"]),
+        "requests_total": sum(r["count"] for r in routes.values()),
+        "requests_inflight": sum(merged["families"].get("http_requests_in_flight", {}).values()),
+        "workers": len({w for stats in local.values() for w in stats}),
+        "routes": routes,
+        # component stats of the worker that answered
+        "principal_cache": principal_cache.stats(),
+        "rate_stream": rate_stream.hub.stats(),
+        "audit": audit.writer.stats(),
     }
 
 
+@app.get("/admin/slow-queries", dependencies=[Depends(deps.require_roles("admin"))])
+async def slow_queries():
+    """Slowest SQL statements seen by this worker (parameters reduced to their types)."""
+    return {"worker": metrics.WORKER_ID, "min_ms": timing.slow_queries.min_ms, "queries": timing.slow_queries.entries()}
+
+
+@app.delete("/admin/slow-queries", status_code=204, dependencies=[Depends(deps.require_roles("admin"))])
+async def reset_slow_queries():
+    timing.slow_queries.clear()
+
+
+_background: list[asyncio.Task] = []  # long-running tasks owned by the app lifetime
+
+
 @app.on_event("startup")
 async def startup():
     logger.info("Startup - assume Alembic migrations applied externally")
+    await init_resources()
     # Optional: seed basic currencies if empty (dev convenience)
     from sqlalchemy import select
     from .models.currency import Currency
@@ -113,6 +168,33 @@ async def startup():
                 Currency(code="ETH", name="Ethereum", reserve=500),
             ])
             await session.commit()
+    await catalog.refresh(force=True)
+    _background.append(asyncio.create_task(catalog_listen_loop()))
+    _background.append(asyncio.create_task(principals_listen_loop()))
+    if settings.RATE_REFRESH_ENABLED:
+        _background.append(asyncio.create_task(rates_service.refresh_loop()))
+    if settings.RATE_STREAM_ENABLED:
+        _background.append(asyncio.create_task(rate_stream.listen_loop()))
+    if settings.RESERVE_SWEEP_ENABLED:
+        _background.append(asyncio.create_task(reserves.expiry_loop()))
+    if settings.METRICS_ENABLED and settings.METRICS_AGGREGATE:
+        _background.append(asyncio.create_task(metrics.push_loop()))
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _background:
+        task.cancel()
+    await asyncio.gather(*_background, return_exceptions=True)
+    _background.clear()
+    await audit.writer.stop()  # drain buffered audit rows before the engine goes away
+    if settings.METRICS_ENABLED and settings.METRICS_AGGREGATE:
+        try:
+            await metrics.remove_snapshot(redis_client())
+        except Exception:
+            pass
+    await close_resources()
+    shutdown_hashing()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -130,15 +212,13 @@ async def admin_page(request: Request):
 async def health(db: AsyncSession = Depends(get_session)):
     # quick DB check
     try:
-        await db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
         db_status = "up"
     except Exception:
         db_status = "down"
-    # redis ping (optional)
-    from .core.deps import get_redis
+    # redis ping (optional) over the shared pool
     try:
-        r = await get_redis()
-        await r.ping()
+        await redis_client().ping()
         redis_status = "up"
     except Exception:
         redis_status = "down"
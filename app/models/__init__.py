@@ -5,3 +5,7 @@ from .currency import Currency  # noqa: F401
 from .order import Order  # noqa: F401
 from .transaction import Transaction  # noqa: F401
 from .audit import AuditLog  # noqa: F401
+from .stats import OrderDailyStat  # noqa: F401
+from .completion import OrderCompletion  # noqa: F401
+from .reserve import ReserveShard, ReserveHold  # noqa: F401
+from .volume import UserDailyVolume  # noqa: F401
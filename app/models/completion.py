@@ -0,0 +1,16 @@
+"""Ledger of completed orders whose reserve has been deducted."""
+from __future__ import annotations
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, Numeric
+from datetime import datetime
+from ..core.database import Base
+
+
+class OrderCompletion(Base):
+    """One row per completed order; the unique order_id makes the reserve deduction idempotent."""
+    __tablename__ = "order_completions"
+    id: Mapped[int] = mapped_column(primary_key=True)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), unique=True)
+    currency_id: Mapped[int] = mapped_column(ForeignKey("currencies.id"))
+    amount: Mapped[float] = mapped_column(Numeric(18, 8))
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -13,8 +13,8 @@ class Currency(Base):
     reserve: Mapped[float] = mapped_column(Numeric(18, 8), default=0)
 
     orders_from: Mapped[list["Order"]] = relationship(
-        back_populates="from_currency_obj", foreign_keys="Order.from_currency"
+        back_populates="from_currency_obj", foreign_keys="Order.from_currency", lazy="raise_on_sql"
     )
     orders_to: Mapped[list["Order"]] = relationship(
-        back_populates="to_currency_obj", foreign_keys="Order.to_currency"
+        back_populates="to_currency_obj", foreign_keys="Order.to_currency", lazy="raise_on_sql"
     )
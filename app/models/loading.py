@@ -0,0 +1,40 @@
+"""Relationship loading profile for the models.
+
+All relationships are declared ``lazy="raise_on_sql"``: nothing is pulled in
+implicitly, so a query only touches the tables an endpoint asks for. Endpoints
+opt into related data with the loader options below.
+"""
+from __future__ import annotations
+from sqlalchemy.orm import selectinload, load_only, raiseload
+from .user import User
+from .order import Order
+from .transaction import Transaction
+
+# User row plus its KYC record (profile / KYC endpoints serialize UserRead.kyc)
+USER_WITH_KYC = (selectinload(User.kyc),)
+
+# Exactly the columns OrderRead / TransactionRead serialize: as load_only() options
+# for ORM queries, or selected bare by the list endpoints (no ORM objects at all)
+ORDER_READ_COLUMNS = (
+    Order.id,
+    Order.user_id,
+    Order.from_currency,
+    Order.to_currency,
+    Order.amount_from,
+    Order.amount_to,
+    Order.rate,
+    Order.status,
+    Order.wallet_address,
+    Order.payout_details,
+    Order.created_at,
+)
+TRANSACTION_READ_COLUMNS = (
+    Transaction.id,
+    Transaction.order_id,
+    Transaction.tx_hash,
+    Transaction.amount,
+    Transaction.status,
+    Transaction.created_at,
+)
+ORDER_READ = (load_only(*ORDER_READ_COLUMNS), raiseload("*"))
+TRANSACTION_READ = (load_only(*TRANSACTION_READ_COLUMNS), raiseload("*"))
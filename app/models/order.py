@@ -1,7 +1,7 @@
 """Order model representing exchange request."""
 from __future__ import annotations
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy import ForeignKey, DateTime, String, Numeric
+from sqlalchemy import ForeignKey, DateTime, String, Numeric, Index
 from datetime import datetime
 from ..core.database import Base
 
@@ -17,6 +17,15 @@ ORDER_STATUS = (
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_user_id_created_at", "user_id", "created_at"),  # per-user time ranges
+        # keyset pages (id < cursor ORDER BY id DESC) per filter
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+        Index("ix_orders_from_currency_id", "from_currency", "id"),
+        Index("ix_orders_to_currency_id", "to_currency", "id"),
+        Index("ix_orders_created_at", "created_at"),  # date-range analytics / rollup rebuild
+    )
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"))
     from_currency: Mapped[int] = mapped_column(ForeignKey("currencies.id"))
@@ -29,11 +38,11 @@ class Order(Base):
     status: Mapped[str] = mapped_column(String(30), default="new")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    user: Mapped["User"] = relationship(back_populates="orders", lazy="selectin")
+    user: Mapped["User"] = relationship(back_populates="orders", lazy="raise_on_sql")
     from_currency_obj: Mapped["Currency"] = relationship(
-        foreign_keys=[from_currency], back_populates="orders_from", lazy="selectin"
+        foreign_keys=[from_currency], back_populates="orders_from", lazy="raise_on_sql"
     )
     to_currency_obj: Mapped["Currency"] = relationship(
-        foreign_keys=[to_currency], back_populates="orders_to", lazy="selectin"
+        foreign_keys=[to_currency], back_populates="orders_to", lazy="raise_on_sql"
     )
-    transactions: Mapped[list["Transaction"]] = relationship(back_populates="order", lazy="selectin")
+    transactions: Mapped[list["Transaction"]] = relationship(back_populates="order", lazy="raise_on_sql")
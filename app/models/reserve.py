@@ -0,0 +1,29 @@
+"""Reserve accounting: sharded available-liquidity counters and per-order holds."""
+from __future__ import annotations
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, Numeric, String
+from datetime import datetime
+from ..core.database import Base
+
+
+class ReserveShard(Base):
+    """Slice of a currency's unheld reserve; the slices sum to reserve minus active holds."""
+    __tablename__ = "reserve_shards"
+    currency_id: Mapped[int] = mapped_column(ForeignKey("currencies.id", ondelete="CASCADE"), primary_key=True)
+    shard: Mapped[int] = mapped_column(Integer, primary_key=True)
+    available: Mapped[float] = mapped_column(Numeric(18, 8), default=0)
+
+
+class ReserveHold(Base):
+    """Liquidity set aside for one order: active -> released (cancel/expiry) or converted (completion)."""
+    __tablename__ = "reserve_holds"
+    __table_args__ = (
+        Index("ix_reserve_holds_status_expires_at", "status", "expires_at"),  # expiry sweep
+    )
+    id: Mapped[int] = mapped_column(primary_key=True)
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), unique=True)
+    currency_id: Mapped[int] = mapped_column(ForeignKey("currencies.id"))
+    amount: Mapped[float] = mapped_column(Numeric(18, 8))
+    status: Mapped[str] = mapped_column(String(20), default="active")
+    expires_at: Mapped[datetime] = mapped_column(DateTime)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
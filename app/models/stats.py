@@ -0,0 +1,21 @@
+"""Pre-aggregated order statistics maintained alongside the orders table."""
+from __future__ import annotations
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, ForeignKey, Integer, Numeric, String
+from datetime import date
+from ..core.database import Base
+
+
+class OrderDailyStat(Base):
+    """Per (creation day, current status, target currency) totals of orders.
+
+    Updated in the same transaction as order inserts and status changes, so
+    analytics read O(days) rows instead of scanning orders.
+    """
+    __tablename__ = "order_daily_stats"
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    status: Mapped[str] = mapped_column(String(30), primary_key=True)
+    to_currency: Mapped[int] = mapped_column(ForeignKey("currencies.id"), primary_key=True)
+    order_count: Mapped[int] = mapped_column(Integer, default=0)
+    amount_to_sum: Mapped[float] = mapped_column(Numeric(28, 8), default=0)
+    amount_from_sum: Mapped[float] = mapped_column(Numeric(28, 8), default=0)
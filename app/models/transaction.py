@@ -9,10 +9,10 @@ from ..core.database import Base
 class Transaction(Base):
     __tablename__ = "transactions"
     id: Mapped[int] = mapped_column(primary_key=True)
-    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"))
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders.id", ondelete="CASCADE"), index=True)
     tx_hash: Mapped[str | None] = mapped_column(String(120), nullable=True)
     amount: Mapped[float] = mapped_column(Numeric(18, 8))
     status: Mapped[str] = mapped_column(String(30), default="pending")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    order: Mapped["Order"] = relationship(back_populates="transactions", lazy="selectin")
+    order: Mapped["Order"] = relationship(back_populates="transactions", lazy="raise_on_sql")
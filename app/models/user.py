@@ -19,10 +19,10 @@ class User(Base):
     kyc_status: Mapped[str] = mapped_column(String(20), default="unverified")  # unverified|pending|verified|rejected
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    orders: Mapped[list["Order"]] = relationship(back_populates="user", lazy="selectin")
+    orders: Mapped[list["Order"]] = relationship(back_populates="user", lazy="raise_on_sql")
     # Use direct forward ref (from __future__ annotations) without extra quotes around union part
     # Some SQLAlchemy versions mis-parse a stringified union containing quotes; use Optional forward ref style
-    kyc: Mapped[Optional["KYCData"]] = relationship(back_populates="user", uselist=False, lazy="selectin")
+    kyc: Mapped[Optional["KYCData"]] = relationship(back_populates="user", uselist=False, lazy="raise_on_sql")
 
 
 class KYCData(Base):
@@ -33,4 +33,4 @@ class KYCData(Base):
     document_id: Mapped[str] = mapped_column(String(100))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
-    user: Mapped[User] = relationship(back_populates="kyc")
+    user: Mapped[User] = relationship(back_populates="kyc", lazy="raise_on_sql")
@@ -0,0 +1,14 @@
+"""Running per-user daily order volume used by KYC limit checks."""
+from __future__ import annotations
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import Date, ForeignKey, Numeric
+from datetime import date
+from ..core.database import Base
+
+
+class UserDailyVolume(Base):
+    """Sum of amount_to of a user's non-canceled orders created on ``day`` (UTC)."""
+    __tablename__ = "user_daily_volumes"
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    volume: Mapped[float] = mapped_column(Numeric(28, 8), default=0)
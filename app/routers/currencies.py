@@ -1,20 +1,27 @@
 """Currencies management router (admin/operator create/update reserves, list public)."""
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from ..core.database import get_session
-from ..core import deps
+from ..core import deps, http_cache
+from ..core.config import settings
 from ..models import Currency
+from ..services import reserves
+from ..services.catalog import catalog
 from ..schemas.currency import CurrencyRead, CurrencyUpdateReserve, CurrencyCreate
 
 router = APIRouter(prefix="/currencies", tags=["currencies"])
 
 
 @router.get("", response_model=list[CurrencyRead])
-async def list_currencies(db: AsyncSession = Depends(get_session)):
-    res = await db.execute(select(Currency))
-    return list(res.scalars())
+async def list_currencies(request: Request):
+    """Served from the currency catalog (reserves as of its last change), with an ETag of its version."""
+    items = await catalog.all()
+    return http_cache.cached_json(
+        request, http_cache.make_etag("currencies", catalog.fingerprint), http_cache.public(settings.HTTP_CACHE_CURRENCIES_MAX_AGE),
+        lambda: [CurrencyRead.model_validate(c).model_dump() for c in items],
+    )
 
 
 @router.post("", response_model=CurrencyRead, dependencies=[Depends(deps.require_roles("admin","operator"))])
@@ -26,6 +33,7 @@ async def create_currency(payload: CurrencyCreate, db: AsyncSession = Depends(ge
     db.add(cur)
     await db.commit()
     await db.refresh(cur)
+    await catalog.changed()
     return cur
 
 
@@ -34,7 +42,11 @@ async def update_reserve(currency_id: int, payload: CurrencyUpdateReserve, db: A
     cur = await db.get(Currency, currency_id)
     if not cur:
         raise HTTPException(status_code=404, detail="Not found")
-    cur.reserve = payload.reserve
+    try:
+        await reserves.set_reserve(db, cur, payload.reserve)
+    except reserves.InsufficientReserve:
+        raise HTTPException(status_code=400, detail="Reserve below active holds")
     await db.commit()
     await db.refresh(cur)
+    await catalog.changed()
     return cur
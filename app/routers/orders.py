@@ -1,160 +1,246 @@
 """Orders router: create and retrieve orders, admin status change."""
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from ..core.database import get_session
-from ..models import Order, Currency, User
-from ..schemas.order import OrderCreate, OrderRead, OrderStatusUpdate, VALID_STATUSES, TransactionCreate, TransactionRead
+from ..core.database import get_read_session, get_session, write_lock
+from ..models import Order, Transaction
+from ..models.loading import ORDER_READ, ORDER_READ_COLUMNS, TRANSACTION_READ, TRANSACTION_READ_COLUMNS
+from ..schemas.order import OrderCreate, OrderRead, OrderStatusUpdate, VALID_STATUSES, TransactionCreate, TransactionRead, ORDER_LIST, TRANSACTION_LIST
 from ..core import deps
-from ..core.deps import get_rate
+from ..core.responses import FastJSONResponse, json_list
+from ..core.principals import Principal
+from ..services.rates import get_many_rates
+from ..services import analytics, export
 from ..core.config import settings
-from datetime import datetime, timedelta
-from sqlalchemy import func
-from ..services.orders import log_action, ensure_reserve_sufficient, deduct_reserve_once
+from dataclasses import dataclass
+from datetime import datetime
+from ..services.orders import log_action, deduct_reserve_once, transition
+from ..services import reserves, limits
+from ..services.catalog import catalog
+import base64
 import secrets
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
 
-@router.get("/analytics/summary")
-async def orders_summary(days: int = 7, db: AsyncSession = Depends(get_session), _: User = Depends(deps.require_roles("admin","operator"))):
-    """Return aggregated stats: total counts per status and daily volume for last N days."""
+@router.get("/analytics/summary", response_class=FastJSONResponse)
+async def orders_summary(
+    days: int = 7,
+    breakdown: list[str] = Query([], description="Extra per-day splits: status, currency"),
+    db: AsyncSession = Depends(get_read_session),
+    _: Principal = Depends(deps.require_roles("admin","operator")),
+):
+    """Return aggregated stats: total counts per status and daily volume for last N days (one SQL round-trip)."""
     days = max(1, min(days, 30))
-    from datetime import datetime, timedelta
-    since = datetime.utcnow() - timedelta(days=days)
-    # counts per status
-    from sqlalchemy import func
-    status_rows = (await db.execute(select(Order.status, func.count(), func.coalesce(func.sum(Order.amount_to),0)).where(Order.created_at>=since).group_by(Order.status))).all()
-    status_stats = {s: {"count": int(c), "volume": float(v)} for s,c,v in status_rows}
-    # daily buckets
-    # Fetch raw rows and bucket client-side (portable)
-    rows = (await db.execute(select(Order.created_at, Order.amount_to).where(Order.created_at>=since))).all()
-    buckets: dict[str,float] = {}
-    for created_at, amt in rows:
-        day_key = created_at.strftime('%Y-%m-%d')
-        buckets[day_key] = buckets.get(day_key, 0.0) + float(amt)
-    # ensure all days present
-    for i in range(days):
-        d = (since + timedelta(days=i)).strftime('%Y-%m-%d')
-        buckets.setdefault(d, 0.0)
-    daily = [{"date": k, "volume": buckets[k]} for k in sorted(buckets.keys())]
-    return {"status": status_stats, "daily": daily}
+    unknown = set(breakdown) - analytics.BREAKDOWNS
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown breakdown: {', '.join(sorted(unknown))}")
+    return await analytics.orders_summary(db, days, set(breakdown))
 
 
 @router.post("", response_model=OrderRead)
-async def create_order(payload: OrderCreate, db: AsyncSession = Depends(get_session), user: User = Depends(deps.current_user)):
+async def create_order(payload: OrderCreate, db: AsyncSession = Depends(get_session), user: Principal = Depends(deps.current_principal)):
     """Create order using dynamic rate (Binance cache) if possible.
 
-    amount_to = payload.amount_to or amount_from * rate
+    amount_to = amount_from * rate
+
+    Currencies come from the in-memory catalog; one transaction then covers
+    the KYC volume counter, the order INSERT (RETURNING id), reserve hold,
+    rollup and audit entry.
     """
-    from_cur = await db.get(Currency, payload.from_currency)
-    to_cur = await db.get(Currency, payload.to_currency)
-    if not from_cur or not to_cur:
+    from_cur = await catalog.get(payload.from_currency)
+    to_cur = await catalog.get(payload.to_currency)
+    if from_cur is None or to_cur is None:
         raise HTTPException(status_code=404, detail="Currency not found")
     # attempt dynamic rate
     dynamic_rate = None
     symbol = f"{from_cur.code}{to_cur.code}".upper()
     try:
-        dynamic_rate = await get_rate(symbol)
+        dynamic_rate = (await get_many_rates([symbol]))[symbol]
     except Exception:
         dynamic_rate = None
     rate = float(dynamic_rate) if dynamic_rate else 100.0  # fallback demo rate
-    amount_to = payload.amount_to or payload.amount_from * rate
-    # KYC limits for unverified users
+    amount_to = round(payload.amount_from * rate, 8)  # column scale, so the response needs no refresh
+    # KYC limits for unverified users: O(1) check-and-add on today's running volume
+    daily_limit = None
     if user.kyc_status != "verified":
         if amount_to > settings.UNVERIFIED_ORDER_MAX:
             raise HTTPException(status_code=400, detail="Order limit exceeded (KYC required)")
-        # daily volume check (sum of today's orders amount_to)
-        start_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        q = select(func.coalesce(func.sum(Order.amount_to), 0)).where(
-            Order.user_id == user.id, Order.created_at >= start_day
-        )
-        total_today = (await db.execute(q)).scalar()
-        if float(total_today) + float(amount_to) > settings.UNVERIFIED_DAILY_VOLUME_MAX:
-            raise HTTPException(status_code=400, detail="Daily volume limit exceeded (KYC required)")
-    try:
-        await ensure_reserve_sufficient(db, to_cur.id, amount_to)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        daily_limit = settings.UNVERIFIED_DAILY_VOLUME_MAX
     wallet_address = "demo_" + secrets.token_hex(8)
     # initial status flow: new -> pending_payment immediately (awaiting user transfer)
     order = Order(
         user_id=user.id,
-        from_currency=from_cur.id,
-        to_currency=to_cur.id,
+        from_currency=payload.from_currency,
+        to_currency=payload.to_currency,
         amount_from=payload.amount_from,
         amount_to=amount_to,
         rate=rate,
         wallet_address=wallet_address,
         payout_details=payload.payout_details,
         status="pending_payment",
+        created_at=datetime.utcnow(),
     )
-    db.add(order)
-    await db.commit()
-    await db.refresh(order)
-    await log_action(db, user.id, "order.create", f"order_id={order.id}")
+    async with write_lock(db):
+        try:
+            await limits.add_volume(db, user.id, amount_to, daily_limit)
+            db.add(order)
+            await db.flush()
+            await reserves.place_hold(db, order)
+        except (limits.LimitExceeded, reserves.InsufficientReserve) as e:
+            await db.rollback()
+            raise HTTPException(status_code=400, detail=str(e))
+        await analytics.record_order(db, order)
+        await log_action(db, user.id, "order.create", f"order_id={order.id}")
+        await db.commit()
     return order
 
 
 @router.post("/{order_id}/transactions", response_model=TransactionRead)
-async def create_transaction(order_id: int, payload: TransactionCreate, db: AsyncSession = Depends(get_session), user: User = Depends(deps.current_user)):
+async def create_transaction(order_id: int, payload: TransactionCreate, db: AsyncSession = Depends(get_session), user: Principal = Depends(deps.current_principal)):
     order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != user.id and user.role not in ("admin","operator"):
         raise HTTPException(status_code=403, detail="Forbidden")
     # create transaction
-    from ..models.transaction import Transaction  # local import to avoid circular
     tx = Transaction(order_id=order.id, tx_hash=payload.tx_hash, amount=payload.amount, status="pending")
     db.add(tx)
     # simple rule: if amount >= amount_from mark order as paid
+    moved = True
     if float(payload.amount) >= float(order.amount_from):
         if order.status == "pending_payment":
-            order.status = "paid"
+            moved = await transition(db, order, "paid")
         elif order.status == "processing":
-            changed = await deduct_reserve_once(db, order)
-            if changed:
-                order.status = "completed"
+            if await deduct_reserve_once(db, order):
+                moved = await transition(db, order, "completed")
+    if not moved:  # canceled (e.g. expired) or completed concurrently; the rollback undoes any deduction
+        raise HTTPException(status_code=409, detail="Order status changed concurrently")
+    await db.flush()
+    await log_action(db, user.id, "tx.create", f"order_id={order.id};tx_id={tx.id}")
     await db.commit()
     await db.refresh(tx)
-    await log_action(db, user.id, "tx.create", f"order_id={order.id};tx_id={tx.id}")
     return tx
 
 
 @router.get("/{order_id}/transactions", response_model=list[TransactionRead])
-async def list_transactions(order_id: int, db: AsyncSession = Depends(get_session), user: User = Depends(deps.current_user)):
+async def list_transactions(order_id: int, db: AsyncSession = Depends(get_session), user: Principal = Depends(deps.current_principal)):
     order = await db.get(Order, order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
     if order.user_id != user.id and user.role not in ("admin","operator"):
         raise HTTPException(status_code=403, detail="Forbidden")
-    return order.transactions
+    if settings.FAST_JSON:
+        stmt = select(*TRANSACTION_READ_COLUMNS).where(Transaction.order_id == order.id).order_by(Transaction.id)
+        return json_list(TRANSACTION_LIST, (await db.execute(stmt)).all())
+    stmt = select(Transaction).where(Transaction.order_id == order.id).order_by(Transaction.id).options(*TRANSACTION_READ)
+    res = await db.execute(stmt)
+    return list(res.scalars())
+
+
+@dataclass
+class OrderFilters:
+    """Listing filters shared by the order list endpoints (query parameters)."""
+    status: str | None = None
+    user_id: int | None = None
+    from_currency: int | None = None
+    to_currency: int | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None  # exclusive
+
+    def apply(self, stmt):
+        if self.status:
+            stmt = stmt.where(Order.status == self.status)
+        if self.user_id:
+            stmt = stmt.where(Order.user_id == self.user_id)
+        if self.from_currency:
+            stmt = stmt.where(Order.from_currency == self.from_currency)
+        if self.to_currency:
+            stmt = stmt.where(Order.to_currency == self.to_currency)
+        if self.created_from:
+            stmt = stmt.where(Order.created_at >= self.created_from)
+        if self.created_to:
+            stmt = stmt.where(Order.created_at < self.created_to)
+        return stmt
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        kind, _, value = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition(":")
+        if kind != "id":
+            raise ValueError(kind)
+        return int(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Bad cursor")
+
+
+async def _order_page(db: AsyncSession, response: Response, filters: OrderFilters, limit: int, after_id: int | None, cursor: str | None) -> list[Order] | Response:
+    """Newest-first keyset page: ``id < after`` instead of OFFSET, so deep pages cost the same as the first.
+
+    The cursor for the following page is returned in the X-Next-Cursor header. With FAST_JSON the page is
+    selected as bare columns and rendered here rather than by ``response_model``.
+    """
+    limit = max(1, min(limit, 200))
+    after = decode_cursor(cursor) if cursor else after_id
+    stmt = filters.apply(select(*ORDER_READ_COLUMNS) if settings.FAST_JSON else select(Order).options(*ORDER_READ))
+    if after is not None:
+        stmt = stmt.where(Order.id < after)
+    result = await db.execute(stmt.order_by(Order.id.desc()).limit(limit))
+    rows = result.all() if settings.FAST_JSON else list(result.scalars())
+    headers = {"X-Next-Cursor": encode_cursor(rows[-1].id)} if len(rows) == limit else {}
+    if settings.FAST_JSON:
+        return json_list(ORDER_LIST, rows, headers)
+    response.headers.update(headers)
+    return rows
 
 
 @router.get("", response_model=list[OrderRead])
 async def list_orders(
-    status: str | None = None,
-    user_id: int | None = None,
+    response: Response,
+    filters: OrderFilters = Depends(),
     limit: int = 50,
-    db: AsyncSession = Depends(get_session),
-    _: User = Depends(deps.require_roles("admin","operator")),
+    after_id: int | None = None,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    _: Principal = Depends(deps.require_roles("admin","operator")),
 ):
-    """List orders with optional filters (admin/operator)."""
-    stmt = select(Order)
-    if status:
-        stmt = stmt.where(Order.status == status)
-    if user_id:
-        stmt = stmt.where(Order.user_id == user_id)
-    stmt = stmt.order_by(Order.id.desc()).limit(min(limit, 200))
-    res = await db.execute(stmt)
-    return list(res.scalars())
+    """List orders with optional filters (admin/operator), newest first, cursor-paginated."""
+    return await _order_page(db, response, filters, limit, after_id, cursor)
+
+
+EXPORT_COLUMNS = {"orders": ORDER_READ_COLUMNS, "transactions": TRANSACTION_READ_COLUMNS}
+
+
+@router.get("/export")
+async def export_orders(
+    filters: OrderFilters = Depends(),
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    dataset: str = Query("orders", pattern="^(orders|transactions)$"),
+    db: AsyncSession = Depends(get_read_session),
+    _: Principal = Depends(deps.require_roles("admin","operator")),
+):
+    """Stream all matching orders (or their transactions) as CSV or NDJSON; filters match GET /orders."""
+    stmt = select(*EXPORT_COLUMNS[dataset])
+    if dataset == "transactions":
+        stmt = stmt.join(Order, Order.id == Transaction.order_id)
+    stmt = filters.apply(stmt).order_by(EXPORT_COLUMNS[dataset][0])
+    return StreamingResponse(
+        export.stream_rows(db.bind, stmt, format),
+        media_type=export.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
 
 
 @router.get("/{order_id}", response_model=OrderRead)
-async def get_order(order_id: int, db: AsyncSession = Depends(get_session), user: User = Depends(deps.current_user)):
+async def get_order(order_id: int, db: AsyncSession = Depends(get_session), user: Principal = Depends(deps.current_principal)):
     """Return order if owner or admin/operator."""
-    order = await db.get(Order, order_id)
+    order = await db.get(Order, order_id, options=ORDER_READ)
     if not order:
         raise HTTPException(status_code=404, detail="Not found")
     if order.user_id != user.id and user.role not in ("admin", "operator"):
@@ -163,15 +249,22 @@ async def get_order(order_id: int, db: AsyncSession = Depends(get_session), user
 
 
 @router.get("/my/list", response_model=list[OrderRead])
-async def my_orders(limit: int = 50, db: AsyncSession = Depends(get_session), user: User = Depends(deps.current_user)):
-    """Return recent orders for current user (self-service view)."""
-    stmt = select(Order).where(Order.user_id == user.id).order_by(Order.id.desc()).limit(min(limit, 200))
-    res = await db.execute(stmt)
-    return list(res.scalars())
+async def my_orders(
+    response: Response,
+    filters: OrderFilters = Depends(),
+    limit: int = 50,
+    after_id: int | None = None,
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_session),
+    user: Principal = Depends(deps.current_principal),
+):
+    """Return recent orders for current user (self-service view), cursor-paginated."""
+    filters.user_id = user.id
+    return await _order_page(db, response, filters, limit, after_id, cursor)
 
 
 @router.post("/{order_id}/status", response_model=OrderRead)
-async def update_status(order_id: int, payload: OrderStatusUpdate, db: AsyncSession = Depends(get_session), user: User = Depends(deps.require_roles("admin","operator"))):
+async def update_status(order_id: int, payload: OrderStatusUpdate, db: AsyncSession = Depends(get_session), user: Principal = Depends(deps.require_roles("admin","operator"))):
     """Change order status (admin/operator only) with validation and reserve update."""
     if payload.status not in VALID_STATUSES:
         raise HTTPException(status_code=400, detail="Invalid status")
@@ -189,11 +282,15 @@ async def update_status(order_id: int, payload: OrderStatusUpdate, db: AsyncSess
     }
     if payload.status not in allowed_forward.get(order.status, set()):
         raise HTTPException(status_code=400, detail=f"Transition {order.status}->{payload.status} not allowed")
-    prev = order.status
-    order.status = payload.status
+    if not await transition(db, order, payload.status):
+        raise HTTPException(status_code=409, detail="Order status changed concurrently")
     if payload.status == "completed":
-        await deduct_reserve_once(db, order)
+        if not await deduct_reserve_once(db, order):  # the rollback also undoes the transition
+            raise HTTPException(status_code=409, detail="Insufficient reserve")
+    elif payload.status == "canceled":
+        await reserves.release_hold(db, order.id)
+        await limits.remove_volume(db, order)
+    await log_action(db, user.id, "order.status", f"order_id={order.id};status={order.status}")
     await db.commit()
     await db.refresh(order)
-    await log_action(db, user.id, "order.status", f"order_id={order.id};status={order.status}")
     return order
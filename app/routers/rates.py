@@ -1,43 +1,82 @@
 """Rates and pairs router with dynamic Binance-backed rates cached in Redis."""
 from __future__ import annotations
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.ext.asyncio import AsyncSession
-from ..core.database import get_session
-from sqlalchemy import select
-from ..models import Currency
-from ..core.deps import get_rate
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from ..core import http_cache
+from ..services.catalog import catalog
+from ..services.rates import get_many_quotes, get_many_rates, validate_symbol
+from ..services import rate_stream
+from ..core.config import settings
 
 router = APIRouter(prefix="/public", tags=["public"])  # /public/rates, /public/pairs
 
 
 @router.get("/rates")
 async def get_rates(
+    request: Request,
     symbols: list[str] | None = Query(None, description="Specific symbols like BTCUSDT,ETHUSDT"),
-    db: AsyncSession = Depends(get_session),
+    meta: bool = Query(False, description="Wrap as {rates, meta} with per-symbol freshness age"),
 ):
-    """Return validated rates (with Redis+Binance + fallback).
+    """Return validated rates (with Redis+Binance + fallback), fetched as one batch.
 
     If no symbols provided: build CODE<quote> (quote from ALLOWED_RATE_QUOTES) using first allowed quote present in DB (e.g. USDT).
     Invalid symbols return value None rather than failing entire response.
+    With ``meta=true`` each symbol also reports ``age`` (seconds since fetched upstream) and ``stale``.
+    Without ``meta`` the response carries an ETag of the prices (304 while they are unchanged).
     """
     if symbols is None:
-        res = await db.execute(select(Currency.code))
-        codes = [c for (c,) in res.all()]
+        codes = await catalog.codes()
         if "USDT" not in codes:
-            return {}
+            return {"rates": {}, "meta": {}} if meta else {}
         symbols = [f"{c}USDT" for c in codes if c != "USDT"]
-    rates = {}
-    for sym in symbols:
+    try:
+        quotes = await get_many_quotes(symbols)
+    except Exception:
+        quotes = {sym: None for sym in symbols}
+    rates = {sym: q.price if q else None for sym, q in quotes.items()}
+    if not meta:
+        etag = http_cache.make_etag("rates", tuple(rates.items()))
+        return http_cache.cached_json(request, etag, http_cache.public(settings.HTTP_CACHE_RATES_MAX_AGE), lambda: rates)
+    freshness = {
+        sym: {"age": round(q.age, 3), "stale": q.age > settings.RATE_CACHE_TTL} if q else None
+        for sym, q in quotes.items()
+    }
+    return JSONResponse({"rates": rates, "meta": freshness}, headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/rates/stream")
+async def stream_rates(symbols: list[str] | None = Query(None, description="Symbols to follow; all when omitted")):
+    """Server-Sent Events feed of rate updates (replaces client-side polling).
+
+    The first event is a snapshot of the requested symbols; later events carry
+    only symbols that changed. Slow clients receive the latest prices, not a backlog.
+    """
+    wanted: list[str] = []
+    for sym in symbols or []:
         try:
-            rate = await get_rate(sym)
-            rates[sym] = rate
+            wanted.append(validate_symbol(sym))
+        except HTTPException:
+            continue
+    try:
+        sub = rate_stream.hub.subscribe(set(wanted) if symbols else None)
+    except OverflowError:
+        raise HTTPException(status_code=503, detail="Too many stream clients")
+
+    async def snapshot() -> dict:
+        try:
+            return await get_many_rates(wanted) if wanted else {}
         except Exception:
-            rates[sym] = None
-    return rates
+            return {sym: None for sym in wanted}
+
+    return rate_stream.RateStreamResponse(sub, snapshot)
 
 
 @router.get("/pairs")
-async def get_pairs(db: AsyncSession = Depends(get_session)):
-    res = await db.execute(select(Currency))
-    codes = [c.code for c in res.scalars().all()]
-    return {"pairs": [f"{a}-{b}" for a in codes for b in codes if a != b]}
+async def get_pairs(request: Request):
+    """All ordered code pairs; built once per catalog version, 304 for clients that have it."""
+    await catalog.refresh()
+    codes = list(catalog.by_code)
+    return http_cache.cached_json(
+        request, http_cache.make_etag("pairs", catalog.codes_fingerprint), http_cache.public(settings.HTTP_CACHE_PAIRS_MAX_AGE),
+        lambda: {"pairs": [f"{a}-{b}" for a in codes for b in codes if a != b]},
+    )
@@ -1,6 +1,6 @@
 """Order and related schemas."""
 from __future__ import annotations
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from datetime import datetime
 
 
@@ -50,6 +50,11 @@ class TransactionRead(BaseModel):
     model_config = {"from_attributes": True}
 
 
+# Built once; the list endpoints validate and dump whole pages through these (FAST_JSON)
+ORDER_LIST = TypeAdapter(list[OrderRead])
+TRANSACTION_LIST = TypeAdapter(list[TransactionRead])
+
+
 class TransactionCreate(BaseModel):
     tx_hash: str | None = None
     amount: float
@@ -0,0 +1,137 @@
+"""Order analytics served from the ``order_daily_stats`` rollup.
+
+Every order insert and status change applies a +1/-1 delta to its
+(creation day, status, to_currency) row in the same transaction, so the admin
+summary reads at most days x statuses x currencies rows no matter how many
+orders exist. ``python -m crypto_exchange.app.services.analytics rebuild``
+recomputes the rollup from the orders table (after bulk imports or manual
+fixes).
+"""
+from __future__ import annotations
+from datetime import date, datetime, timedelta
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models import Order, Currency, OrderDailyStat
+import asyncio
+import sys
+
+BREAKDOWNS = {"status", "currency"}
+
+
+def day_bucket(db: AsyncSession, column):
+    """Dialect-specific day truncation (Postgres CAST AS DATE, SQLite date())."""
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(column, Date)
+    return func.date(column)
+
+
+def _day_key(value) -> str:
+    return value if isinstance(value, str) else value.strftime("%Y-%m-%d")
+
+
+async def _apply(db: AsyncSession, order: Order, status: str, sign: int) -> None:
+    stmt = dialect_insert(db)(OrderDailyStat).values(
+        day=order.created_at.date(),
+        status=status,
+        to_currency=order.to_currency,
+        order_count=sign,
+        amount_to_sum=sign * order.amount_to,
+        amount_from_sum=sign * order.amount_from,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OrderDailyStat.day, OrderDailyStat.status, OrderDailyStat.to_currency],
+        set_={
+            "order_count": OrderDailyStat.order_count + stmt.excluded.order_count,
+            "amount_to_sum": OrderDailyStat.amount_to_sum + stmt.excluded.amount_to_sum,
+            "amount_from_sum": OrderDailyStat.amount_from_sum + stmt.excluded.amount_from_sum,
+        },
+    )
+    await db.execute(stmt)
+
+
+async def record_order(db: AsyncSession, order: Order) -> None:
+    """Count a newly flushed order; call before the transaction commits."""
+    await _apply(db, order, order.status, 1)
+
+
+async def record_status_change(db: AsyncSession, order: Order, previous: str) -> None:
+    """Move an order's totals from ``previous`` to its current status bucket."""
+    if previous == order.status:
+        return
+    await _apply(db, order, previous, -1)
+    await _apply(db, order, order.status, 1)
+
+
+async def rebuild_daily_stats(db: AsyncSession, since: date | None = None) -> int:
+    """Recompute the rollup from orders (optionally only days >= since); returns rows written."""
+    day = day_bucket(db, Order.created_at)
+    source = select(
+        day, Order.status, Order.to_currency,
+        func.count(), func.sum(Order.amount_to), func.sum(Order.amount_from),
+    ).group_by(day, Order.status, Order.to_currency)
+    clear = delete(OrderDailyStat)
+    if since is not None:
+        source = source.where(Order.created_at >= datetime.combine(since, datetime.min.time()))
+        clear = clear.where(OrderDailyStat.day >= since)
+    await db.execute(clear)
+    result = await db.execute(insert(OrderDailyStat).from_select(
+        ["day", "status", "to_currency", "order_count", "amount_to_sum", "amount_from_sum"], source,
+    ))
+    await db.commit()
+    return result.rowcount
+
+
+async def orders_summary(db: AsyncSession, days: int, breakdown: set[str] = frozenset()) -> dict:
+    since = (datetime.utcnow() - timedelta(days=days)).date()
+    cols = [OrderDailyStat.day, OrderDailyStat.status]
+    if "currency" in breakdown:
+        cols.append(Currency.code)
+    stmt = select(*cols, func.sum(OrderDailyStat.order_count), func.sum(OrderDailyStat.amount_to_sum)).where(OrderDailyStat.day >= since)
+    if "currency" in breakdown:
+        stmt = stmt.join(Currency, Currency.id == OrderDailyStat.to_currency)
+    stmt = stmt.group_by(*cols)
+    rows = (await db.execute(stmt)).all()
+
+    status_stats: dict[str, dict] = {}
+    buckets: dict[str, dict] = {}
+    for row in rows:
+        day_key, status = _day_key(row[0]), row[1]
+        count, volume = int(row[-2] or 0), float(row[-1] or 0)
+        if count == 0:
+            continue  # every order moved out of this bucket
+        stats = status_stats.setdefault(status, {"count": 0, "volume": 0.0})
+        stats["count"] += count
+        stats["volume"] += volume
+        bucket = buckets.setdefault(day_key, {"date": day_key, "volume": 0.0})
+        bucket["volume"] += volume
+        if "status" in breakdown:
+            by_status = bucket.setdefault("by_status", {})
+            by_status[status] = by_status.get(status, 0.0) + volume
+        if "currency" in breakdown:
+            by_currency = bucket.setdefault("by_currency", {})
+            by_currency[row[2]] = by_currency.get(row[2], 0.0) + volume
+    # ensure all days present (O(days), not O(orders))
+    for i in range(days + 1):
+        d = (since + timedelta(days=i)).strftime("%Y-%m-%d")
+        bucket = buckets.setdefault(d, {"date": d, "volume": 0.0})
+        if "status" in breakdown:
+            bucket.setdefault("by_status", {})
+        if "currency" in breakdown:
+            bucket.setdefault("by_currency", {})
+    daily = [buckets[k] for k in sorted(buckets)]
+    return {"status": status_stats, "daily": daily}
+
+
+async def _main(argv: list[str]) -> None:
+    from ..core.database import SessionLocal
+    if not argv or argv[0] != "rebuild":
+        sys.exit("usage: python -m crypto_exchange.app.services.analytics rebuild [YYYY-MM-DD]")
+    since = date.fromisoformat(argv[1]) if len(argv) > 1 else None
+    async with SessionLocal() as session:
+        rows = await rebuild_daily_stats(session, since)
+    print(f"order_daily_stats: {rows} rows rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
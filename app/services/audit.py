@@ -0,0 +1,148 @@
+"""Buffered audit log writer.
+
+With ``AUDIT_MODE=async`` audited actions are queued in-process and written
+by a background task in multi-row INSERTs, on whichever comes first of
+``AUDIT_BATCH_SIZE`` queued rows or ``AUDIT_FLUSH_INTERVAL`` seconds, so
+request handlers no longer pay a second commit per action. The queue is
+drained on shutdown; a process crash loses at most what is still buffered.
+``AUDIT_MODE=sync`` writes the row in the caller's own transaction instead.
+
+Rows are handed to the writer only once the request's transaction commits:
+``defer`` parks them on the session and the ``after_commit`` hook queues
+them (a rollback drops them), so a rejected or failed request leaves
+no audit trail of something that never happened.
+"""
+from __future__ import annotations
+from collections import deque
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models import AuditLog
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("crypto.audit")
+
+
+class AuditWriter:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.buffer: deque[dict] = deque()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.flush_ms_sum = 0.0
+        self.flush_ms_max = 0.0
+
+    def has_room(self) -> bool:
+        return len(self.buffer) < settings.AUDIT_QUEUE_MAX
+
+    def offer(self, row: dict) -> bool:
+        """Queue a row; False when the queue is full (the caller should write it itself)."""
+        if not self.has_room():
+            return False
+        self.enqueue([row])
+        return True
+
+    def enqueue(self, rows: list[dict]) -> None:
+        """Queue already-committed rows, even past AUDIT_QUEUE_MAX (they cannot join a transaction any more)."""
+        self.buffer.extend(rows)
+        self._ensure_running()
+        if len(self.buffer) >= settings.AUDIT_BATCH_SIZE:
+            self._wake.set()
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=settings.AUDIT_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Write everything queued so far in batches; returns rows written."""
+        written = 0
+        while self.buffer:
+            batch = [self.buffer.popleft() for _ in range(min(len(self.buffer), settings.AUDIT_BATCH_SIZE))]
+            started = time.perf_counter()
+            try:
+                async with self.session_factory() as session:
+                    await session.execute(insert(AuditLog), batch)
+                    await session.commit()
+            except asyncio.CancelledError:
+                self.buffer.extendleft(reversed(batch))  # stop() drains it
+                raise
+            except Exception:
+                self.failures += 1
+                logger.warning("Audit flush of %d rows failed; will retry", len(batch), exc_info=True)
+                # keep the batch for the next attempt as far as the queue bound allows
+                room = max(0, settings.AUDIT_QUEUE_MAX - len(self.buffer))
+                self.buffer.extendleft(reversed(batch[:room]))
+                self.dropped += len(batch) - min(room, len(batch))
+                break
+            elapsed = (time.perf_counter() - started) * 1000
+            self.batches += 1
+            self.written += len(batch)
+            self.flush_ms_sum += elapsed
+            self.flush_ms_max = max(self.flush_ms_max, elapsed)
+            written += len(batch)
+        return written
+
+    async def stop(self) -> None:
+        """Stop the background task and drain the queue (app shutdown)."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings.AUDIT_MODE,
+            "queue_depth": len(self.buffer),
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "flush_latency_ms_avg": (self.flush_ms_sum / self.batches) if self.batches else 0,
+            "flush_latency_ms_max": self.flush_ms_max,
+        }
+
+
+writer = AuditWriter()
+
+
+PENDING = "audit_pending"
+
+
+def defer(db: AsyncSession, row: dict) -> None:
+    """Queue ``row`` for the writer when ``db``'s current transaction commits."""
+    session = db.sync_session
+    if not session.in_transaction():
+        session.begin()  # no SQL yet; gives rollback() a transaction to end, and with it these rows
+    session.info.setdefault(PENDING, []).append(row)
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_committed(session: Session) -> None:
+    rows = session.info.pop(PENDING, None)
+    if rows:
+        writer.enqueue(rows)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_rolled_back(session: Session, previous_transaction) -> None:
+    if previous_transaction.parent is None:  # a savepoint rollback keeps the outer transaction's rows
+        session.info.pop(PENDING, None)
@@ -0,0 +1,145 @@
+"""Process-local currency catalog (id/code/name/reserve), versioned through Redis.
+
+Every worker keeps the whole ``currencies`` table in memory and answers code
+and id lookups without a query. A catalog edit (currency created, reserve set
+by an admin) calls ``changed()`` after its commit:
+that marks the local copy stale, increments ``catalog:currencies:version`` and
+publishes the new version on ``catalog:currencies``, and each worker's
+``listen_loop`` marks its copy stale too. The next lookup reloads it with one
+query. ``CATALOG_MAX_AGE`` bounds staleness if a message is missed (Redis
+down).
+
+Reserves in the catalog are for display; decisions that need the current
+reserve (holds, completion) keep reading the database. Order traffic moves
+reserves without announcing it (that would empty every worker's catalog and
+``/currencies`` ETag on each completion): the displayed figure follows
+``currencies.reserve`` as reconciled by the reserve sweep, picked up by the
+``CATALOG_MAX_AGE`` reload. ``codes_fingerprint`` covers codes only, for
+responses that do not show reserves.
+"""
+from __future__ import annotations
+from dataclasses import dataclass
+from sqlalchemy import select
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..core import deps
+from ..core.http_cache import make_etag
+from ..models import Currency
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger("crypto.catalog")
+
+CHANNEL = "catalog:currencies"
+VERSION_KEY = "catalog:currencies:version"
+
+
+@dataclass(frozen=True, slots=True)
+class CurrencyInfo:
+    id: int
+    code: str
+    name: str
+    reserve: float
+
+
+class Catalog:
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+        self.by_id: dict[int, CurrencyInfo] = {}
+        self.by_code: dict[str, CurrencyInfo] = {}
+        self.fingerprint = ""
+        self.codes_fingerprint = ""
+        self.version: int | None = None  # Redis version the loaded copy corresponds to (None if unknown)
+        self.loaded_at = 0.0
+        self.stale = True
+        self.loads = 0
+        self._lock = asyncio.Lock()
+
+    async def _current_version(self) -> int | None:
+        try:
+            return int(await deps.redis_client().get(VERSION_KEY) or 0)
+        except Exception:
+            return None
+
+    async def _load(self) -> None:
+        version = await self._current_version()  # read first: a bump after this triggers another reload
+        async with self.session_factory() as session:
+            rows = (await session.execute(
+                select(Currency.id, Currency.code, Currency.name, Currency.reserve).order_by(Currency.id)
+            )).all()
+        items = [CurrencyInfo(r.id, r.code, r.name, float(r.reserve)) for r in rows]
+        self.by_id = {c.id: c for c in items}
+        self.by_code = {c.code: c for c in items}
+        self.fingerprint = make_etag(*items)  # same data, same ETag on every worker
+        self.codes_fingerprint = make_etag(*self.by_code)
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.stale = False
+        self.loads += 1
+
+    async def refresh(self, force: bool = False) -> "Catalog":
+        """Reload if stale, older than CATALOG_MAX_AGE or ``force``; concurrent callers share one load."""
+        if not force and not self.stale and time.monotonic() - self.loaded_at < settings.CATALOG_MAX_AGE:
+            return self
+        loaded_at = self.loaded_at
+        async with self._lock:
+            if self.loaded_at == loaded_at:  # nobody reloaded while we waited
+                await self._load()
+        return self
+
+    async def get(self, currency_id: int) -> CurrencyInfo | None:
+        """Currency by id; an unknown id forces one reload (it may have been created moments ago)."""
+        await self.refresh()
+        info = self.by_id.get(currency_id)
+        if info is None:
+            info = (await self.refresh(force=True)).by_id.get(currency_id)
+        return info
+
+    async def all(self) -> list[CurrencyInfo]:
+        await self.refresh()
+        return list(self.by_id.values())
+
+    async def codes(self) -> list[str]:
+        await self.refresh()
+        return list(self.by_code)
+
+    def invalidate(self, version: int | None = None) -> None:
+        if version is not None and self.version is not None and version <= self.version:
+            return  # the loaded copy already includes that change
+        self.stale = True
+
+    async def changed(self) -> None:
+        """Announce a committed change to every worker (this one immediately)."""
+        self.invalidate()
+        try:
+            r = deps.redis_client()
+            version = await r.incr(VERSION_KEY)
+            await r.publish(CHANNEL, str(version))
+        except Exception as exc:
+            logger.warning("Catalog change not published (%s); other workers catch up within CATALOG_MAX_AGE", exc)
+
+    def stats(self) -> dict:
+        return {"currencies": len(self.by_id), "loads": self.loads, "age_s": round(time.monotonic() - self.loaded_at, 1)}
+
+
+catalog = Catalog()
+
+
+async def listen_loop() -> None:
+    """Background task: mark the local catalog stale on every published version bump."""
+    while True:
+        pubsub = deps.redis_client().pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            catalog.invalidate()  # changes made while we were not subscribed
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    catalog.invalidate(int(message["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Catalog listener lost Redis; retrying", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
@@ -0,0 +1,86 @@
+"""KYC volume limits backed by running per-user daily counters.
+
+Every order adds its ``amount_to`` to the (user, UTC day) row of
+``user_daily_volumes`` in the transaction that inserts it; cancellation
+subtracts it again. For unverified users the increment is conditional
+(``ON CONFLICT DO UPDATE ... WHERE volume + amount <= limit``), so the limit
+check is one primary-key upsert that stays correct when a user submits orders
+concurrently. ``python -m crypto_exchange.app.services.limits rebuild`` recounts
+a day from the orders table.
+"""
+from __future__ import annotations
+from datetime import date, datetime
+from decimal import Decimal
+from sqlalchemy import Date, delete, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.database import dialect_insert
+from ..models import Order, UserDailyVolume
+from .analytics import day_bucket
+import asyncio
+import sys
+
+
+class LimitExceeded(ValueError):
+    pass
+
+
+def _amount(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+async def add_volume(db: AsyncSession, user_id: int, amount, limit: float | None = None) -> None:
+    """Count ``amount`` towards today's volume; with ``limit``, raise LimitExceeded instead of passing it."""
+    amount = _amount(amount)
+    if limit is not None and amount > _amount(limit):
+        raise LimitExceeded("Daily volume limit exceeded (KYC required)")
+    stmt = dialect_insert(db)(UserDailyVolume).values(user_id=user_id, day=datetime.utcnow().date(), volume=amount)
+    kwargs = {
+        "index_elements": [UserDailyVolume.user_id, UserDailyVolume.day],
+        "set_": {"volume": UserDailyVolume.volume + stmt.excluded.volume},
+    }
+    if limit is None:
+        await db.execute(stmt.on_conflict_do_update(**kwargs))
+        return
+    stmt = stmt.on_conflict_do_update(
+        **kwargs, where=UserDailyVolume.volume + stmt.excluded.volume <= _amount(limit),
+    ).returning(UserDailyVolume.volume)
+    if (await db.execute(stmt)).first() is None:
+        raise LimitExceeded("Daily volume limit exceeded (KYC required)")
+
+
+async def remove_volume(db: AsyncSession, order: Order) -> None:
+    """Give a canceled order's amount back to the day it was created on."""
+    await db.execute(
+        update(UserDailyVolume)
+        .where(UserDailyVolume.user_id == order.user_id, UserDailyVolume.day == order.created_at.date())
+        .values(volume=UserDailyVolume.volume - order.amount_to)
+    )
+
+
+async def rebuild_daily_volumes(db: AsyncSession, day: date | None = None) -> int:
+    """Recount one day's counters (default today) from non-canceled orders; returns rows written."""
+    day = day or datetime.utcnow().date()
+    bucket = day_bucket(db, Order.created_at)
+    source = (
+        select(Order.user_id, bucket, func.sum(Order.amount_to))
+        .where(Order.status != "canceled", bucket == literal(day, Date))
+        .group_by(Order.user_id, bucket)
+    )
+    await db.execute(delete(UserDailyVolume).where(UserDailyVolume.day == day))
+    result = await db.execute(insert(UserDailyVolume).from_select(["user_id", "day", "volume"], source))
+    await db.commit()
+    return result.rowcount
+
+
+async def _main(argv: list[str]) -> None:
+    from ..core.database import SessionLocal
+    if not argv or argv[0] != "rebuild":
+        sys.exit("usage: python -m crypto_exchange.app.services.limits rebuild [YYYY-MM-DD]")
+    day = date.fromisoformat(argv[1]) if len(argv) > 1 else None
+    async with SessionLocal() as session:
+        rows = await rebuild_daily_volumes(session, day)
+    print(f"user_daily_volumes: {rows} rows rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(_main(sys.argv[1:]))
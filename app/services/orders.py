@@ -4,35 +4,71 @@ This centralizes side-effect logic so routers stay thin.
 """
 from __future__ import annotations
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
-from ..models import AuditLog, Order, Currency
+from sqlalchemy import update
+from sqlalchemy.orm.attributes import set_committed_value
+from datetime import datetime
+from ..core.config import settings
+from ..core.database import dialect_insert
+from ..models import AuditLog, Order, OrderCompletion
+from . import analytics, audit, reserves
 
 
 async def log_action(db: AsyncSession, user_id: int | None, action: str, data: str | None = None):
-	db.add(AuditLog(user_id=user_id, action=action, details=data))
-	await db.commit()
+	"""Record an audit entry; call before the business commit, this does not commit.
 
+	In async mode the row goes to the batched writer once the caller's
+	transaction commits (nothing if it rolls back), unless the writer's queue
+	is full, in which case (and in sync mode) it joins the caller's transaction.
+	"""
+	row = {"user_id": user_id, "action": action, "details": data, "created_at": datetime.utcnow()}
+	if settings.AUDIT_MODE == "async" and audit.writer.has_room():
+		audit.defer(db, row)
+		return
+	db.add(AuditLog(**row))
+
+
+async def transition(db: AsyncSession, order: Order, status: str) -> bool:
+	"""Move ``order`` from the status it was read with to ``status``; False if that status changed meanwhile.
 
-async def ensure_reserve_sufficient(db: AsyncSession, currency_id: int, amount: float):
-	cur = await db.get(Currency, currency_id)
-	if not cur:
-		raise ValueError("Currency missing")
-	if float(cur.reserve) < float(amount):
-		raise ValueError("Insufficient reserve")
-	return cur
+	One conditional UPDATE (``WHERE status = <read status>``), so of two
+	concurrent changes (payment, admin cancel, expiry sweep) only one applies,
+	and only that one should run its side effects. Updates the rollup; does not commit.
+	"""
+	prev = order.status
+	matched = (await db.execute(
+		update(Order)
+		.where(Order.id == order.id, Order.status == prev)
+		.values(status=status)
+		.returning(Order.id)
+		.execution_options(synchronize_session=False)
+	)).first()
+	if matched is None:
+		return False
+	set_committed_value(order, "status", status)
+	await analytics.record_status_change(db, order, prev)
+	return True
 
 
 async def deduct_reserve_once(db: AsyncSession, order: Order):
 	"""Idempotently deduct reserve for completed order.
-	Checks if a prior completion audit exists to avoid double deduction.
+
+	Claims the order in order_completions (unique order_id) and converts its
+	reserve hold (orders without one take from the shards), in a savepoint:
+	concurrent workers can neither deduct twice nor overdraw. The currencies
+	row is not touched; ``reserves.reconcile_reserves`` updates it later.
+	Does not commit; the caller commits together with the status change.
 	"""
-	exists = await db.execute(select(AuditLog).where(AuditLog.action=="order.complete", AuditLog.details==f"order_id={order.id}"))
-	if exists.scalars().first():
+	claim = dialect_insert(db)(OrderCompletion).values(
+		order_id=order.id, currency_id=order.to_currency, amount=order.amount_to, created_at=datetime.utcnow(),
+	).on_conflict_do_nothing(index_elements=[OrderCompletion.order_id]).returning(OrderCompletion.id)
+	try:
+		async with db.begin_nested():
+			if (await db.execute(claim)).first() is None:
+				return False
+			if not await reserves.convert_hold(db, order.id):
+				# orders placed before reserve holds existed draw on the available pool now
+				await reserves.take(db, order.to_currency, order.amount_to)
+	except reserves.InsufficientReserve:
 		return False
-	cur = await db.get(Currency, order.to_currency)
-	if cur and float(cur.reserve) >= float(order.amount_to):
-		cur.reserve = float(cur.reserve) - float(order.amount_to)
-		db.add(AuditLog(user_id=order.user_id, action="order.complete", details=f"order_id={order.id}"))
-		await db.commit()
-		return True
-	return False
+	db.add(AuditLog(user_id=order.user_id, action="order.complete", details=f"order_id={order.id}"))
+	return True
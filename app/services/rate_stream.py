@@ -0,0 +1,163 @@
+"""Server-pushed rate feed (SSE) fanned out from one upstream refresh stream.
+
+Whichever worker fetches prices publishes them on the Redis channel
+``rates:updates``; every worker runs one listener that hands each tick to its
+local subscribers. Subscribers hold only the latest price per symbol, so a
+slow client skips intermediate ticks instead of buffering them.
+"""
+from __future__ import annotations
+from ..core.config import settings
+from ..core import deps
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Awaitable, Callable
+import asyncio
+import json
+import logging
+import time
+import redis.asyncio as redis
+
+logger = logging.getLogger("crypto.rate_stream")
+
+CHANNEL = "rates:updates"
+
+
+class Subscriber:
+    def __init__(self, symbols: set[str] | None):
+        self.symbols = symbols  # None = every symbol
+        self.pending: dict[str, float] = {}
+        self.ready = asyncio.Event()
+
+    def offer(self, prices: dict[str, float]) -> int:
+        """Merge a tick into the pending snapshot; returns how many unsent prices it replaced."""
+        wanted = prices if self.symbols is None else {s: p for s, p in prices.items() if s in self.symbols}
+        if not wanted:
+            return 0
+        dropped = sum(1 for s in wanted if s in self.pending)
+        self.pending.update(wanted)
+        self.ready.set()
+        return dropped
+
+    def take(self) -> dict[str, float]:
+        snapshot, self.pending = self.pending, {}
+        self.ready.clear()
+        return snapshot
+
+
+class RateHub:
+    """Process-local fan-out of rate ticks to SSE subscribers."""
+
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        self.connections_total = 0
+        self.ticks = 0
+        self.messages_dropped = 0
+        self.fanout_ms_sum = 0.0
+        self.fanout_ms_max = 0.0
+
+    def subscribe(self, symbols: set[str] | None = None) -> Subscriber:
+        if len(self.subscribers) >= settings.RATE_STREAM_MAX_CLIENTS:
+            raise OverflowError("Too many rate stream clients")
+        sub = Subscriber(symbols)
+        self.subscribers.add(sub)
+        self.connections_total += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        self.subscribers.discard(sub)
+
+    def dispatch(self, prices: dict[str, float], published_at: float) -> None:
+        for sub in self.subscribers:
+            self.messages_dropped += sub.offer(prices)
+        elapsed = max(0.0, (time.time() - published_at) * 1000)
+        self.ticks += 1
+        self.fanout_ms_sum += elapsed
+        self.fanout_ms_max = max(self.fanout_ms_max, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.subscribers),
+            "connections_total": self.connections_total,
+            "ticks": self.ticks,
+            "messages_dropped": self.messages_dropped,
+            "fanout_latency_ms_avg": (self.fanout_ms_sum / self.ticks) if self.ticks else 0,
+            "fanout_latency_ms_max": self.fanout_ms_max,
+        }
+
+
+hub = RateHub()
+
+
+async def publish(prices: dict[str, float], r: redis.Redis, ts: float | None = None) -> None:
+    """Announce freshly fetched prices to every worker (locally if Redis pub/sub is unavailable)."""
+    ts = ts or time.time()
+    try:
+        await r.publish(CHANNEL, json.dumps({"prices": prices, "ts": ts}))
+    except Exception:
+        logger.debug("Rate publish via Redis failed; dispatching locally", exc_info=True)
+        hub.dispatch(prices, ts)
+
+
+async def listen_loop() -> None:
+    """Background task: relay Redis ``rates:updates`` messages into the local hub."""
+    while True:
+        pubsub = deps.redis_client().pubsub()
+        try:
+            await pubsub.subscribe(CHANNEL)
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                data = json.loads(message["data"])
+                hub.dispatch(data["prices"], data["ts"])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Rate stream listener lost Redis; retrying", exc_info=True)
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.aclose()
+
+
+def _event(data: dict) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+async def event_stream(sub: Subscriber, snapshot: Callable[[], Awaitable[dict]]) -> AsyncIterator[str]:
+    """SSE body for an already reserved subscriber: initial snapshot, then merged updates and heartbeats.
+
+    Ticks arriving while ``snapshot()`` runs are sent right after it.
+    """
+    try:
+        yield f"retry: {settings.RATE_STREAM_RETRY_MS}\n" + _event(await snapshot())
+        while True:
+            try:
+                await asyncio.wait_for(sub.ready.wait(), timeout=settings.RATE_STREAM_HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield _event(sub.take())
+    finally:
+        hub.unsubscribe(sub)
+
+
+class RateStreamResponse(StreamingResponse):
+    """SSE response owning a hub slot.
+
+    The caller reserves the slot with ``hub.subscribe`` before returning the
+    response, so an overflow can still become a 503. The slot is released
+    however the response ends, including when the body never starts because
+    sending the headers failed.
+    """
+
+    def __init__(self, sub: Subscriber, snapshot: Callable[[], Awaitable[dict]]):
+        super().__init__(
+            event_stream(sub, snapshot),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.sub = sub
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            hub.unsubscribe(self.sub)
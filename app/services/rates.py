@@ -0,0 +1,280 @@
+"""Rate provider: Binance public ticker prices cached in Redis.
+
+Lookups are batched: one MGET for the requested ``rate:*`` keys, one upstream
+``ticker/price?symbols=[...]`` call for the misses and one pipelined write of
+the results.
+
+Cache misses are single-flight: within a process concurrent callers for the
+same symbol share one in-flight fetch, and across processes a short Redis lock
+(``SET NX PX``) lets one worker refresh while the others wait for the cache.
+
+Cached rates are fresh for ``RATE_CACHE_TTL`` seconds; after that they are
+served as-is (stale-while-revalidate) for up to ``RATE_STALE_TTL`` while a
+refresh runs in the background. ``refresh_loop`` keeps the active pairs warm
+so request paths rarely see a miss at all.
+"""
+from __future__ import annotations
+from fastapi import HTTPException
+from typing import NamedTuple
+from ..core.config import settings
+from ..core import deps
+from . import rate_stream
+from .catalog import catalog
+import asyncio
+import json
+import logging
+import re
+import secrets
+import time
+import redis.asyncio as redis
+
+logger = logging.getLogger("crypto.rates")
+
+_inflight: dict[str, asyncio.Future] = {}
+_tasks: set[asyncio.Task] = set()  # strong refs to running batch refreshes
+
+
+class Quote(NamedTuple):
+    price: float
+    ts: float  # unix time the price was fetched upstream
+
+    @property
+    def age(self) -> float:
+        return max(0.0, time.time() - self.ts)
+
+
+def validate_symbol(pair: str) -> str:
+    symbol = pair.upper()
+    if not re.fullmatch(r"[A-Z0-9]{5,15}", symbol):
+        raise HTTPException(status_code=400, detail="Bad symbol")
+    if not any(symbol.endswith(q) for q in settings.ALLOWED_RATE_QUOTES):
+        raise HTTPException(status_code=400, detail="Quote not allowed")
+    return symbol
+
+
+def _quote(payload: str | None) -> Quote | None:
+    if not payload:
+        return None
+    try:
+        data = json.loads(payload)
+        return Quote(float(data["price"]), float(data.get("ts", 0)))
+    except Exception:
+        return None
+
+
+async def get_rate(pair: str, r: redis.Redis | None = None) -> float:
+    """Get rate with validation & resilient fallback.
+
+    Flow:
+      1. Validate symbol (A-Z only) and allowed quote.
+      2. Try cache rate:<pair>; a stale hit is returned and refreshed in the background.
+      3. On miss: join (or start) the single in-flight refresh for the symbol.
+      4. If Binance fails: fallback to last_good:<pair> else 502.
+    """
+    symbol = validate_symbol(pair)
+    result = (await _resolve([symbol], r or deps.redis_client()))[symbol]
+    if isinstance(result, Exception):
+        raise result
+    return result.price
+
+
+async def get_many_quotes(pairs: list[str], r: redis.Redis | None = None) -> dict[str, Quote | None]:
+    """Batch lookup keyed by the given pairs; None for invalid or unavailable ones."""
+    symbols: dict[str, str] = {}
+    for pair in pairs:
+        try:
+            symbols[pair] = validate_symbol(pair)
+        except HTTPException:
+            continue
+    resolved = await _resolve(list(dict.fromkeys(symbols.values())), r or deps.redis_client()) if symbols else {}
+    out: dict[str, Quote | None] = {}
+    for pair in pairs:
+        value = resolved.get(symbols.get(pair))
+        out[pair] = None if value is None or isinstance(value, Exception) else value
+    return out
+
+
+async def get_many_rates(pairs: list[str], r: redis.Redis | None = None) -> dict[str, float | None]:
+    """Batch variant of get_rate keyed by the given pairs; None for invalid or unavailable ones."""
+    quotes = await get_many_quotes(pairs, r)
+    return {pair: q.price if q else None for pair, q in quotes.items()}
+
+
+async def _resolve(symbols: list[str], r: redis.Redis) -> dict[str, Quote | Exception]:
+    cached = await r.mget([f"rate:{s}" for s in symbols])
+    out: dict[str, Quote | Exception] = {}
+    misses: list[str] = []
+    stale: list[str] = []
+    for symbol, payload in zip(symbols, cached):
+        quote = _quote(payload)
+        if quote is None:
+            misses.append(symbol)
+            continue
+        out[symbol] = quote
+        if quote.age > settings.RATE_CACHE_TTL:
+            stale.append(symbol)
+    # stale hits are answered now; their refresh runs without anyone waiting on it
+    _start_refresh([s for s in stale if s not in _inflight], r, wait=False)
+    if not misses:
+        return out
+    _start_refresh([s for s in misses if s not in _inflight], r)
+    # shield: a cancelled caller must not cancel the fetch others are awaiting
+    results = await asyncio.gather(*(asyncio.shield(_inflight[s]) for s in misses), return_exceptions=True)
+    out.update(zip(misses, results))
+    return out
+
+
+def _start_refresh(symbols: list[str], r: redis.Redis, wait: bool = True) -> list[asyncio.Future]:
+    """Register one future per symbol and resolve them all from a single batch refresh."""
+    if not symbols:
+        return []
+    loop = asyncio.get_running_loop()
+    futures = {s: loop.create_future() for s in symbols}
+    for fut in futures.values():
+        # background refreshes may have no awaiter; mark their errors as retrieved
+        fut.add_done_callback(lambda f: f.cancelled() or f.exception())
+    _inflight.update(futures)
+
+    async def run():
+        try:
+            results: dict[str, Quote | Exception] = await _refresh_locked(symbols, r, wait)
+        except Exception as exc:
+            results = {s: exc for s in symbols}
+        for symbol, fut in futures.items():
+            _inflight.pop(symbol, None)
+            value = results[symbol]
+            if isinstance(value, Exception):
+                fut.set_exception(value)
+            else:
+                fut.set_result(value)
+
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return list(futures.values())
+
+
+async def _refresh_locked(symbols: list[str], r: redis.Redis, wait: bool = True) -> dict[str, Quote | Exception]:
+    """Refresh symbols, fetching upstream only those whose Redis lock this process wins.
+
+    Symbols locked by another worker are awaited from the cache when ``wait``
+    is set, otherwise answered from last_good right away.
+    """
+    token = secrets.token_hex(8)
+    async with r.pipeline(transaction=False) as pipe:
+        for s in symbols:
+            pipe.set(f"rate_lock:{s}", token, nx=True, px=settings.RATE_LOCK_TTL_MS)
+        won = await pipe.execute()
+    owned = [s for s, ok in zip(symbols, won) if ok]
+    waiting = [s for s, ok in zip(symbols, won) if not ok]
+    results: dict[str, Quote | Exception] = {}
+    if owned:
+        try:
+            results.update(await _fetch(owned, r))
+        finally:
+            # release only our own locks; they may have expired during a slow fetch
+            held = await r.mget([f"rate_lock:{s}" for s in owned])
+            mine = [f"rate_lock:{s}" for s, v in zip(owned, held) if v == token]
+            if mine:
+                await r.delete(*mine)
+    if waiting and wait:
+        # other workers are refreshing these: wait for their results to land in the cache
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.RATE_LOCK_TTL_MS / 1000
+        while waiting and loop.time() < deadline:
+            await asyncio.sleep(settings.RATE_LOCK_POLL_INTERVAL)
+            cached = await r.mget([f"rate:{s}" for s in waiting])
+            for s, payload in zip(list(waiting), cached):
+                quote = _quote(payload)
+                if quote is not None and quote.age <= settings.RATE_CACHE_TTL:
+                    results[s] = quote
+                    waiting.remove(s)
+    results.update(await _fallback(waiting, r))
+    return results
+
+
+async def _fetch_upstream(symbols: list[str]) -> dict[str, float]:
+    base_url = str(settings.BINANCE_PUBLIC_URL).rstrip("/")
+    if len(symbols) == 1:
+        params = {"symbol": symbols[0]}
+    else:
+        params = {"symbols": json.dumps(symbols, separators=(",", ":"))}
+    resp = await deps.http_client().get(f"{base_url}/api/v3/ticker/price", params=params)
+    resp.raise_for_status()
+    data = resp.json()
+    rows = data if isinstance(data, list) else [data]
+    return {row["symbol"]: float(row["price"]) for row in rows}
+
+
+async def _fetch(symbols: list[str], r: redis.Redis) -> dict[str, Quote | Exception]:
+    try:
+        prices = await _fetch_upstream(symbols)
+    except Exception:
+        if len(symbols) == 1:
+            prices = {}
+        else:
+            # Binance rejects the whole batch if one symbol is unknown; retry one by one
+            singles = await asyncio.gather(*(_fetch_upstream([s]) for s in symbols), return_exceptions=True)
+            prices = {k: v for one in singles if isinstance(one, dict) for k, v in one.items()}
+    now = time.time()
+    if prices:
+        async with r.pipeline(transaction=False) as pipe:
+            for symbol, price in prices.items():
+                payload = json.dumps({"price": price, "ts": now})
+                pipe.set(f"rate:{symbol}", payload, ex=settings.RATE_STALE_TTL)
+                pipe.set(f"last_good:{symbol}", payload)
+            await pipe.execute()
+        await rate_stream.publish(prices, r, now)
+    results: dict[str, Quote | Exception] = {s: Quote(prices[s], now) for s in symbols if s in prices}
+    results.update(await _fallback([s for s in symbols if s not in prices], r))
+    return results
+
+
+async def _fallback(symbols: list[str], r: redis.Redis) -> dict[str, Quote | Exception]:
+    if not symbols:
+        return {}
+    saved = await r.mget([f"last_good:{s}" for s in symbols])
+    out: dict[str, Quote | Exception] = {}
+    for symbol, payload in zip(symbols, saved):
+        quote = _quote(payload)
+        out[symbol] = quote if quote is not None else HTTPException(status_code=502, detail="Rate provider error (no fallback)")
+    return out
+
+
+async def active_pairs() -> list[str]:
+    """Pairs worth keeping warm: listed currency codes x ALLOWED_RATE_QUOTES (from the in-memory catalog)."""
+    codes = await catalog.codes()
+    return [f"{c}{q}" for c in codes for q in settings.ALLOWED_RATE_QUOTES if c != q]
+
+
+async def refresh_due(pairs: list[str], r: redis.Redis | None = None) -> int:
+    """Refresh the pairs whose cached rate is older than the refresh interval; returns how many."""
+    r = r or deps.redis_client()
+    symbols = []
+    for pair in pairs:
+        try:
+            symbols.append(validate_symbol(pair))
+        except HTTPException:
+            continue
+    if not symbols:
+        return 0
+    cached = await r.mget([f"rate:{s}" for s in symbols])
+    due = [
+        s for s, payload in zip(symbols, cached)
+        if s not in _inflight and ((q := _quote(payload)) is None or q.age >= settings.RATE_REFRESH_INTERVAL)
+    ]
+    # wait=False: pairs another worker is already refreshing are simply skipped
+    await asyncio.gather(*_start_refresh(due, r, wait=False), return_exceptions=True)
+    return len(due)
+
+
+async def refresh_loop() -> None:
+    """Background task started at app startup; keeps all active pairs warm."""
+    while True:
+        try:
+            await refresh_due(await active_pairs())
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Background rate refresh failed", exc_info=True)
+        await asyncio.sleep(settings.RATE_REFRESH_INTERVAL)
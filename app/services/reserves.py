@@ -0,0 +1,232 @@
+"""Reserve holds: liquidity is set aside when an order is created.
+
+Each currency's unheld reserve is spread over ``RESERVE_SHARDS`` rows of
+``reserve_shards``. Placing a hold is a conditional decrement of one random
+shard (``available >= amount``), so concurrent orders on the same currency
+mostly lock different rows; only when no single shard fits does the hold draw
+from several. Once a currency has shards its reserve *is*
+
+    sum(reserve_shards.available) + sum(active holds)
+
+A hold is released back into a shard when its order is canceled or expires
+unpaid, and converted (leaves the total) when the order completes, so no
+order path writes the single ``currencies`` row. ``currencies.reserve`` is a
+display copy that ``reconcile_reserves`` brings up to date on every sweep;
+``total`` gives the live figure.
+"""
+from __future__ import annotations
+from datetime import datetime, timedelta
+from decimal import ROUND_DOWN, Decimal
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..core.config import settings
+from ..core.database import SessionLocal, dialect_insert
+from ..models import Currency, Order, ReserveHold, ReserveShard
+from . import limits
+import asyncio
+import logging
+import random
+
+logger = logging.getLogger("crypto.reserves")
+
+EXPIRABLE = ("new", "pending_payment")  # paid orders keep their hold until completed or canceled
+
+
+class InsufficientReserve(ValueError):
+    pass
+
+
+def _amount(value) -> Decimal:
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+async def _init_shards(db: AsyncSession, currency_id: int) -> None:
+    """Split reserve minus active holds over the shards (no-op if another worker did it first)."""
+    reserve = (await db.execute(select(Currency.reserve).where(Currency.id == currency_id))).scalar_one_or_none()
+    if reserve is None:
+        raise InsufficientReserve("Currency missing")
+    held = (await db.execute(
+        select(func.coalesce(func.sum(ReserveHold.amount), 0))
+        .where(ReserveHold.currency_id == currency_id, ReserveHold.status == "active")
+    )).scalar_one()
+    free = max(_amount(reserve) - _amount(held), Decimal(0))
+    n = settings.RESERVE_SHARDS
+    part = (free / n).quantize(Decimal("0.00000001"), rounding=ROUND_DOWN)
+    rows = [{"currency_id": currency_id, "shard": i, "available": part} for i in range(n)]
+    rows[0]["available"] = free - part * (n - 1)
+    await db.execute(
+        dialect_insert(db)(ReserveShard).values(rows)
+        .on_conflict_do_nothing(index_elements=[ReserveShard.currency_id, ReserveShard.shard])
+    )
+
+
+async def _take_from(db: AsyncSession, currency_id: int, shard: int, amount: Decimal) -> bool:
+    res = await db.execute(
+        update(ReserveShard)
+        .where(ReserveShard.currency_id == currency_id, ReserveShard.shard == shard, ReserveShard.available >= amount)
+        .values(available=ReserveShard.available - amount)
+        .returning(ReserveShard.shard)
+    )
+    return res.first() is not None
+
+
+async def _give(db: AsyncSession, currency_id: int, amount: Decimal, shard: int | None = None) -> None:
+    # matches nothing if the shards are not initialized yet; they are then derived from the reserve
+    shard = random.randrange(settings.RESERVE_SHARDS) if shard is None else shard
+    await db.execute(
+        update(ReserveShard)
+        .where(ReserveShard.currency_id == currency_id, ReserveShard.shard == shard)
+        .values(available=ReserveShard.available + amount)
+    )
+
+
+async def _shards(db: AsyncSession, currency_id: int) -> list:
+    return (await db.execute(
+        select(ReserveShard.shard, ReserveShard.available)
+        .where(ReserveShard.currency_id == currency_id)
+        .order_by(ReserveShard.available.desc())
+    )).all()
+
+
+async def take(db: AsyncSession, currency_id: int, amount) -> None:
+    """Remove ``amount`` from the currency's available liquidity or raise InsufficientReserve."""
+    amount = _amount(amount)
+    if await _take_from(db, currency_id, random.randrange(settings.RESERVE_SHARDS), amount):
+        return
+    rows = await _shards(db, currency_id)
+    if not rows:
+        await _init_shards(db, currency_id)
+        rows = await _shards(db, currency_id)
+    # slow path: largest shard first, then split the amount across shards
+    taken: list[tuple[int, Decimal]] = []
+    remaining = amount
+    for shard, available in rows:
+        part = min(_amount(available), remaining)
+        if part > 0 and await _take_from(db, currency_id, shard, part):
+            taken.append((shard, part))
+            remaining -= part
+        if remaining <= 0:
+            return
+    for shard, part in taken:
+        await _give(db, currency_id, part, shard)
+    raise InsufficientReserve("Insufficient reserve")
+
+
+async def place_hold(db: AsyncSession, order: Order) -> ReserveHold:
+    """Hold ``order.amount_to`` of the target currency; call after the order is flushed."""
+    await take(db, order.to_currency, order.amount_to)
+    hold = ReserveHold(
+        order_id=order.id,
+        currency_id=order.to_currency,
+        amount=order.amount_to,
+        status="active",
+        expires_at=datetime.utcnow() + timedelta(seconds=settings.RESERVE_HOLD_TTL),
+    )
+    db.add(hold)
+    return hold
+
+
+async def _finish(db: AsyncSession, order_id: int, status: str):
+    return (await db.execute(
+        update(ReserveHold)
+        .where(ReserveHold.order_id == order_id, ReserveHold.status == "active")
+        .values(status=status)
+        .returning(ReserveHold.currency_id, ReserveHold.amount)
+    )).first()
+
+
+async def release_hold(db: AsyncSession, order_id: int) -> bool:
+    """Return an active hold's amount to the available pool (cancel/expiry)."""
+    row = await _finish(db, order_id, "released")
+    if row is None:
+        return False
+    await _give(db, row.currency_id, _amount(row.amount))
+    return True
+
+
+async def convert_hold(db: AsyncSession, order_id: int) -> bool:
+    """Mark an active hold as consumed by completion; False if the order had none."""
+    return await _finish(db, order_id, "converted") is not None
+
+
+async def total(db: AsyncSession, currency_id: int) -> Decimal | None:
+    """Live reserve: shards plus active holds, or ``currencies.reserve`` while there are no shards."""
+    available = (await db.execute(
+        select(func.sum(ReserveShard.available)).where(ReserveShard.currency_id == currency_id)
+    )).scalar_one()
+    if available is None:
+        reserve = (await db.execute(select(Currency.reserve).where(Currency.id == currency_id))).scalar_one_or_none()
+        return None if reserve is None else _amount(reserve)
+    held = (await db.execute(
+        select(func.coalesce(func.sum(ReserveHold.amount), 0))
+        .where(ReserveHold.currency_id == currency_id, ReserveHold.status == "active")
+    )).scalar_one()
+    return _amount(available) + _amount(held)
+
+
+async def set_reserve(db: AsyncSession, currency: Currency, reserve) -> None:
+    """Admin reserve change: apply the delta to the available pool, then the reserve itself.
+
+    Raises InsufficientReserve if the new reserve would not cover active holds.
+    """
+    # shards not initialized yet are derived from the old reserve inside take()
+    delta = _amount(reserve) - await total(db, currency.id)
+    if delta > 0:
+        await _give(db, currency.id, delta)
+    elif delta < 0:
+        await take(db, currency.id, -delta)
+    currency.reserve = reserve
+
+
+async def expire_holds(db: AsyncSession, limit: int = 500) -> int:
+    """Cancel unpaid orders whose hold outlived RESERVE_HOLD_TTL and release their holds."""
+    orders = (await db.execute(
+        select(Order)
+        .join(ReserveHold, ReserveHold.order_id == Order.id)
+        .where(ReserveHold.status == "active", ReserveHold.expires_at < datetime.utcnow(), Order.status.in_(EXPIRABLE))
+        .limit(limit)
+    )).scalars().all()
+    from .orders import transition  # services.orders imports this module
+    expired = 0
+    for order in orders:
+        if not await transition(db, order, "canceled"):
+            continue  # paid (or canceled) since the SELECT
+        await release_hold(db, order.id)
+        await limits.remove_volume(db, order)
+        expired += 1
+    await db.commit()
+    return expired
+
+
+async def reconcile_reserves(db: AsyncSession) -> int:
+    """Copy each sharded currency's live total into ``currencies.reserve``; returns rows changed."""
+    available = select(func.sum(ReserveShard.available)).where(ReserveShard.currency_id == Currency.id).scalar_subquery()
+    held = (
+        select(func.coalesce(func.sum(ReserveHold.amount), 0))
+        .where(ReserveHold.currency_id == Currency.id, ReserveHold.status == "active")
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        update(Currency)
+        .where(available.is_not(None), Currency.reserve != available + held)
+        .values(reserve=available + held)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def expiry_loop() -> None:
+    """Background task started at app startup; cancels expired unpaid orders and reconciles reserves."""
+    while True:
+        try:
+            async with SessionLocal() as session:
+                expired = await expire_holds(session)
+                await reconcile_reserves(session)
+            if expired:
+                logger.info("Released %d expired reserve holds", expired)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Reserve hold sweep failed", exc_info=True)
+        await asyncio.sleep(settings.RESERVE_SWEEP_INTERVAL)
@@ -1,17 +1,36 @@
 // Admin page specific logic
 const statuses=["pending_payment","paid","processing","completed","canceled"];
 
-async function fetchOrders(){
+let nextCursor=null;
+
+function orderQuery(){
+  const params=new URLSearchParams();
+  const st=document.getElementById('filterStatus').value.trim();
+  const cur=document.getElementById('filterCurrency')?.value.trim();
+  const from=document.getElementById('filterFrom')?.value;
+  const to=document.getElementById('filterTo')?.value;
+  if(st) params.set('status',st);
+  if(cur) params.set('to_currency',cur);
+  if(from) params.set('created_from',from+'T00:00:00');
+  if(to){const d=new Date(to+'T00:00:00Z');d.setUTCDate(d.getUTCDate()+1);params.set('created_to',d.toISOString().slice(0,19));}
+  return params;
+}
+
+// append=false: reload from the newest order; true: next page after nextCursor
+async function fetchOrders(append=false){
   const token=localStorage.getItem('token');
   if(!token){return;}
-  const st = document.getElementById('filterStatus').value.trim();
-  const qs = st?`?status=${encodeURIComponent(st)}`:'';
+  const params=orderQuery();
+  if(append && nextCursor) params.set('cursor',nextCursor);
+  const qs=params.toString()?`?${params}`:'';
   const r = await fetch('/orders'+qs,{headers:{Authorization:'Bearer '+token}});
   if(!r.ok) return;
   const data = await r.json();
+  nextCursor=r.headers.get('X-Next-Cursor');
+  document.getElementById('moreBtn')?.classList.toggle('hidden',!nextCursor);
   const tb = document.querySelector('#ordersTbl tbody');
   if(!tb) return;
-  tb.innerHTML='';
+  if(!append) tb.innerHTML='';
   data.forEach(o=>{
     const tr=document.createElement('tr');
     tr.className='border-b';
@@ -49,7 +68,8 @@ async function updateStatus(id,s){
 }
 
 function initAdmin(){
-  document.getElementById('reloadBtn')?.addEventListener('click', fetchOrders);
+  document.getElementById('reloadBtn')?.addEventListener('click', ()=>fetchOrders());
+  document.getElementById('moreBtn')?.addEventListener('click', ()=>fetchOrders(true));
   fetchOrders();
   loadAnalytics();
 }
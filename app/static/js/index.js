@@ -13,6 +13,8 @@ let currencies=[];
 let currentUserData=null;
 let currentRate=null;
 let rateTimer=null;
+let rateStream=null;
+let streamSymbol=null;
 
 async function api(path, opts={}){
   const token=localStorage.getItem('token');
@@ -49,22 +51,31 @@ function updateLimitsAndReserve(){
   } else { limitsInfo.textContent=''; }
 }
 
-async function updateRate(){
+function selectedPair(){
   const fromSel=document.getElementById('fromCurrency');
   const toSel=document.getElementById('toCurrency');
-  if(!fromSel||!toSel || !fromSel.value || !toSel.value) return;
+  if(!fromSel||!toSel || !fromSel.value || !toSel.value) return null;
   const fromCur=currencies.find(c=>c.id==fromSel.value); const toCur=currencies.find(c=>c.id==toSel.value);
-  if(!fromCur||!toCur){return;}
-  const symbol=(fromCur.code+toCur.code).toUpperCase();
-  const {ok,json}=await api('/public/rates?symbols='+symbol, {headers:{}});
+  if(!fromCur||!toCur){return null;}
+  return {fromCur, toCur, symbol:(fromCur.code+toCur.code).toUpperCase()};
+}
+
+function applyRate(pair, rate){
+  currentRate=rate;
+  if(currentRate){
+    const rateInfo=document.getElementById('rateInfo');
+    if(rateInfo) rateInfo.textContent=`Курс: 1 ${pair.fromCur.code} = ${fmt(currentRate,6)} ${pair.toCur.code}`;
+    recalcTo();
+  }
+}
+
+async function updateRate(){
+  const pair=selectedPair();
+  if(!pair) return;
+  const {ok,json}=await api('/public/rates?symbols='+pair.symbol, {headers:{}});
   if(ok){
     const data=await json();
-    currentRate=data[symbol];
-    if(currentRate){
-      const rateInfo=document.getElementById('rateInfo');
-      if(rateInfo) rateInfo.textContent=`Курс: 1 ${fromCur.code} = ${fmt(currentRate,6)} ${toCur.code}`;
-      recalcTo();
-    }
+    applyRate(pair, data[pair.symbol]);
   }
 }
 
@@ -82,7 +93,7 @@ function swap(){
   const toSel=document.getElementById('toCurrency');
   if(!fromSel||!toSel) return;
   const i=fromSel.selectedIndex; fromSel.selectedIndex=toSel.selectedIndex; toSel.selectedIndex=i;
-  updateLimitsAndReserve(); updateRate(); recalcTo();
+  updateLimitsAndReserve(); updateRate(); openRateStream(); recalcTo();
 }
 
 async function loadUser(){
@@ -189,19 +200,37 @@ document.getElementById('exchangeForm')?.addEventListener('submit', async e=>{
   if(ok){toast('Заявка создана'); loadMyOrders(); showOrder(data.id);} else {toast(data?.detail||'Ошибка создания', false);}
 });
 
-document.getElementById('fromCurrency')?.addEventListener('change', ()=>{updateLimitsAndReserve(); updateRate(); recalcTo();});
-document.getElementById('toCurrency')?.addEventListener('change', ()=>{updateLimitsAndReserve(); updateRate(); recalcTo();});
+document.getElementById('fromCurrency')?.addEventListener('change', ()=>{updateLimitsAndReserve(); updateRate(); openRateStream(); recalcTo();});
+document.getElementById('toCurrency')?.addEventListener('change', ()=>{updateLimitsAndReserve(); updateRate(); openRateStream(); recalcTo();});
 document.getElementById('amountFrom')?.addEventListener('input', recalcTo);
 document.getElementById('swapBtn')?.addEventListener('click', swap);
 document.getElementById('refreshOrders')?.addEventListener('click', loadMyOrders);
 
 function scheduleRate(){ if(rateTimer) clearInterval(rateTimer); rateTimer=setInterval(updateRate,15000); }
+function stopPolling(){ if(rateTimer){clearInterval(rateTimer); rateTimer=null;} }
+
+// Server push for the selected pair; interval polling only while the stream is unavailable
+function openRateStream(){
+  const pair=selectedPair();
+  if(!pair || !window.EventSource){ scheduleRate(); return; }
+  if(rateStream && rateStream.readyState!==EventSource.CLOSED && streamSymbol===pair.symbol) return;
+  if(rateStream) rateStream.close();
+  streamSymbol=pair.symbol;
+  rateStream=new EventSource('/public/rates/stream?symbols='+encodeURIComponent(pair.symbol));
+  rateStream.onopen=stopPolling;
+  rateStream.onmessage=e=>{
+    const data=JSON.parse(e.data);
+    const cur=selectedPair();
+    if(cur && cur.symbol===streamSymbol && data[streamSymbol]!=null) applyRate(cur, data[streamSymbol]);
+  };
+  rateStream.onerror=()=>{ if(!rateTimer) scheduleRate(); };  // EventSource keeps reconnecting meanwhile
+}
 
 async function initIndex(){
   await loadCurrencies();
   await loadUser();
   await loadMyOrders();
-  scheduleRate();
+  openRateStream();
 }
 
 document.addEventListener('DOMContentLoaded', initIndex);
@@ -0,0 +1,56 @@
+"""Minimal keep-alive HTTP/1.1 stub of the Binance ticker endpoint for benchmarks."""
+from __future__ import annotations
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+
+class StubUpstream:
+    """Serves /api/v3/ticker/price and counts accepted connections and requests."""
+
+    def __init__(self, latency: float = 0.005, price: float = 100.0):
+        self.latency = latency
+        self.price = price
+        self.connections = 0
+        self.requests = 0
+        self._server: asyncio.AbstractServer | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self) -> "StubUpstream":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    def body_for(self, target: str) -> bytes:
+        qs = parse_qs(urlsplit(target).query)
+        if "symbols" in qs:
+            symbols = json.loads(qs["symbols"][0])
+            return json.dumps([{"symbol": s, "price": str(self.price)} for s in symbols]).encode()
+        return json.dumps({"symbol": qs.get("symbol", [""])[0], "price": str(self.price)}).encode()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                target = head.split(b" ", 2)[1].decode()
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                body = self.body_for(target)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
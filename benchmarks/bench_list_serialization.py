@@ -0,0 +1,104 @@
+"""Benchmark: order list page, ORM objects vs bare columns + precompiled TypeAdapter.
+
+Seeds an in-memory SQLite database and builds PAGE-row pages of GET /orders
+three ways, timing the fetch and the JSON rendering separately (microseconds
+per row):
+
+- ``orm_encoder``: ORM objects, per-row ``model_validate``, ``jsonable_encoder``
+  and ``json.dumps`` (what a route with a custom response class still does)
+- ``orm_adapter``: ORM objects through ``ORDER_LIST`` (FastAPI's own
+  ``response_model`` path)
+- ``columns_adapter``: ``ORDER_READ_COLUMNS`` rows through
+  ``core.responses.json_list`` (``FAST_JSON``)
+
+    python -m crypto_exchange.benchmarks.bench_list_serialization --page 200
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from ..app.core.database import Base
+from ..app.core.responses import json_list
+from ..app.models import Currency, Order, User
+from ..app.models.loading import ORDER_READ, ORDER_READ_COLUMNS
+from ..app.schemas.order import ORDER_LIST, OrderRead
+
+
+def seed(engine, n: int) -> None:
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@example.com", "hashed_password": "x", "role": "user"}])
+        conn.execute(insert(Currency), [{"id": 1, "code": "BTC", "name": "Bitcoin", "reserve": 0}, {"id": 2, "code": "USDT", "name": "Tether", "reserve": 0}])
+        conn.execute(insert(Order), [
+            {"user_id": 1, "from_currency": 1, "to_currency": 2, "amount_from": 0.01 * (i + 1), "amount_to": 650.5 * (i + 1),
+             "rate": 65050.0, "status": "paid", "wallet_address": f"bc1q{i:034d}", "payout_details": None if i % 3 else "card 4111",
+             "created_at": now - timedelta(minutes=i)}
+            for i in range(n)
+        ])
+
+
+def orm_rows(db: Session, page: int):
+    db.expunge_all()  # a request starts with an empty identity map
+    return db.execute(select(Order).options(*ORDER_READ).order_by(Order.id.desc()).limit(page)).scalars().all()
+
+
+def column_rows(db: Session, page: int):
+    return db.execute(select(*ORDER_READ_COLUMNS).order_by(Order.id.desc()).limit(page)).all()
+
+
+def render_encoder(rows) -> bytes:
+    return json.dumps(jsonable_encoder([OrderRead.model_validate(r) for r in rows]), separators=(",", ":")).encode()
+
+
+def render_adapter(rows) -> bytes:
+    return ORDER_LIST.dump_json(ORDER_LIST.validate_python(rows, from_attributes=True))
+
+
+def render_json_list(rows) -> bytes:
+    return json_list(ORDER_LIST, rows).body
+
+
+IMPLS = {
+    "orm_encoder": (orm_rows, render_encoder),
+    "orm_adapter": (orm_rows, render_adapter),
+    "columns_adapter": (column_rows, render_json_list),
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--page", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    engine = create_engine("sqlite://")
+    seed(engine, args.page)
+    with Session(engine) as db:
+        bodies = {}
+        for name, (fetch, render) in IMPLS.items():
+            bodies[name] = json.loads(render(fetch(db, args.page)))  # warm up
+            fetch_s = render_s = 0.0
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                rows = fetch(db, args.page)
+                t1 = time.perf_counter()
+                render(rows)
+                fetch_s += t1 - t0
+                render_s += time.perf_counter() - t1
+            per_row = 1e6 / (args.repeat * args.page)
+            print({
+                "impl": name,
+                "fetch_us_per_row": round(fetch_s * per_row, 2),
+                "render_us_per_row": round(render_s * per_row, 2),
+                "rows_per_s": round(args.repeat * args.page / (fetch_s + render_s)),
+            })
+        assert all(body == bodies["orm_encoder"] for body in bodies.values()), "implementations disagree"
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Benchmark: /public/rates latency during a login storm, inline bcrypt vs executor.
+
+Runs the ASGI app on a temporary SQLite database. A pool of clients hammers
+/auth/login while a probe measures /public/rates latency; with bcrypt inline
+every login stalls the event loop, with the executor the probe should stay flat.
+The probe uses symbols that fail validation so it needs no Redis; it measures
+event-loop responsiveness, not rate fetching.
+
+    python -m crypto_exchange.benchmarks.bench_login_storm
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import math
+import statistics
+import tempfile
+import time
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..app.core import security
+from ..app.core.database import Base, get_session
+from ..app.main import app
+
+
+def pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[max(0, math.ceil(len(values) * q) - 1)], 2)
+
+
+async def run(mode: str, args, client: httpx.AsyncClient) -> dict:
+    if mode == "inline":
+        orig = security.hash_password_async, security.verify_password_async
+        async def verify_inline(password, hashed):
+            return security.verify_password(password, hashed)
+        security.verify_password_async = verify_inline
+    stop = asyncio.Event()
+    logins = 0
+    shed = 0
+
+    async def storm():
+        nonlocal logins, shed
+        while not stop.is_set():
+            r = await client.post("/auth/login", json={"email": "storm@example.com", "password": "secret123"})
+            logins += r.status_code == 200
+            shed += r.status_code == 503
+
+    async def probe() -> list[float]:
+        samples = []
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            await client.get("/public/rates", params={"symbols": ["BAD"]})
+            samples.append((time.perf_counter() - t0) * 1000)
+            await asyncio.sleep(args.probe_interval)
+        return samples
+
+    baseline = await probe_once(client, args)
+    stormers = [asyncio.create_task(storm()) for _ in range(args.concurrency)]
+    samples = await probe()
+    stop.set()
+    await asyncio.gather(*stormers)
+    if mode == "inline":
+        security.hash_password_async, security.verify_password_async = orig
+    return {
+        "mode": mode,
+        "idle_p99_ms": pct(baseline, 0.99),
+        "storm_p50_ms": round(statistics.median(samples), 2),
+        "storm_p99_ms": pct(samples, 0.99),
+        "logins_ok": logins,
+        "logins_shed": shed,
+    }
+
+
+async def probe_once(client: httpx.AsyncClient, args) -> list[float]:
+    samples = []
+    for _ in range(50):
+        t0 = time.perf_counter()
+        await client.get("/public/rates", params={"symbols": ["BAD"]})
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent login clients")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async def session_override():
+            async with sessions() as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await client.post("/auth/register", json={"email": "storm@example.com", "password": "secret123"})
+            for mode in ("inline", "executor"):
+                print(await run(mode, args, client))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
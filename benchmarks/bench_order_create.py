@@ -0,0 +1,137 @@
+"""Benchmark: order creation, previous multi-commit path vs one transaction.
+
+Creates orders from --concurrency tasks (one session per order, like requests)
+against a temporary SQLite database, or --db-url for a migrated local Postgres.
+The previous implementation (user load, two currency gets, KYC SUM over today's
+orders, reserve re-read, commit + refresh, audit insert + second commit) is
+reproduced inline; the new one is routers.orders.create_order. The rate lookup
+is stubbed with a constant in both, so only database work is compared.
+The two run in alternating --rounds; throughput is the median round, latency
+percentiles are over all rounds. SQLite admits one writer at a time, so with
+--concurrency > 1 its numbers are dominated by lock waits; compare throughput
+on Postgres.
+
+    python -m crypto_exchange.benchmarks.bench_order_create --orders 2000 --concurrency 20
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import math
+import secrets
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..app.core.config import settings
+from ..app.core.database import Base
+from ..app.core.principals import Principal
+from ..app.models import AuditLog, Currency, Order, User
+from ..app.routers import orders as orders_router
+from ..app.schemas.order import OrderCreate
+from ..app.services import audit
+from ..app.services.catalog import catalog
+
+RATE = 2.0
+
+
+def pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return round(values[max(0, math.ceil(len(values) * q) - 1)], 2)
+
+
+async def legacy_create(db, user_id: int, payload: OrderCreate) -> Order:
+    user = await db.get(User, user_id)
+    from_cur = await db.get(Currency, payload.from_currency)
+    to_cur = await db.get(Currency, payload.to_currency)
+    amount_to = payload.amount_from * RATE
+    if user.kyc_status != "verified":
+        start_day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        q = select(func.coalesce(func.sum(Order.amount_to), 0)).where(Order.user_id == user.id, Order.created_at >= start_day)
+        total_today = (await db.execute(q)).scalar()
+        if float(total_today) + float(amount_to) > settings.UNVERIFIED_DAILY_VOLUME_MAX:
+            raise ValueError("Daily volume limit exceeded")
+    cur = await db.get(Currency, to_cur.id)
+    if float(cur.reserve) < float(amount_to):
+        raise ValueError("Insufficient reserve")
+    order = Order(
+        user_id=user.id, from_currency=from_cur.id, to_currency=to_cur.id, amount_from=payload.amount_from,
+        amount_to=amount_to, rate=RATE, wallet_address="demo_" + secrets.token_hex(8), status="pending_payment",
+    )
+    db.add(order)
+    await db.commit()
+    await db.refresh(order)
+    db.add(AuditLog(user_id=user.id, action="order.create", details=f"order_id={order.id}"))
+    await db.commit()
+    return order
+
+
+async def run(name: str, sessions, users: list[int], args, latencies: list[float]) -> float:
+    """Create --orders orders, appending per-order latencies; returns orders/s."""
+    payload = OrderCreate(from_currency=1, to_currency=2, amount_from=0.5)
+    todo = iter(range(args.orders))
+
+    async def worker():
+        for i in todo:
+            user_id = users[i % len(users)]
+            async with sessions() as db:
+                t0 = time.perf_counter()
+                if name == "legacy":
+                    await legacy_create(db, user_id, payload)
+                else:
+                    await orders_router.create_order(payload, db, Principal(user_id, "user", "unverified"))
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return args.orders / (time.perf_counter() - t0)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=2000, help="per implementation and round")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--db-url", help="defaults to a temporary SQLite file")
+    args = parser.parse_args()
+
+    async def fixed_rates(pairs):
+        return {p: RATE for p in pairs}
+
+    orders_router.get_many_rates = fixed_rates
+    settings.UNVERIFIED_DAILY_VOLUME_MAX = 1e12  # measure the check, never trip it
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.db_url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        engine = create_async_engine(url, connect_args={"timeout": 30} if url.startswith("sqlite") else {})
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        audit.writer.session_factory = sessions
+        catalog.session_factory = sessions
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with sessions() as db:
+            db.add_all([Currency(id=1, code="BTC", name="Bitcoin", reserve=1e12), Currency(id=2, code="USDT", name="Tether", reserve=1e12)])
+            users = [User(email=f"bench{i}@example.com", hashed_password="x") for i in range(args.users)]
+            db.add_all(users)
+            await db.commit()
+            user_ids = [u.id for u in users]
+        impls = ("legacy", "single_transaction")
+        rates = {name: [] for name in impls}
+        latencies = {name: [] for name in impls}
+        for _ in range(args.rounds):  # alternate, so neither always runs on the smaller tables
+            for name in impls:
+                rates[name].append(await run(name, sessions, user_ids, args, latencies[name]))
+        for name in impls:
+            print({
+                "impl": name,
+                "orders_per_s": round(statistics.median(rates[name]), 1),
+                "p50_ms": pct(latencies[name], 0.50),
+                "p99_ms": pct(latencies[name], 0.99),
+            })
+        await audit.writer.stop()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""Benchmark: admin orders summary, Python bucketing vs the daily rollup.
+
+Seeds a temporary SQLite database with N orders spread over the last 30 days
+(1M by default), builds order_daily_stats from them, and times the original
+implementation (status query + every row pulled into Python) against
+services.analytics.orders_summary.
+
+    python -m crypto_exchange.benchmarks.bench_orders_summary --orders 1000000
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..app.core.database import Base
+from ..app.models import Order
+from ..app.services import analytics
+
+STATUSES = ["pending_payment", "paid", "processing", "completed", "canceled"]
+
+
+def seed(path: str, n: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    con = sqlite3.connect(path)
+    con.execute("INSERT INTO users (id, email, hashed_password, role, kyc_status, created_at) VALUES (1, 'bench@example.com', 'x', 'user', 'verified', ?)", (datetime.utcnow(),))
+    con.executemany("INSERT INTO currencies (id, code, name, reserve) VALUES (?, ?, ?, 0)", [(1, "BTC", "Bitcoin"), (2, "USDT", "Tether")])
+    now = datetime.utcnow()
+    rnd = random.Random(42)
+    batch = []
+    for i in range(n):
+        created = now - timedelta(seconds=rnd.randrange(30 * 86400))
+        batch.append((1, 1, 2, 1.0, rnd.uniform(1, 1000), 1.0, rnd.choice(STATUSES), created.isoformat(sep=" ")))
+        if len(batch) == 50_000:
+            con.executemany("INSERT INTO orders (user_id, from_currency, to_currency, amount_from, amount_to, rate, status, created_at) VALUES (?,?,?,?,?,?,?,?)", batch)
+            batch.clear()
+    if batch:
+        con.executemany("INSERT INTO orders (user_id, from_currency, to_currency, amount_from, amount_to, rate, status, created_at) VALUES (?,?,?,?,?,?,?,?)", batch)
+    con.commit()
+    con.close()
+
+
+async def legacy_summary(db, days: int) -> dict:
+    since = datetime.utcnow() - timedelta(days=days)
+    status_rows = (await db.execute(select(Order.status, func.count(), func.coalesce(func.sum(Order.amount_to), 0)).where(Order.created_at >= since).group_by(Order.status))).all()
+    status_stats = {s: {"count": int(c), "volume": float(v)} for s, c, v in status_rows}
+    rows = (await db.execute(select(Order.created_at, Order.amount_to).where(Order.created_at >= since))).all()
+    buckets: dict[str, float] = {}
+    for created_at, amt in rows:
+        day_key = created_at.strftime("%Y-%m-%d")
+        buckets[day_key] = buckets.get(day_key, 0.0) + float(amt)
+    return {"status": status_stats, "daily": [{"date": k, "volume": buckets[k]} for k in sorted(buckets)]}
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/bench.db"
+        t0 = time.perf_counter()
+        seed(path, args.orders)
+        print(f"seeded {args.orders} orders in {time.perf_counter() - t0:.1f}s")
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        async with sessions() as db:
+            t0 = time.perf_counter()
+            await analytics.rebuild_daily_stats(db)
+            print(f"rebuilt order_daily_stats in {time.perf_counter() - t0:.1f}s")
+        for name, fn in (("python_bucketing", legacy_summary), ("rollup", analytics.orders_summary)):
+            timings = []
+            for _ in range(args.repeat):
+                async with sessions() as db:
+                    t0 = time.perf_counter()
+                    await fn(db, args.days)
+                    timings.append(time.perf_counter() - t0)
+            print({"impl": name, "best_s": round(min(timings), 3), "avg_s": round(sum(timings) / len(timings), 3)})
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
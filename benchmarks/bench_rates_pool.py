@@ -0,0 +1,90 @@
+"""Benchmark: per-call Redis/HTTP clients vs the shared app-lifetime pools.
+
+Drives concurrent GET /public/rates through the ASGI app against a local stub
+upstream and a real Redis, and reports latency percentiles plus how many TCP
+connections each side had to open.
+
+    python -m crypto_exchange.benchmarks.bench_rates_pool --redis-url redis://localhost:6379/15
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import math
+import statistics
+import time
+import httpx
+import redis.asyncio as redis
+from ._stub import StubUpstream
+from ..app.core import deps
+from ..app.core.config import settings
+from ..app.main import app
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "BNBUSDT", "SOLUSDT", "XRPUSDT"]
+
+
+class _FreshClient:
+    """Old behaviour: a new AsyncClient (and TCP connection) per upstream call."""
+
+    async def get(self, url, **kwargs):
+        async with httpx.AsyncClient(timeout=5) as client:
+            return await client.get(url, **kwargs)
+
+
+async def run(mode: str, args) -> dict:
+    stub = await StubUpstream(latency=args.upstream_latency).start()
+    settings.BINANCE_PUBLIC_URL = stub.url
+    settings.REDIS_URL = args.redis_url
+    settings.RATE_CACHE_TTL = 1  # keep a steady stream of cache misses
+    admin = redis.from_url(args.redis_url, decode_responses=True)
+    await admin.flushdb()
+    before = (await admin.info("stats"))["total_connections_received"]
+    if mode == "fresh":
+        orig = deps.redis_client, deps.http_client
+        deps.redis_client = lambda: redis.from_url(args.redis_url, decode_responses=True)
+        deps.http_client = lambda: _FreshClient()
+    else:
+        await deps.init_resources()
+    latencies: list[float] = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def worker():
+            for _ in range(args.requests):
+                t0 = time.perf_counter()
+                r = await client.get("/public/rates", params={"symbols": SYMBOLS})
+                latencies.append((time.perf_counter() - t0) * 1000)
+                r.raise_for_status()
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+    if mode == "fresh":
+        deps.redis_client, deps.http_client = orig
+    else:
+        await deps.close_resources()
+    after = (await admin.info("stats"))["total_connections_received"]
+    await admin.aclose()
+    await stub.stop()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p99_ms": round(latencies[max(0, math.ceil(len(latencies) * 0.99) - 1)], 2),
+        "upstream_connections": stub.connections,
+        "upstream_requests": stub.requests,
+        "redis_connections": after - before - 1,  # minus the admin connection
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=40, help="requests per worker")
+    parser.add_argument("--upstream-latency", type=float, default=0.005)
+    args = parser.parse_args()
+    for mode in ("fresh", "pooled"):
+        print(await run(mode, args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,34 @@
 import asyncio
+import json
+import time
+from urllib.parse import parse_qs, urlsplit
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy import event
 from crypto_exchange.app.main import app
-from crypto_exchange.app.core.database import Base, get_session
+from crypto_exchange.app.core.database import Base, get_read_session, get_session
 from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.core.metrics import instrument_engine
+from crypto_exchange.app.services import audit
+from crypto_exchange.app.services.catalog import catalog
 
 # Use separate in-memory sqlite for tests
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 engine_test = create_async_engine(TEST_DATABASE_URL, future=True)
 AsyncSessionLocal = async_sessionmaker(engine_test, expire_on_commit=False)
+instrument_engine(engine_test.sync_engine)
 
 async def override_get_session():
     async with AsyncSessionLocal() as session:
         yield session
 
 app.dependency_overrides[get_session] = override_get_session
+app.dependency_overrides[get_read_session] = override_get_session  # no replica in tests: reads hit the same database
+audit.writer.session_factory = AsyncSessionLocal  # buffered audit rows go to the test database
+catalog.session_factory = AsyncSessionLocal
+settings.RATE_LIMIT_ENABLED = False  # .env may enable it; tests/test_rate_limit.py turns it on itself
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -34,3 +46,115 @@ async def prepare_db():
 async def client():
     async with AsyncClient(app=app, base_url="http://test") as ac:
         yield ac
+
+@pytest.fixture
+async def session():
+    async with AsyncSessionLocal() as s:
+        yield s
+
+@pytest.fixture
+def query_counter():
+    """Collect SQL statements executed against the test engine while active."""
+    statements: list[str] = []
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(engine_test.sync_engine, "before_cursor_execute", _record)
+    yield statements
+    event.remove(engine_test.sync_engine, "before_cursor_execute", _record)
+
+class FakeRedis:
+    """In-memory stand-in for the few redis.asyncio commands the app uses."""
+
+    def __init__(self):
+        self.data: dict[str, tuple[str, float | None]] = {}
+
+    def _live(self, key):
+        item = self.data.get(key)
+        if item and item[1] is not None and item[1] <= time.monotonic():
+            del self.data[key]
+            return None
+        return item
+
+    async def get(self, key):
+        item = self._live(key)
+        return item[0] if item else None
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and self._live(key):
+            return None
+        ttl = ex if ex is not None else (px / 1000 if px is not None else None)
+        self.data[key] = (value, time.monotonic() + ttl if ttl is not None else None)
+        return True
+
+    async def mget(self, keys):
+        return [await self.get(k) for k in keys]
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(k, None) is not None for k in keys)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        calls, self.calls = self.calls, []
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+class StubUpstream:
+    """Local HTTP server standing in for the Binance ticker endpoint; counts requests."""
+
+    def __init__(self, latency=0.05, price=123.45):
+        self.latency = latency
+        self.price = price
+        self.requests: list[str] = []
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                target = head.split(b" ", 2)[1].decode()
+                self.requests.append(target)
+                await asyncio.sleep(self.latency)
+                body = json.dumps(self.body_for(target)).encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def body_for(self, target):
+        qs = parse_qs(urlsplit(target).query)
+        if "symbols" in qs:
+            return [{"symbol": s, "price": str(self.price)} for s in json.loads(qs["symbols"][0])]
+        return {"symbol": qs.get("symbol", [""])[0], "price": str(self.price)}
+
+@pytest.fixture
+async def stub_upstream(monkeypatch):
+    stub = StubUpstream()
+    server = await asyncio.start_server(stub.handle, "127.0.0.1", 0)
+    host, port = server.sockets[0].getsockname()[:2]
+    monkeypatch.setattr(settings, "BINANCE_PUBLIC_URL", f"http://{host}:{port}")
+    yield stub
+    server.close()
+    await server.wait_closed()
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from crypto_exchange.app.core import security
+from crypto_exchange.app.models import User, Currency, Order, OrderDailyStat
+from crypto_exchange.app.services import analytics
+
+async def test_summary_matches_python_bucketing(client, session, query_counter):
+    cur = Currency(code='ANA', name='Analytics', reserve=1)
+    op = User(email='analytics_op@example.com', hashed_password=security.hash_password('secret123'), role='operator')
+    session.add_all([cur, op])
+    await session.flush()
+    now = datetime.utcnow()
+    for i, status in enumerate(['paid', 'paid', 'completed', 'canceled', 'paid']):
+        session.add(Order(user_id=op.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=10 + i, rate=1, status=status, created_at=now - timedelta(days=i)))
+    await session.commit()
+    await analytics.rebuild_daily_stats(session)  # orders inserted directly bypass the rollup
+    r = await client.post('/auth/login', json={'email':'analytics_op@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    await client.get('/orders/analytics/summary', headers=headers)  # warm principal cache
+    query_counter.clear()
+    r = await client.get('/orders/analytics/summary', params={'days': 7, 'breakdown': ['status', 'currency']}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert len(query_counter) == 1
+    data = r.json()
+    # reference: the previous implementation's python-side bucketing
+    since = now - timedelta(days=7)
+    rows = (await session.execute(select(Order.created_at, Order.amount_to, Order.status).where(Order.created_at >= since))).all()
+    expected_daily: dict[str, float] = {}
+    for created_at, amt, _ in rows:
+        key = created_at.strftime('%Y-%m-%d')
+        expected_daily[key] = expected_daily.get(key, 0.0) + float(amt)
+    daily = {d['date']: d for d in data['daily']}
+    for key, volume in expected_daily.items():
+        assert abs(daily[key]['volume'] - volume) < 1e-9
+        assert abs(sum(daily[key]['by_status'].values()) - volume) < 1e-9
+    assert daily[now.strftime('%Y-%m-%d')]['by_currency']['ANA'] == 10
+    assert data['status']['paid']['count'] >= 3
+    r = await client.get('/orders/analytics/summary', params={'breakdown': 'user'}, headers=headers)
+    assert r.status_code == 400
+
+async def rollup_rows(session, currency_id):
+    rows = (await session.execute(
+        select(OrderDailyStat.day, OrderDailyStat.status, OrderDailyStat.order_count, OrderDailyStat.amount_to_sum)
+        .where(OrderDailyStat.to_currency == currency_id, OrderDailyStat.order_count != 0)
+    )).all()
+    return sorted((d, s, c, float(v)) for d, s, c, v in rows)
+
+async def test_rollup_maintained_incrementally(client, session, monkeypatch):
+    from crypto_exchange.app.routers import orders as orders_router
+    async def fixed_rates(pairs):
+        return {p: 2.0 for p in pairs}
+    monkeypatch.setattr(orders_router, 'get_many_rates', fixed_rates)
+    cur_a = Currency(code='RLA', name='Rollup A', reserve=1000)
+    cur_b = Currency(code='RLB', name='Rollup B', reserve=1000)
+    admin = User(email='rollup_admin@example.com', hashed_password=security.hash_password('secret123'), role='admin', kyc_status='verified')
+    session.add_all([cur_a, cur_b, admin])
+    await session.commit()
+    r = await client.post('/auth/login', json={'email':'rollup_admin@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    ids = []
+    for amount in (1, 2, 3):
+        r = await client.post('/orders', json={'from_currency':cur_a.id,'to_currency':cur_b.id,'amount_from':amount}, headers=headers)
+        assert r.status_code == 200, r.text
+        ids.append(r.json()['id'])
+    assert (await client.post(f'/orders/{ids[0]}/status', json={'status':'canceled'}, headers=headers)).status_code == 200
+    assert (await client.post(f'/orders/{ids[1]}/transactions', json={'amount':2}, headers=headers)).status_code == 200
+    incremental = await rollup_rows(session, cur_b.id)
+    assert [(s, c) for _, s, c, _ in incremental] == [('canceled', 1), ('paid', 1), ('pending_payment', 1)]
+    await analytics.rebuild_daily_stats(session)
+    assert await rollup_rows(session, cur_b.id) == incremental
@@ -0,0 +1,69 @@
+from sqlalchemy import select, func
+from crypto_exchange.app.core import security
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.models import User, AuditLog
+from crypto_exchange.app.services import audit
+from crypto_exchange.app.services.orders import log_action
+
+async def audit_count(session, action):
+    return (await session.execute(select(func.count()).select_from(AuditLog).where(AuditLog.action == action))).scalar_one()
+
+async def test_async_mode_batches_rows(session, monkeypatch, query_counter):
+    monkeypatch.setattr(settings, 'AUDIT_MODE', 'async')
+    monkeypatch.setattr(settings, 'AUDIT_BATCH_SIZE', 100)
+    await audit.writer.flush()
+    batches = audit.writer.batches
+    query_counter.clear()
+    for i in range(250):
+        await log_action(session, None, 'test.batch', f'i={i}')
+    assert query_counter == []  # nothing touches the request's session
+    assert audit.writer.stats()['queue_depth'] == 0  # not before the commit
+    await session.commit()
+    assert audit.writer.stats()['queue_depth'] >= 150
+    await audit.writer.flush()
+    assert audit.writer.batches - batches == 3
+    assert len([s for s in query_counter if s.lstrip().upper().startswith('INSERT')]) <= 3
+    assert await audit_count(session, 'test.batch') == 250
+
+async def test_sync_mode_and_full_queue_write_in_transaction(client, session, monkeypatch):
+    user = User(email='audit_sync@example.com', hashed_password=security.hash_password('secret123'))
+    session.add(user)
+    await session.commit()
+    r = await client.post('/auth/login', json={'email':'audit_sync@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    monkeypatch.setattr(settings, 'AUDIT_MODE', 'sync')
+    r = await client.post('/auth/kyc/submit', json={'full_name':'Audit Sync','document_id':'DOC9'}, headers=headers)
+    assert r.status_code == 200
+    assert await audit_count(session, 'kyc.submit') >= 1  # committed with the KYC change, no flush needed
+    monkeypatch.setattr(settings, 'AUDIT_MODE', 'async')
+    monkeypatch.setattr(settings, 'AUDIT_QUEUE_MAX', 0)
+    await log_action(session, user.id, 'test.overflow')
+    await session.commit()
+    assert await audit_count(session, 'test.overflow') == 1
+
+async def test_stop_drains_queue_and_metrics(client, session, monkeypatch):
+    monkeypatch.setattr(settings, 'AUDIT_MODE', 'async')
+    monkeypatch.setattr(settings, 'AUDIT_FLUSH_INTERVAL', 60)
+    for _ in range(5):
+        await log_action(session, None, 'test.drain')
+    await session.commit()
+    assert (await client.get('/metrics?format=json')).json()['audit']['queue_depth'] >= 5
+    await audit.writer.stop()
+    assert audit.writer.stats()['queue_depth'] == 0
+    assert await audit_count(session, 'test.drain') == 5
+
+async def test_rolled_back_actions_are_not_audited(session, monkeypatch):
+    monkeypatch.setattr(settings, 'AUDIT_MODE', 'async')
+    await log_action(session, None, 'test.rolled_back')
+    await session.rollback()
+    await log_action(session, None, 'test.committed')
+    try:
+        async with session.begin_nested():  # e.g. a lost completion claim in deduct_reserve_once
+            raise ValueError
+    except ValueError:
+        pass
+    await session.commit()
+    await audit.writer.flush()
+    assert await audit_count(session, 'test.rolled_back') == 0
+    assert await audit_count(session, 'test.committed') == 1
+
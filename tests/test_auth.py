@@ -7,3 +7,13 @@ async def test_register_and_login(client):
     assert r.status_code == 200
     token = r.json()['access_token']
     assert token
+
+async def test_password_hashing_sheds_load(monkeypatch):
+    import asyncio
+    from crypto_exchange.app.core import security
+    from crypto_exchange.app.core.config import settings
+    monkeypatch.setattr(settings, 'PASSWORD_HASH_WORKERS', 1)
+    monkeypatch.setattr(settings, 'PASSWORD_HASH_MAX_QUEUE', 1)
+    results = await asyncio.gather(*(security.hash_password_async('secret123') for _ in range(3)), return_exceptions=True)
+    assert sum(isinstance(r, security.HashingBusy) for r in results) == 1
+    assert security.verify_password('secret123', next(r for r in results if isinstance(r, str)))
@@ -0,0 +1,80 @@
+import asyncio
+import pytest
+from crypto_exchange.app.core import deps
+from crypto_exchange.app.core.security import create_access_token
+from crypto_exchange.app.models import User
+from crypto_exchange.app.services import catalog as catalog_module
+from crypto_exchange.app.services.catalog import Catalog, catalog
+
+async def test_hot_paths_skip_the_database(client, session, query_counter):
+    admin = User(email='catalog_admin@example.com', hashed_password='x', role='admin')
+    session.add(admin)
+    await session.commit()
+    headers = {'Authorization': f"Bearer {create_access_token(str(admin.id), 'admin')}"}
+    for code in ('CTA', 'CTB'):
+        r = await client.post('/currencies', json={'code': code, 'name': 'Catalog', 'reserve': 3}, headers=headers)
+        assert r.status_code == 200
+    await client.get('/public/pairs')  # reload after the change
+    query_counter.clear()
+    pairs = (await client.get('/public/pairs')).json()['pairs']
+    listed = {c['code']: c for c in (await client.get('/currencies')).json()}
+    assert query_counter == []
+    assert listed['CTA']['reserve'] == 3
+    assert 'CTA-CTB' in pairs and 'CTB-CTA' in pairs
+    # an admin reserve change is visible immediately on this worker
+    cid = listed['CTA']['id']
+    assert (await client.patch(f'/currencies/{cid}', json={'reserve': 4}, headers=headers)).status_code == 200
+    assert {c['code']: c for c in (await client.get('/currencies')).json()}['CTA']['reserve'] == 4
+
+async def test_version_bump_reaches_other_workers(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(deps, 'redis_client', lambda: redis)
+    await catalog.refresh(force=True)
+    listener = asyncio.create_task(catalog_module.listen_loop())
+    try:
+        for _ in range(50):  # wait for the subscription
+            await asyncio.sleep(0.01)
+            if (await redis.pubsub_numsub(catalog_module.CHANNEL))[0][1]:
+                break
+        await catalog.refresh(force=True)  # loaded at the current version
+        assert not catalog.stale
+        await Catalog(catalog.session_factory).changed()  # another worker commits a change
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if catalog.stale:
+                break
+        assert catalog.stale
+        loads = catalog.loads
+        await catalog.codes()
+        assert catalog.loads == loads + 1 and catalog.version == 1
+        catalog.invalidate(1)  # a redelivered old version does not force another load
+        assert not catalog.stale
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+async def test_refresh_loop_pairs_come_from_the_catalog(query_counter):
+    from crypto_exchange.app.services import rates
+    await catalog.refresh(force=True)
+    query_counter.clear()
+    pairs = await rates.active_pairs()
+    assert query_counter == []
+    assert pairs == [f'{c}{q}' for c in catalog.by_code for q in rates.settings.ALLOWED_RATE_QUOTES if c != q]
+
+async def test_order_traffic_does_not_bump_the_catalog(client, session, monkeypatch):
+    from crypto_exchange.app.models import Currency, Order
+    cur = Currency(code='CTC', name='Catalog C', reserve=100)
+    admin = User(email='catalog_orders@example.com', hashed_password='x', role='admin', kyc_status='verified')
+    session.add_all([cur, admin])
+    await session.flush()
+    order = Order(user_id=admin.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=5, rate=5, status='processing')
+    session.add(order)
+    await session.commit()
+    bumps = []
+    async def changed():
+        bumps.append(1)
+    monkeypatch.setattr(catalog, 'changed', changed)
+    headers = {'Authorization': f"Bearer {create_access_token(str(admin.id), 'admin')}"}
+    assert (await client.post(f'/orders/{order.id}/status', json={'status': 'completed'}, headers=headers)).status_code == 200
+    assert bumps == []
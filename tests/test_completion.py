@@ -0,0 +1,65 @@
+from sqlalchemy import select, func
+from crypto_exchange.app.core import security
+from crypto_exchange.app.models import User, Currency, Order, OrderCompletion
+from crypto_exchange.app.services import reserves
+from crypto_exchange.app.services.orders import deduct_reserve_once
+from sqlalchemy.ext.asyncio import AsyncSession
+
+async def seed_order(session, code, reserve, amount_to):
+    cur = Currency(code=code, name=code, reserve=reserve)
+    user = User(email=f'{code.lower()}@example.com', hashed_password=security.hash_password('secret123'))
+    session.add_all([cur, user])
+    await session.flush()
+    order = Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=amount_to, rate=1, status='processing')
+    session.add(order)
+    await session.commit()
+    return cur.id, order.id
+
+async def state(bind, currency_id, order_id):
+    async with AsyncSession(bind) as s:
+        reserve = await reserves.total(s, currency_id)
+        claims = (await s.execute(select(func.count()).select_from(OrderCompletion).where(OrderCompletion.order_id == order_id))).scalar_one()
+    return float(reserve), claims
+
+async def test_deduct_reserve_once_is_idempotent(session):
+    currency_id, order_id = await seed_order(session, 'CMA', 100, 30)
+    results = []
+    for _ in range(2):  # two workers completing the same order
+        async with AsyncSession(session.bind) as s:
+            results.append(await deduct_reserve_once(s, await s.get(Order, order_id)))
+            await s.commit()
+    assert results == [True, False]
+    assert await state(session.bind, currency_id, order_id) == (70.0, 1)
+
+async def test_deduct_reserve_once_never_overdraws(session):
+    currency_id, order_id = await seed_order(session, 'CMB', 10, 30)
+    async with AsyncSession(session.bind) as s:
+        assert await deduct_reserve_once(s, await s.get(Order, order_id)) is False
+        await s.commit()
+    # claim released, so a retry after a top-up can still complete
+    assert await state(session.bind, currency_id, order_id) == (10.0, 0)
+
+async def test_admin_completion_without_reserve_is_rejected(client, session):
+    currency_id, order_id = await seed_order(session, 'CMC', 10, 30)
+    admin = User(email='cmc_admin@example.com', hashed_password='x', role='admin')
+    session.add(admin)
+    await session.commit()
+    headers = {'Authorization': f"Bearer {security.create_access_token(str(admin.id), 'admin')}"}
+    r = await client.post(f'/orders/{order_id}/status', json={'status': 'completed'}, headers=headers)
+    assert r.status_code == 409
+    status = (await session.execute(select(Order.status).where(Order.id == order_id))).scalar_one()
+    assert status == 'processing' and await state(session.bind, currency_id, order_id) == (10.0, 0)
+
+async def test_completion_leaves_the_currency_row_to_reconciliation(session, query_counter):
+    currency_id, order_id = await seed_order(session, 'CMD', 100, 30)
+    async with AsyncSession(session.bind) as s:
+        query_counter.clear()
+        assert await deduct_reserve_once(s, await s.get(Order, order_id))
+        await s.commit()
+    assert not [q for q in query_counter if q.lstrip().upper().startswith('UPDATE CURRENCIES')]
+    reserve = select(Currency.reserve).where(Currency.id == currency_id)
+    async with AsyncSession(session.bind) as s:
+        assert float((await s.execute(reserve)).scalar_one()) == 100  # display copy, not yet reconciled
+        assert await reserves.reconcile_reserves(s) >= 1
+        assert float((await s.execute(reserve)).scalar_one()) == 70
+        assert await reserves.reconcile_reserves(s) == 0
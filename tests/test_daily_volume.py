@@ -0,0 +1,68 @@
+import asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from crypto_exchange.app.core import security
+from crypto_exchange.app.core.database import Base
+from crypto_exchange.app.models import User, Currency, UserDailyVolume
+from crypto_exchange.app.services import limits
+
+async def volume(session, user_id):
+    rows = (await session.execute(select(UserDailyVolume.volume).where(UserDailyVolume.user_id == user_id))).scalars().all()
+    return float(sum(rows))
+
+async def test_unverified_daily_limit_uses_counter(client, session, monkeypatch, query_counter):
+    from crypto_exchange.app.routers import orders as orders_router
+    async def fixed_rates(pairs):
+        return {p: 2.0 for p in pairs}
+    monkeypatch.setattr(orders_router, 'get_many_rates', fixed_rates)
+    cur_a = Currency(code='DVA', name='Volume A', reserve=10000)
+    cur_b = Currency(code='DVB', name='Volume B', reserve=10000)
+    user = User(email='volume_user@example.com', hashed_password=security.hash_password('secret123'))
+    admin = User(email='volume_admin@example.com', hashed_password=security.hash_password('secret123'), role='admin')
+    session.add_all([cur_a, cur_b, user, admin])
+    await session.commit()
+    headers = {}
+    for u in (user, admin):
+        r = await client.post('/auth/login', json={'email':u.email,'password':'secret123'})
+        headers[u.email] = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    order = {'from_currency':cur_a.id,'to_currency':cur_b.id,'amount_from':50}  # amount_to 100
+    ids = []
+    query_counter.clear()
+    for _ in range(5):
+        r = await client.post('/orders', json=order, headers=headers[user.email])
+        assert r.status_code == 200, r.text
+        ids.append(r.json()['id'])
+    assert not [s for s in query_counter if 'sum(' in s.lower() and 'orders' in s.lower()]
+    r = await client.post('/orders', json=order, headers=headers[user.email])
+    assert r.status_code == 400 and 'Daily volume' in r.json()['detail']
+    assert await volume(session, user.id) == 500
+    assert (await client.post(f'/orders/{ids[0]}/status', json={'status':'canceled'}, headers=headers[admin.email])).status_code == 200
+    assert await volume(session, user.id) == 400
+    assert (await client.post('/orders', json=order, headers=headers[user.email])).status_code == 200
+    await limits.rebuild_daily_volumes(session)
+    assert await volume(session, user.id) == 500
+
+async def test_concurrent_submissions_respect_limit(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'volume.db'}", connect_args={'timeout': 30})
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as s:
+        user = User(email='volume_race@example.com', hashed_password='x')
+        s.add(user)
+        await s.commit()
+
+    async def submit():
+        async with Session() as s:
+            try:
+                await limits.add_volume(s, user.id, 100, limit=500)
+            except limits.LimitExceeded:
+                return False
+            await s.commit()
+            return True
+
+    results = await asyncio.gather(*(submit() for _ in range(12)))
+    async with Session() as s:
+        total = await volume(s, user.id)
+    await engine.dispose()
+    assert sum(results) == 5 and total == 500
@@ -0,0 +1,47 @@
+from datetime import datetime
+from decimal import Decimal
+import json
+from crypto_exchange.app.core import security
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.core.responses import dumps
+from crypto_exchange.app.models import User, Currency, Order, Transaction
+
+async def test_fast_lists_match_orm_lists(client, session, monkeypatch, query_counter):
+    cur_a = Currency(code='FJA', name='Fast A', reserve=1)
+    cur_b = Currency(code='FJB', name='Fast B', reserve=1)
+    admin = User(email='fastjson_admin@example.com', hashed_password='x', role='admin')
+    session.add_all([cur_a, cur_b, admin])
+    await session.flush()
+    orders = [
+        Order(user_id=admin.id, from_currency=cur_a.id, to_currency=cur_b.id, amount_from=1.5, amount_to=100.25, rate=66.83,
+              status='paid', wallet_address='addr', payout_details=None if i % 2 else 'card ё', created_at=datetime(2024, 5, 1, 12, i))
+        for i in range(5)
+    ]
+    session.add_all(orders)
+    await session.flush()
+    session.add_all([Transaction(order_id=orders[0].id, tx_hash=f'0x{i}', amount=0.75, status='pending') for i in range(3)])
+    await session.commit()
+    headers = {'Authorization': f"Bearer {security.create_access_token(str(admin.id), 'admin')}"}
+    requests = [
+        ('/orders', {'to_currency': cur_b.id, 'limit': 3}),
+        ('/orders/my/list', {'limit': 10}),
+        (f'/orders/{orders[0].id}/transactions', {}),
+    ]
+
+    baseline = [await client.get(path, params=params, headers=headers) for path, params in requests]
+    monkeypatch.setattr(settings, 'FAST_JSON', True)
+    query_counter.clear()
+    fast = [await client.get(path, params=params, headers=headers) for path, params in requests]
+    assert len(query_counter) == 1 + 1 + 2  # same statements as the ORM path (principal is cached)
+    for slow_r, fast_r in zip(baseline, fast):
+        assert fast_r.status_code == 200, fast_r.text
+        assert fast_r.json() == slow_r.json()
+        assert fast_r.headers['content-type'] == 'application/json'
+        assert fast_r.headers.get('X-Next-Cursor') == slow_r.headers.get('X-Next-Cursor')
+    assert len(fast[0].json()) == 3 and 'X-Next-Cursor' in fast[0].headers
+    assert 'X-Next-Cursor' not in fast[1].headers
+
+def test_dumps_matches_json_response():
+    payload = {'a': [1, 2.5, None], 'b': 'ё', 'c': {'d': True}}
+    assert dumps(payload) == json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode()
+    assert json.loads(dumps({'x': Decimal('1.25'), 'at': datetime(2024, 1, 2, 3, 4)})) == {'x': 1.25, 'at': '2024-01-02T03:04:00'}
@@ -0,0 +1,43 @@
+import time
+from crypto_exchange.app.core.security import create_access_token
+from crypto_exchange.app.models import User
+from crypto_exchange.app.routers import rates as rates_router
+from crypto_exchange.app.services.rates import Quote
+
+async def test_pairs_and_currencies_revalidate(client, session, query_counter):
+    admin = User(email='etag_admin@example.com', hashed_password='x', role='admin')
+    session.add(admin)
+    await session.commit()
+    headers = {'Authorization': f"Bearer {create_access_token(str(admin.id), 'admin')}"}
+    for code in ('ETA', 'ETB'):
+        assert (await client.post('/currencies', json={'code': code, 'name': 'ETag', 'reserve': 1}, headers=headers)).status_code == 200
+    for path in ('/public/pairs', '/currencies'):
+        first = await client.get(path)
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'].startswith('public, max-age=')
+        query_counter.clear()
+        again = await client.get(path, headers={'If-None-Match': etag})
+        assert again.status_code == 304 and again.content == b'' and again.headers['ETag'] == etag
+        assert query_counter == []
+        # nginx gzip weakens ETags; lists of tags are accepted too
+        assert (await client.get(path, headers={'If-None-Match': f'"other", W/{etag}'})).status_code == 304
+    old = (await client.get('/public/pairs')).headers['ETag']
+    assert (await client.post('/currencies', json={'code': 'ETC', 'name': 'ETag', 'reserve': 1}, headers=headers)).status_code == 200
+    changed = await client.get('/public/pairs', headers={'If-None-Match': old})
+    assert changed.status_code == 200 and changed.headers['ETag'] != old
+    assert 'ETA-ETC' in changed.json()['pairs']
+
+async def test_rates_etag_follows_prices(client, monkeypatch):
+    prices = {'BTCUSDT': 100.0}
+    async def fake_quotes(symbols):
+        return {s: Quote(prices[s], time.time()) for s in symbols}
+    monkeypatch.setattr(rates_router, 'get_many_quotes', fake_quotes)
+    first = await client.get('/public/rates', params={'symbols': 'BTCUSDT'})
+    assert first.json() == {'BTCUSDT': 100.0}
+    etag = first.headers['ETag']
+    assert (await client.get('/public/rates', params={'symbols': 'BTCUSDT'}, headers={'If-None-Match': etag})).status_code == 304
+    prices['BTCUSDT'] = 101.0
+    moved = await client.get('/public/rates', params={'symbols': 'BTCUSDT'}, headers={'If-None-Match': etag})
+    assert moved.status_code == 200 and moved.json() == {'BTCUSDT': 101.0}
+    meta = await client.get('/public/rates', params={'symbols': 'BTCUSDT', 'meta': 'true'})
+    assert 'ETag' not in meta.headers and meta.headers['Cache-Control'] == 'no-cache'
@@ -0,0 +1,55 @@
+import json
+import time
+import pytest
+from crypto_exchange.app.core import metrics
+from crypto_exchange.app.core.config import settings
+
+async def test_requests_are_labelled_by_route_template(client):
+    assert not settings.RATE_LIMIT_ENABLED  # collection must not depend on the limiter
+    for order_id in (101, 102, 103):
+        await client.get(f'/orders/{order_id}')
+    await client.get('/no/such/page')
+    summary = (await client.get('/metrics?format=json')).json()
+    routes = summary['routes']
+    assert routes['GET /orders/{order_id}']['count'] >= 3
+    assert routes['GET /orders/{order_id}']['status']['401'] >= 3
+    assert routes['GET /orders/{order_id}']['p99_ms'] is not None
+    assert 'GET unmatched' in routes
+    assert not any('101' in key for key in routes)
+    text = (await client.get('/metrics')).text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/orders/{order_id}",le="+Inf"}' in text
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in text
+    assert 'crypto_audit_queue_depth{worker=' in text
+
+def test_quantiles_from_buckets():
+    registry = metrics.Registry()
+    hist = registry.histogram('t', 'test', ('route',))
+    for i in range(1, 1001):
+        hist.observe(('/x',), i / 10000)  # uniform over (0, 100ms]
+    state = hist.series[('/x',)]
+    assert metrics.quantile(metrics.LATENCY_BUCKETS, state, 0.5) == pytest.approx(0.05, rel=0.1)
+    assert metrics.quantile(metrics.LATENCY_BUCKETS, state, 0.99) == pytest.approx(0.099, rel=0.1)
+    assert state[-1] == 1000
+
+async def test_snapshots_of_workers_are_summed():
+    fakeredis = pytest.importorskip('fakeredis')
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    workers = {name: metrics.Registry() for name in ('a:1', 'b:2', 'c:3')}
+    for reg in workers.values():
+        reg.counter('http_requests_total', 'x', ('method', 'route', 'status')).inc(('GET', '/orders', '200'), 5)
+        reg.histogram('http_request_duration_seconds', 'x', ('method', 'route')).observe(('GET', '/orders'), 0.02)
+        reg.collector('audit', lambda: {'queue_depth': 1, 'mode': 'async'})
+    await metrics.push_snapshot(redis, workers['a:1'], 'a:1')
+    await metrics.push_snapshot(redis, workers['b:2'], 'b:2')
+    # c:3 exited long ago; its snapshot is dropped instead of summed
+    await redis.hset(metrics.SNAPSHOT_KEY, 'c:3', json.dumps({'ts': time.time() - 3600, 'data': workers['c:3'].snapshot()}))
+    merged = await metrics.collect(redis, workers['b:2'], 'b:2')
+    routes = metrics.route_summary(merged)
+    assert routes['GET /orders']['count'] == 10
+    assert merged['families']['http_request_duration_seconds'][json.dumps(['GET', '/orders'])][-1] == 2
+    assert set(merged['components']['audit']) == {'a:1', 'b:2'}
+    assert await redis.hkeys(metrics.SNAPSHOT_KEY) == ['a:1', 'b:2']
+    text = metrics.exposition(workers['b:2'], merged)
+    assert 'http_requests_total{method="GET",route="/orders",status="200"} 10.0' in text
+    assert 'crypto_audit_mode' not in text
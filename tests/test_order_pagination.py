@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from crypto_exchange.app.core import security
+from crypto_exchange.app.models import User, Currency, Order
+
+async def test_cursor_pages_and_filters(client, session):
+    cur_a = Currency(code='PGA', name='Page A', reserve=1)
+    cur_b = Currency(code='PGB', name='Page B', reserve=1)
+    op = User(email='pages_op@example.com', hashed_password=security.hash_password('secret123'), role='operator')
+    session.add_all([cur_a, cur_b, op])
+    await session.flush()
+    now = datetime.utcnow()
+    session.add_all([
+        Order(user_id=op.id, from_currency=cur_a.id, to_currency=cur_b.id, amount_from=1, amount_to=1, rate=1,
+              status='paid', created_at=now - timedelta(hours=25 - i))
+        for i in range(25)
+    ])
+    await session.commit()
+    r = await client.post('/auth/login', json={'email':'pages_op@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {'to_currency': cur_b.id, 'limit': 10}
+        if cursor:
+            params['cursor'] = cursor
+        r = await client.get('/orders', params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        seen += [o['id'] for o in r.json()]
+        pages += 1
+        cursor = r.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert pages == 3 and len(seen) == 25 and seen == sorted(seen, reverse=True)
+
+    r = await client.get('/orders', params={'to_currency': cur_b.id, 'after_id': seen[4], 'limit': 3}, headers=headers)
+    assert [o['id'] for o in r.json()] == seen[5:8]
+    r = await client.get('/orders', params={'to_currency': cur_b.id, 'created_from': (now - timedelta(hours=5, minutes=30)).isoformat()}, headers=headers)
+    assert len(r.json()) == 5 and 'X-Next-Cursor' not in r.headers
+    r = await client.get('/orders/my/list', params={'from_currency': cur_a.id, 'limit': 200}, headers=headers)
+    assert len(r.json()) == 25
+    assert (await client.get('/orders', params={'cursor': 'not-a-cursor'}, headers=headers)).status_code == 400
@@ -0,0 +1,110 @@
+import pytest
+from crypto_exchange.app.core import security
+from crypto_exchange.app.models import User, Currency, Order, Transaction
+from crypto_exchange.app.models.user import KYCData
+
+# Expected statements per request; must not grow with the size of a user's history.
+# The first request caches the principal, later ones skip the user lookup.
+EXPECTED = {
+    '/auth/me': 2,                 # user + kyc
+    '/orders/my/list': 1,          # orders
+    '/orders/{id}': 1,             # order
+    '/orders/{id}/transactions': 2,  # order + transactions
+    '/orders': 1,                  # orders
+}
+
+async def seed_busy_user(session, email, orders=25):
+    cur_a = Currency(code='QCA', name='Query A', reserve=1000)
+    cur_b = Currency(code='QCB', name='Query B', reserve=1000)
+    user = User(email=email, hashed_password=security.hash_password('secret123'), role='admin', kyc_status='verified')
+    user.kyc = KYCData(full_name='Busy User', document_id='DOC1')
+    session.add_all([cur_a, cur_b, user])
+    await session.flush()
+    for i in range(orders):
+        order = Order(user_id=user.id, from_currency=cur_a.id, to_currency=cur_b.id, amount_from=1, amount_to=2, rate=2, status='paid')
+        session.add(order)
+        await session.flush()
+        session.add_all([Transaction(order_id=order.id, amount=0.5, status='pending') for _ in range(3)])
+    await session.commit()
+    return order.id
+
+async def test_query_count_per_endpoint(client, session, query_counter):
+    order_id = await seed_busy_user(session, 'busy@example.com')
+    r = await client.post('/auth/login', json={'email':'busy@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    for template, expected in EXPECTED.items():
+        query_counter.clear()
+        r = await client.get(template.format(id=order_id), headers=headers)
+        assert r.status_code == 200, (template, r.text)
+        assert len(query_counter) == expected, (template, query_counter)
+    me = (await client.get('/auth/me', headers=headers)).json()
+    assert me['kyc']['full_name'] == 'Busy User'
+
+async def test_principal_cache_invalidated_on_promote(client, session):
+    from crypto_exchange.app.core.principals import principal_cache
+    admin = User(email='cache_admin@example.com', hashed_password=security.hash_password('secret123'), role='admin')
+    target = User(email='cache_target@example.com', hashed_password=security.hash_password('secret123'))
+    session.add_all([admin, target])
+    await session.commit()
+    tokens = {}
+    for email in ('cache_admin@example.com', 'cache_target@example.com'):
+        r = await client.post('/auth/login', json={'email':email,'password':'secret123'})
+        tokens[email] = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    r = await client.get('/orders', headers=tokens['cache_target@example.com'])
+    assert r.status_code == 403
+    hits = principal_cache.hits
+    assert (await client.get('/orders', headers=tokens['cache_target@example.com'])).status_code == 403
+    assert principal_cache.hits == hits + 1
+    r = await client.post(f'/auth/promote/{target.id}/operator', headers=tokens['cache_admin@example.com'])
+    assert r.status_code == 200, r.text
+    # same token, fresh role
+    assert (await client.get('/orders', headers=tokens['cache_target@example.com'])).status_code == 200
+    assert (await client.get('/metrics?format=json')).json()['principal_cache']['hits'] >= hits + 1
+
+async def test_principal_invalidation_reaches_other_workers(monkeypatch):
+    import asyncio
+    from crypto_exchange.app.core import deps, principals
+    fakeredis = pytest.importorskip('fakeredis')
+    redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(deps, 'redis_client', lambda: redis)
+    listener = asyncio.create_task(principals.listen_loop())
+    try:
+        for _ in range(50):  # wait for the subscription
+            await asyncio.sleep(0.01)
+            if (await redis.pubsub_numsub(principals.CHANNEL))[0][1]:
+                break
+        principals.principal_cache.set('tok-a', principals.Principal(901, 'admin', 'verified'))
+        principals.principal_cache.set('tok-b', principals.Principal(902, 'user', 'none'))
+        await redis.publish(principals.CHANNEL, '901')  # another worker demoted user 901
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if principals.principal_cache.peek('tok-a') is None:
+                break
+        assert principals.principal_cache.peek('tok-a') is None
+        assert principals.principal_cache.peek('tok-b') is not None
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+async def test_create_order_is_one_short_transaction(client, session, query_counter, monkeypatch):
+    from crypto_exchange.app.routers import orders as orders_router
+    async def fixed_rates(pairs):
+        return {p: 2.0 for p in pairs}
+    monkeypatch.setattr(orders_router, 'get_many_rates', fixed_rates)
+    cur_a = Currency(code='QOA', name='Create A', reserve=1000)
+    cur_b = Currency(code='QOB', name='Create B', reserve=1000)
+    user = User(email='create_fast@example.com', hashed_password=security.hash_password('secret123'))
+    session.add_all([cur_a, cur_b, user])
+    await session.commit()
+    r = await client.post('/auth/login', json={'email':'create_fast@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    order = {'from_currency':cur_a.id,'to_currency':cur_b.id,'amount_from':0.3}
+    assert (await client.post('/orders', json=order, headers=headers)).status_code == 200  # warms principal + reserve shards
+    query_counter.clear()
+    r = await client.post('/orders', json=order, headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()['amount_to'] == 0.6
+    # volume upsert, order insert, shard update, hold insert, rollup upsert (currencies come from the catalog)
+    assert len(query_counter) == 5, query_counter
+    assert not [s for s in query_counter if 'FROM currencies' in s]
+    assert not [s for s in query_counter if s.lstrip().upper().startswith('SELECT') and 'FROM orders' in s]
@@ -0,0 +1,59 @@
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from crypto_exchange.app.core import security
+from crypto_exchange.app.models import User, Currency, Order, Transaction, OrderCompletion, OrderDailyStat
+
+# Tables that grow with traffic: a full scan of any of them on a hot path is a regression.
+GROWING = ('orders', 'transactions', 'audit_logs', 'order_completions', 'order_daily_stats')
+
+async def explain(session, stmt) -> list[str]:
+    conn = await session.connection()
+    compiled = stmt.compile(dialect=conn.dialect)
+    if conn.dialect.name == 'postgresql':
+        res = await conn.exec_driver_sql(f'EXPLAIN {compiled}', tuple(compiled.params.values()))
+        return [row[0] for row in res]
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    res = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}', params)
+    return [row[-1] for row in res]
+
+def full_scans(plan: list[str]) -> list[str]:
+    tables = '|'.join(GROWING)
+    return [
+        line for line in plan
+        if re.search(rf'Seq Scan on ({tables})\b', line)
+        or re.match(rf'SCAN ({tables})\b(?! USING)', line)
+    ]
+
+async def test_hot_queries_use_indexes(session):
+    cur = Currency(code='QPA', name='Plan A', reserve=1000)
+    user = User(email='plans@example.com', hashed_password=security.hash_password('secret123'))
+    session.add_all([cur, user])
+    await session.flush()
+    now = datetime.utcnow()
+    orders = [
+        Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=1, rate=1,
+              status=('paid', 'completed', 'canceled')[i % 3], created_at=now - timedelta(hours=i))
+        for i in range(300)
+    ]
+    session.add_all(orders)
+    await session.flush()
+    session.add_all([OrderCompletion(order_id=o.id, currency_id=cur.id, amount=1) for o in orders[1::3]])
+    session.add_all([Transaction(order_id=o.id, amount=1) for o in orders])
+    await session.commit()
+
+    start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    hot = {
+        'kyc daily volume': select(func.coalesce(func.sum(Order.amount_to), 0)).where(Order.user_id == user.id, Order.created_at >= start_day),
+        'list by status': select(Order).where(Order.status == 'paid').order_by(Order.id.desc()).limit(50),
+        'my orders': select(Order).where(Order.user_id == user.id).order_by(Order.id.desc()).limit(50),
+        'my orders next page': select(Order).where(Order.user_id == user.id, Order.id < orders[150].id).order_by(Order.id.desc()).limit(50),
+        'list by currency next page': select(Order).where(Order.to_currency == cur.id, Order.id < orders[150].id).order_by(Order.id.desc()).limit(50),
+        'orders since': select(func.count()).select_from(Order).where(Order.created_at >= now - timedelta(days=1)),
+        'order transactions': select(Transaction).where(Transaction.order_id == orders[0].id).order_by(Transaction.id),
+        'completion ledger': select(OrderCompletion.id).where(OrderCompletion.order_id == orders[1].id),
+        'summary rollup': select(OrderDailyStat.day, func.sum(OrderDailyStat.order_count)).where(OrderDailyStat.day >= (now - timedelta(days=7)).date()).group_by(OrderDailyStat.day),
+    }
+    for name, stmt in hot.items():
+        plan = await explain(session, stmt)
+        assert not full_scans(plan), (name, plan)
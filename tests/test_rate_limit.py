@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from crypto_exchange.app.core import ratelimit
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.core.security import create_access_token
+
+async def test_memory_gcra_admits_limit_then_spaces_requests():
+    limiter = ratelimit.MemoryLimiter()
+    decisions = [await limiter.hit('k', 5, 1.0) for _ in range(6)]
+    assert [d.allowed for d in decisions] == [True] * 5 + [False]
+    assert [d.remaining for d in decisions[:5]] == [4, 3, 2, 1, 0]
+    assert 0 < decisions[-1].retry_after <= 0.2
+    await asyncio.sleep(0.21)
+    assert (await limiter.hit('k', 5, 1.0)).allowed  # one emission interval later there is room for one more
+    assert not (await limiter.hit('k', 5, 1.0)).allowed
+
+async def test_memory_limiter_keeps_bounded_state():
+    limiter = ratelimit.MemoryLimiter(maxsize=100)
+    for i in range(1000):
+        await limiter.hit(f'ip:{i}', 10, 60.0)
+    assert len(limiter) == 100
+
+async def test_redis_limit_is_shared_by_workers():
+    fakeredis = pytest.importorskip('fakeredis')
+    pytest.importorskip('lupa')
+    server = fakeredis.FakeServer()
+    # one limiter per "worker", each with its own connection to the same Redis
+    workers = [ratelimit.RedisLimiter(lambda: fakeredis.FakeAsyncRedis(server=server)) for _ in range(4)]
+    decisions = await asyncio.gather(*(w.hit('auth:ip:1.2.3.4', 20, 60.0) for w in workers for _ in range(10)))
+    assert sum(d.allowed for d in decisions) == 20
+    denied = [d for d in decisions if not d.allowed]
+    assert all(d.remaining == 0 and 0 < d.retry_after <= 3 for d in denied)
+    assert all(w.errors == 0 for w in workers)
+
+async def test_redis_outage_falls_back_to_process_limit():
+    class Down:
+        async def script_load(self, script):
+            raise ConnectionError('redis down')
+    limiter = ratelimit.RedisLimiter(lambda: Down())
+    decisions = [await limiter.hit('k', 2, 60.0) for _ in range(3)]
+    assert [d.allowed for d in decisions] == [True, True, False]
+    assert limiter.errors == 3
+
+async def test_middleware_limits_per_group_and_client(client, monkeypatch):
+    monkeypatch.setattr(settings, 'RATE_LIMIT_ENABLED', True)
+    monkeypatch.setattr(settings, 'RATE_LIMIT_GROUPS', {'/orders': 3})
+    monkeypatch.setattr(ratelimit, '_limiter', ratelimit.MemoryLimiter())
+    responses = [await client.get('/orders/my') for _ in range(4)]
+    assert [r.status_code for r in responses][-1] == 429
+    assert responses[0].headers['RateLimit-Limit'] == '3'
+    assert responses[0].headers['RateLimit-Remaining'] == '2'
+    assert int(responses[-1].headers['Retry-After']) >= 1
+    # a token holder has its own bucket, whatever IP it comes from
+    token = create_access_token('424242', 'user')
+    r = await client.get('/orders/my', headers={'Authorization': f'Bearer {token}'})
+    assert r.status_code != 429 and r.headers['RateLimit-Remaining'] == '2'
+    # other route groups are counted separately
+    r = await client.get('/auth/me')
+    assert r.status_code != 429
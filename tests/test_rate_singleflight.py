@@ -0,0 +1,46 @@
+import asyncio
+import json
+import time
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.services import rates
+
+async def test_one_upstream_call_per_expiry_window(fake_redis, stub_upstream, monkeypatch):
+    monkeypatch.setattr(settings, 'RATE_CACHE_TTL', 1)
+    monkeypatch.setattr(settings, 'RATE_STALE_TTL', 1)
+    for window in range(3):
+        prices = await asyncio.gather(*(rates.get_rate('BTCUSDT', fake_redis) for _ in range(200)))
+        assert set(prices) == {123.45}
+        assert len(stub_upstream.requests) == window + 1
+        await asyncio.sleep(1.05)  # let rate:BTCUSDT expire
+
+async def test_redis_lock_coalesces_across_workers(fake_redis, stub_upstream):
+    # each call stands in for a different worker: no shared in-process future, only Redis
+    results = await asyncio.gather(*(rates._refresh_locked(['ETHUSDT'], fake_redis) for _ in range(20)))
+    assert [res['ETHUSDT'].price for res in results] == [123.45] * 20
+    assert len(stub_upstream.requests) == 1
+    assert await fake_redis.get('rate_lock:ETHUSDT') is None
+
+async def test_batch_fetches_misses_in_one_call(fake_redis, stub_upstream):
+    await fake_redis.set('rate:SOLUSDT', json.dumps({'price': 1.5, 'ts': time.time()}), ex=30)
+    pairs = ['SOLUSDT', 'XRPUSDT', 'ADAUSDT', 'dotusdt', 'BAD###']
+    rates_by_pair = await rates.get_many_rates(pairs, fake_redis)
+    assert rates_by_pair == {'SOLUSDT': 1.5, 'XRPUSDT': 123.45, 'ADAUSDT': 123.45, 'dotusdt': 123.45, 'BAD###': None}
+    assert len(stub_upstream.requests) == 1
+    assert 'symbols=' in stub_upstream.requests[0]
+    assert await fake_redis.get('last_good:DOTUSDT') is not None
+
+async def test_stale_rate_served_while_refreshing(fake_redis, stub_upstream):
+    await fake_redis.set('rate:LTCUSDT', json.dumps({'price': 9.0, 'ts': time.time() - 3600}), ex=300)
+    quotes = await rates.get_many_quotes(['LTCUSDT'], fake_redis)
+    assert quotes['LTCUSDT'].price == 9.0  # answered from cache, no upstream wait
+    assert quotes['LTCUSDT'].age > settings.RATE_CACHE_TTL
+    await asyncio.gather(*rates._tasks)
+    assert len(stub_upstream.requests) == 1
+    fresh = await rates.get_many_quotes(['LTCUSDT'], fake_redis)
+    assert fresh['LTCUSDT'].price == 123.45 and fresh['LTCUSDT'].age < 1
+
+async def test_refresh_due_skips_fresh_pairs(fake_redis, stub_upstream):
+    await fake_redis.set('rate:AVAXUSDT', json.dumps({'price': 2.0, 'ts': time.time()}), ex=300)
+    assert await rates.refresh_due(['AVAXUSDT', 'LINKUSDT', 'BAD###'], fake_redis) == 1
+    assert len(stub_upstream.requests) == 1
+    assert await fake_redis.get('rate:LINKUSDT') is not None
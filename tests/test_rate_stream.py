@@ -0,0 +1,65 @@
+import asyncio
+import json
+import pytest
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.services import rate_stream
+
+async def test_slow_subscriber_gets_latest_tick_only():
+    hub = rate_stream.RateHub()
+    sub = hub.subscribe({'BTCUSDT'})
+    for price in (1.0, 2.0, 3.0):
+        hub.dispatch({'BTCUSDT': price, 'ETHUSDT': price}, published_at=0)
+    assert sub.take() == {'BTCUSDT': 3.0}
+    assert hub.stats()['messages_dropped'] == 2
+    hub.unsubscribe(sub)
+    assert hub.stats()['connections'] == 0
+
+async def test_event_stream_snapshot_then_updates(fake_redis):
+    async def snapshot():
+        return {'BTCUSDT': 1.0}
+
+    sub = rate_stream.hub.subscribe({'BTCUSDT'})
+    events = rate_stream.event_stream(sub, snapshot)
+    first = await anext(events)
+    assert first.startswith('retry:') and json.loads(first.split('data: ')[1]) == {'BTCUSDT': 1.0}
+    # no pub/sub on the fake: publish falls back to local dispatch
+    await rate_stream.publish({'BTCUSDT': 2.0}, fake_redis)
+    assert json.loads((await anext(events))[len('data: '):]) == {'BTCUSDT': 2.0}
+    await events.aclose()
+    assert sub not in rate_stream.hub.subscribers
+
+async def test_stream_never_leaks_subscribers():
+    connected = len(rate_stream.hub.subscribers)
+    started = asyncio.Event()
+
+    async def slow_snapshot():
+        started.set()
+        await asyncio.sleep(60)
+
+    async def receive():
+        await asyncio.sleep(60)
+
+    async def broken_send(message):
+        raise ConnectionResetError
+
+    response = rate_stream.RateStreamResponse(rate_stream.hub.subscribe(None), slow_snapshot)
+    assert len(rate_stream.hub.subscribers) == connected + 1
+    try:  # headers never go out, so the body never starts
+        await response({'type': 'http'}, receive, broken_send)
+    except Exception:
+        pass
+    assert len(rate_stream.hub.subscribers) == connected
+    events = rate_stream.event_stream(rate_stream.hub.subscribe(None), slow_snapshot)
+    first = asyncio.ensure_future(anext(events))
+    await started.wait()
+    first.cancel()  # client disconnects while the snapshot is fetched
+    await asyncio.gather(first, return_exceptions=True)
+    await events.aclose()
+    assert len(rate_stream.hub.subscribers) == connected
+
+async def test_stream_overflow_is_rejected_before_the_response_starts(client, monkeypatch):
+    monkeypatch.setattr(settings, 'RATE_STREAM_MAX_CLIENTS', len(rate_stream.hub.subscribers))
+    r = await client.get('/public/rates/stream')
+    assert r.status_code == 503
+    with pytest.raises(OverflowError):
+        rate_stream.hub.subscribe(None)
@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from crypto_exchange.app.main import app
+from crypto_exchange.app.core import database
+from crypto_exchange.app.core.config import settings
+from crypto_exchange.app.core.database import Base, get_read_session, get_session
+from crypto_exchange.app.core.security import create_access_token
+from crypto_exchange.app.models import Currency, Order, User
+
+@pytest.fixture
+async def primary_and_replica(tmp_path, monkeypatch):
+    """Two SQLite files standing in for the primary and a (not yet caught up) replica."""
+    engines = {name: database.make_engine(f'sqlite+aiosqlite:///{tmp_path}/{name}.db') for name in ('primary', 'replica')}
+    makers = {}
+    for name, eng in engines.items():
+        async with eng.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        makers[name] = async_sessionmaker(eng, expire_on_commit=False)
+        async with makers[name]() as s:
+            s.add(Currency(code=f'{name[:3].upper()}X', name=name, reserve=1))
+            s.add(User(id=1, email='replica_admin@example.com', hashed_password='x', role='admin'))
+            await s.commit()
+    async with makers['replica']() as s:  # only the replica has this order
+        s.add(Order(id=7, user_id=1, from_currency=1, to_currency=1, amount_from=1, amount_to=1, rate=1, status='new'))
+        await s.commit()
+
+    def session_dep(name):
+        async def dep():
+            async with makers[name]() as s:
+                yield s
+        return dep
+
+    monkeypatch.setitem(app.dependency_overrides, get_session, session_dep('primary'))
+    monkeypatch.setitem(app.dependency_overrides, get_read_session, session_dep('replica'))
+    yield makers
+    for eng in engines.values():
+        await eng.dispose()
+
+async def test_read_only_endpoints_use_replica(client, primary_and_replica):
+    headers = {'Authorization': f"Bearer {create_access_token('1', 'admin')}"}
+    assert [o['id'] for o in (await client.get('/orders', headers=headers)).json()] == [7]
+    # point reads stay on the primary, which never got that order
+    assert (await client.get('/orders/7', headers=headers)).status_code == 404
+    # writes go to the primary
+    r = await client.post('/currencies', json={'code': 'NEW', 'name': 'New', 'reserve': 5}, headers=headers)
+    assert r.status_code == 200
+    async with primary_and_replica['primary']() as s:
+        assert {c.code for c in (await s.execute(Currency.__table__.select())).all()} == {'PRIX', 'NEW'}
+    async with primary_and_replica['replica']() as s:
+        assert {c.code for c in (await s.execute(Currency.__table__.select())).all()} == {'REPX'}
+    assert (await client.get('/orders/analytics/summary', headers=headers)).status_code == 200
+
+def test_replica_falls_back_to_primary():
+    assert settings.DATABASE_REPLICA_URL is None
+    assert database.read_engine is database.engine
+
+def test_pool_settings_apply_to_server_databases(monkeypatch):
+    monkeypatch.setattr(settings, 'DB_POOL_SIZE', 3)
+    monkeypatch.setattr(settings, 'DB_MAX_OVERFLOW', 2)
+    eng = database.make_engine('postgresql+asyncpg://u:p@localhost/db')
+    assert eng.pool.size() == 3 and eng.pool._max_overflow == 2 and eng.pool._pre_ping
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from crypto_exchange.app.core import security
+from crypto_exchange.app.core.database import Base
+from crypto_exchange.app.models import User, Currency, Order, ReserveHold, ReserveShard, AuditLog
+from crypto_exchange.app.services import audit, reserves
+
+async def pool_state(session, currency_id):
+    available = (await session.execute(select(func.coalesce(func.sum(ReserveShard.available), 0)).where(ReserveShard.currency_id == currency_id))).scalar_one()
+    held = (await session.execute(select(func.coalesce(func.sum(ReserveHold.amount), 0)).where(ReserveHold.currency_id == currency_id, ReserveHold.status == 'active'))).scalar_one()
+    reserve = (await session.execute(select(Currency.reserve).where(Currency.id == currency_id))).scalar_one()
+    return float(available), float(held), float(reserve)
+
+async def test_concurrent_holds_never_oversell(tmp_path):
+    # file database: every session gets its own connection, writers really contend
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'holds.db'}", connect_args={'timeout': 30})
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as s:
+        cur = Currency(code='HLD', name='Hold', reserve=100)
+        user = User(email='holds@example.com', hashed_password='x')
+        s.add_all([cur, user])
+        await s.commit()
+
+    async def place():
+        async with Session() as s:
+            order = Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=3, rate=3, status='pending_payment')
+            s.add(order)
+            await s.flush()
+            try:
+                await reserves.place_hold(s, order)
+            except reserves.InsufficientReserve:
+                await s.rollback()
+                return False
+            await s.commit()
+            return True
+
+    results = await asyncio.gather(*(place() for _ in range(60)))
+    async with Session() as s:
+        available, held, reserve = await pool_state(s, cur.id)
+    await engine.dispose()
+    assert sum(results) == 33  # floor(100 / 3), including holds split across shards
+    assert held == 99 and abs(available - 1) < 1e-9 and reserve == 100
+
+async def test_hold_lifecycle(client, session):
+    cur_a = Currency(code='HLA', name='Hold A', reserve=1000)
+    cur_b = Currency(code='HLB', name='Hold B', reserve=50)
+    admin = User(email='holds_admin@example.com', hashed_password=security.hash_password('secret123'), role='admin', kyc_status='verified')
+    session.add_all([cur_a, cur_b, admin])
+    await session.commit()
+    r = await client.post('/auth/login', json={'email':'holds_admin@example.com','password':'secret123'})
+    headers = {'Authorization': f"Bearer {r.json()['access_token']}"}
+    ids = []
+    for _ in range(3):  # fallback rate 100 -> 0.2 * 100 = 20 each
+        r = await client.post('/orders', json={'from_currency':cur_a.id,'to_currency':cur_b.id,'amount_from':0.2}, headers=headers)
+        ids.append(r)
+    assert [r.status_code for r in ids] == [200, 200, 400]  # third would oversell 50
+    await audit.writer.flush()
+    created = select(func.count()).select_from(AuditLog).where(AuditLog.action == 'order.create', AuditLog.user_id == admin.id)
+    assert (await session.execute(created)).scalar_one() == 2  # the rejected order left no audit row
+    ids = [r.json()['id'] for r in ids[:2]]
+    assert await pool_state(session, cur_b.id) == (10.0, 40.0, 50.0)
+    # cancel releases
+    assert (await client.post(f'/orders/{ids[0]}/status', json={'status':'canceled'}, headers=headers)).status_code == 200
+    assert await pool_state(session, cur_b.id) == (30.0, 20.0, 50.0)
+    # reserve cannot drop below active holds
+    assert (await client.patch(f'/currencies/{cur_b.id}', json={'reserve': 10}, headers=headers)).status_code == 400
+    assert (await client.patch(f'/currencies/{cur_b.id}', json={'reserve': 60}, headers=headers)).status_code == 200
+    assert await pool_state(session, cur_b.id) == (40.0, 20.0, 60.0)
+    # completion converts the hold and takes it out of the reserve
+    for status in ('paid', 'processing', 'completed'):
+        assert (await client.post(f'/orders/{ids[1]}/status', json={'status':status}, headers=headers)).status_code == 200
+    assert await pool_state(session, cur_b.id) == (40.0, 0.0, 60.0)  # currencies row untouched by the completion
+    await reserves.reconcile_reserves(session)
+    assert await pool_state(session, cur_b.id) == (40.0, 0.0, 40.0)
+
+async def test_expired_holds_cancel_unpaid_orders(session):
+    cur = Currency(code='HLE', name='Hold E', reserve=10)
+    user = User(email='holds_expiry@example.com', hashed_password='x')
+    session.add_all([cur, user])
+    await session.flush()
+    order = Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=4, rate=4, status='pending_payment')
+    session.add(order)
+    await session.flush()
+    await reserves.place_hold(session, order)
+    await session.commit()
+    await session.execute(update(ReserveHold).where(ReserveHold.order_id == order.id).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    await session.commit()
+    assert await reserves.expire_holds(session) >= 1
+    assert (await session.execute(select(Order.status).where(Order.id == order.id))).scalar_one() == 'canceled'
+    assert await pool_state(session, cur.id) == (10.0, 0.0, 10.0)
+
+async def test_expiry_does_not_cancel_order_paid_meanwhile(session, monkeypatch):
+    cur = Currency(code='HLP', name='Hold P', reserve=10)
+    user = User(email='holds_paid@example.com', hashed_password='x')
+    session.add_all([cur, user])
+    await session.flush()
+    order = Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=4, rate=4, status='pending_payment')
+    session.add(order)
+    await session.flush()
+    await reserves.place_hold(session, order)
+    await session.commit()
+    await session.execute(update(ReserveHold).where(ReserveHold.order_id == order.id).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+    await session.commit()
+    execute = session.execute
+
+    async def pay_after_select(stmt, *args, **kwargs):
+        result = await execute(stmt, *args, **kwargs)
+        if stmt.is_select:  # the sweep has picked its candidates; another transaction pays before the cancel
+            await execute(update(Order).where(Order.id == order.id).values(status='paid').execution_options(synchronize_session=False))
+        return result
+
+    monkeypatch.setattr(session, 'execute', pay_after_select)
+    await reserves.expire_holds(session)
+    monkeypatch.undo()
+    assert (await session.execute(select(Order.status).where(Order.id == order.id))).scalar_one() == 'paid'
+    assert await pool_state(session, cur.id) == (6.0, 4.0, 10.0)  # hold still active
+
+async def test_payment_and_cancel_lose_to_a_committed_expiry(session):
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from crypto_exchange.app.models import UserDailyVolume
+    from crypto_exchange.app.services import limits
+    from crypto_exchange.app.services.orders import transition
+    cur = Currency(code='HLR', name='Hold R', reserve=10)
+    user = User(email='holds_race@example.com', hashed_password='x')
+    session.add_all([cur, user])
+    await session.flush()
+    order = Order(user_id=user.id, from_currency=cur.id, to_currency=cur.id, amount_from=1, amount_to=4, rate=4, status='pending_payment', created_at=datetime.utcnow())
+    await limits.add_volume(session, user.id, 4)
+    session.add(order)
+    await session.flush()
+    await reserves.place_hold(session, order)
+    await session.commit()
+    async with AsyncSession(session.bind, expire_on_commit=False) as request:  # payment / admin request read the order before the sweep ran
+        stale = await request.get(Order, order.id)
+        await request.commit()
+        await session.execute(update(ReserveHold).where(ReserveHold.order_id == order.id).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await session.commit()
+        assert await reserves.expire_holds(session) >= 1
+        assert stale.status == 'pending_payment'
+        assert await transition(request, stale, 'paid') is False
+        assert await transition(request, stale, 'canceled') is False
+        await request.rollback()
+    volume = (await session.execute(select(UserDailyVolume.volume).where(UserDailyVolume.user_id == user.id))).scalar_one()
+    assert float(volume) == 0  # removed once, by the sweep
+    assert (await session.execute(select(Order.status).where(Order.id == order.id))).scalar_one() == 'canceled'
+    assert await pool_state(session, cur.id) == (10.0, 0.0, 10.0)
@@ -0,0 +1,41 @@
+import re
+from crypto_exchange.app.core import timing
+from crypto_exchange.app.core.security import create_access_token
+from crypto_exchange.app.models import User
+
+async def test_server_timing_counts_request_queries(client):
+    r = await client.get('/health')
+    assert r.status_code == 200
+    header = r.headers['Server-Timing']
+    match = re.search(r'db;dur=([\d.]+);desc="(\d+) queries"', header)
+    assert match and int(match.group(2)) >= 1
+    assert re.search(r'app;dur=[\d.]+', header)
+    # background work outside a request is not attributed to any request
+    assert timing.current.get() is None
+
+def test_slow_query_log_keeps_slowest_without_values():
+    log = timing.SlowQueryLog(size=3)
+    for ms in (5, 50, 1, 30, 40, 2):
+        log.offer('SELECT * FROM users WHERE email = ?', ('secret@example.com',), False, ms / 1000)
+    log.offer('INSERT INTO audit_logs (action) VALUES (?)', [('a',), ('b',)], True, 0.045)
+    entries = log.entries()
+    assert [e['duration_ms'] for e in entries] == [50, 45, 40]
+    assert entries[0]['parameters'] == '(str)'
+    assert entries[1]['parameters'] == '2 rows of (str)'
+    assert 'secret' not in str(entries)
+
+async def test_slow_queries_endpoint(client, session, monkeypatch):
+    monkeypatch.setattr(timing, 'slow_queries', timing.SlowQueryLog(size=20))
+    admin = User(email='slowlog_admin@example.com', hashed_password='x', role='admin')
+    session.add(admin)
+    await session.commit()
+    headers = {'Authorization': f"Bearer {create_access_token(str(admin.id), 'admin')}"}
+    await client.get('/health')
+    r = await client.get('/admin/slow-queries', headers=headers)
+    assert r.status_code == 200
+    queries = r.json()['queries']
+    assert any(q['route'] == '/health' and q['statement'] == 'SELECT 1' for q in queries)
+    assert (await client.delete('/admin/slow-queries', headers=headers)).status_code == 204
+    assert len(timing.slow_queries.entries()) <= 1  # at most the principal lookup of the DELETE itself
+    user_token = create_access_token('999999', 'user')
+    assert (await client.get('/admin/slow-queries', headers={'Authorization': f'Bearer {user_token}'})).status_code == 401